@@ -19,15 +19,16 @@ REQUIRES_PYTHON = '>=3.8.0'
 REQUIRED = [
     'typeguard',
     'numpy',
+    'scipy',    # Native IDFOM identification
     'sympy==1.5.1', # Octave dep
     'pillow',
     'control',
     'openpyxl', # Required by Alfaro123c rule
-    'pandas',   # Required by Alfaro123c rule
 ]
 
 # What packages are optional?
 EXTRAS = {
+    'plot': ['matplotlib'], # Alfaro123c models simulation plots
 }
 
 here = path.abspath(path.dirname(__file__))
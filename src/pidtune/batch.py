@@ -0,0 +1,207 @@
+""" Fleet identification, plants are identified and tuned over a process
+pool from step-test files with time, step and response columns, the same
+format the test/plant_raw_data files have. Only the step window of each
+file is read, see pidtune.io.
+
+    python -m pidtune.batch plant_raw_data/ -o summary.csv -j 4
+"""
+from typing import Optional
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from os import path, listdir, cpu_count
+import argparse
+import csv
+import sys
+import time
+
+from .io import read_step_window
+
+valid_models = ('fractional', 'FOPDT', 'SOPDT', 'overdamped')
+
+## Summary table columns
+summary_fields = (
+    'source', 'model', 'status', 'error',
+    'alpha', 'T', 'K', 'L', 'a', 'IAE',
+    'controllers', 'seconds'
+)
+
+def _identify(model: str, window, backend: str) -> dict:
+    """ Identifies the plant model from the step window and tunes its
+    controllers
+    """
+    if model == 'fractional':
+        e_plant = window.fractional_model(backend=backend)
+        return {
+            'alpha': e_plant.alpha,
+            'T'    : e_plant.T,
+            'K'    : e_plant.K,
+            'L'    : e_plant.L,
+            'IAE'  : e_plant.IAE,
+            'controllers': len(e_plant.controllers),
+        }
+
+    e_plant = window.alfaro123c(model)
+    return {
+        'T': e_plant.time_constant,
+        'K': e_plant.dc_gain,
+        'L': e_plant.dead_time,
+        'a': e_plant.a_constant_time,
+        'controllers': len(e_plant.tune_controllers()),
+    }
+
+def run_job(source: str, model: str, backend: str = 'native') -> dict:
+    """ Identification job, it never raises, failures are reported on the
+    returned summary row
+    """
+    row = dict.fromkeys(summary_fields, '')
+    row.update(source=source, model=model)
+
+    start = time.perf_counter()
+    try:
+        row.update(_identify(model, read_step_window(source), backend))
+        row['status'] = 'ok'
+    except Exception as e:
+        row.update(status='error', error="{}: {}".format(type(e).__name__, e))
+    row['seconds'] = time.perf_counter() - start
+
+    return row
+
+def _sources(sources) -> list:
+    """ Step-test files from a directory, a file or an iterable of them
+    """
+    if isinstance(sources, str):
+        sources = [sources]
+
+    files = []
+    for source in sources:
+        if path.isdir(source):
+            files.extend(sorted(
+                path.join(source, name) for name in listdir(source)
+                if not name.startswith('.') and path.isfile(path.join(source, name))
+            ))
+        else:
+            files.append(source)
+    return files
+
+def _error_row(source: str, model: str, error: Exception) -> dict:
+    row = dict.fromkeys(summary_fields, '')
+    row.update(source=source, model=model, status='error',
+               error="{}: {}".format(type(error).__name__, error))
+    return row
+
+def _run_jobs(jobs, max_workers: int, backend: str, broken: list):
+    """ Runs the (source, model) jobs over one process pool and yields the
+    summary rows. If a worker process dies the pool breaks, no more jobs
+    are submitted and the jobs it had in flight are appended to broken.
+    """
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def submit(limit):
+            for job in jobs:
+                try:
+                    pending[executor.submit(run_job, *job, backend)] = job
+                except BrokenProcessPool:
+                    broken.append(job)
+                    return
+                if len(pending) >= limit:
+                    break
+
+        submit(2*max_workers)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = pending.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    broken.append(job)
+                except Exception as e:
+                    yield _error_row(*job, e)
+            if not broken:
+                submit(2*max_workers)
+
+def identify_many(
+        sources,                  # Directory, file or iterable of them
+        models = valid_models,    # Models identified from each file
+        max_workers: Optional[int] = None,  # Process pool size, CPUs by default
+        backend: str = 'native',  # Fractional order model backend
+):
+    """ Identifies every (file, model) job over a process pool and yields
+    the summary rows as the jobs finish. At most 2*max_workers jobs are
+    queued at a time, so huge fleets do not fill the pool queue. A job
+    that kills its worker process is reported as an error, the rest of the
+    fleet runs on a new pool.
+    """
+    for model in models:
+        if model not in valid_models:
+            raise ValueError("Unknown model {}, valid options are {}".format(model, valid_models))
+
+    max_workers = max_workers or cpu_count() or 1
+    if max_workers < 1:
+        raise ValueError("max_workers must be greater than 0")
+
+    jobs = iter([(source, model) for source in _sources(sources) for model in models])
+    while True:
+        broken = []
+        yield from _run_jobs(jobs, max_workers, backend, broken)
+        if not broken:
+            return
+
+        ## Any job in flight may have killed the pool, each one runs alone
+        for job in broken:
+            crashed = []
+            yield from _run_jobs(iter([job]), 1, backend, crashed)
+            if crashed:
+                yield _error_row(*job, BrokenProcessPool("the worker process died running this job"))
+
+def write_summary(rows, summary_file) -> list:
+    """ Writes the summary rows as a CSV table on a path or file object,
+    it returns the rows written
+    """
+    rows = list(rows)
+    if isinstance(summary_file, str):
+        with open(summary_file, 'w', newline='') as output:
+            return write_summary(rows, output)
+
+    writer = csv.DictWriter(summary_file, fieldnames=summary_fields)
+    writer.writeheader()
+    writer.writerows(rows)
+    return rows
+
+def run(sources, summary_file, models = valid_models, max_workers: Optional[int] = None, backend: str = 'native') -> list:
+    """ identify_many plus write_summary, rows are sorted by source and
+    model on the table
+    """
+    order = {model: i for i, model in enumerate(valid_models)}
+    rows = sorted(
+        identify_many(sources, models, max_workers, backend),
+        key=lambda row: (row['source'], order[row['model']])
+    )
+    return write_summary(rows, summary_file)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m pidtune.batch',
+        description='Identifies and tunes plants from step-test files.')
+    parser.add_argument('sources', nargs='+', help='Step-test files or directories')
+    parser.add_argument('-o', '--output', default='-', help='Summary CSV file, stdout by default')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Worker processes')
+    parser.add_argument('-m', '--models', nargs='+', default=list(valid_models), choices=valid_models)
+    parser.add_argument('-b', '--backend', default='native', help='Fractional order model backend')
+    args = parser.parse_args(argv)
+
+    rows = []
+    for row in identify_many(args.sources, args.models, args.jobs, args.backend):
+        print("{status:5} {model:10} {source}".format(**row), file=sys.stderr)
+        rows.append(row)
+
+    if args.output == '-':
+        write_summary(rows, sys.stdout)
+    else:
+        write_summary(rows, args.output)
+
+    return 0 if all(row['status'] == 'ok' for row in rows) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
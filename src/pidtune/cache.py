@@ -0,0 +1,165 @@
+""" Content-addressed results cache. Entries are keyed by a sha256 digest of
+the input vectors, the model/backend choice and the package version, so a
+resubmitted step test returns the stored results and a new release never
+reads the old ones.
+
+Entries live on an in-memory LRU and, when a path is configured, on a SQLite
+file shared by the processes using it, evicted by last use above a size
+limit. The file stores pickles, only point it to a trusted location.
+
+    PIDTUNE_CACHE_PATH=/var/cache/pidtune.sqlite python -m pidtune.batch ...
+"""
+from typing import Optional
+from collections import OrderedDict
+from threading import Lock
+from os import environ
+import hashlib
+import pickle
+import sqlite3
+import json
+import time
+
+from .__version__ import __version__
+from .utils.vectUtils import asVector
+
+## Cache default values, they can be overridden with environment variables
+CACHE_SIZE = int(environ.get('PIDTUNE_CACHE_SIZE', 128))                     # In-memory entries
+CACHE_PATH = environ.get('PIDTUNE_CACHE_PATH') or None                        # SQLite file, memory only by default
+CACHE_MAX_BYTES = int(environ.get('PIDTUNE_CACHE_MAX_BYTES', 256*1024*1024))  # SQLite file values size
+SQLITE_TIMEOUT = 30 # Seconds to wait for other processes locks
+
+def cache_key(*vectors, **choices) -> str:
+    """ sha256 hex digest of the float64 vectors, the choices (model,
+    backend...) and the package version
+    """
+    digest = hashlib.sha256(__version__.encode())
+    digest.update(json.dumps(choices, sort_keys=True, default=str).encode())
+    for vector in vectors:
+        vector = asVector(vector)
+        digest.update(len(vector).to_bytes(8, 'little'))
+        digest.update(vector.tobytes())
+    return digest.hexdigest()
+
+class ResultCache():
+    """ In-memory LRU of pickled values with an optional SQLite store. Values
+    are stored pickled, so every get returns a fresh copy the caller may
+    modify.
+    """
+    def __init__(
+            self,
+            size: int = CACHE_SIZE,             # In-memory entries, 0 disables the LRU
+            path: Optional[str] = CACHE_PATH,             # SQLite file, None to keep the entries in memory only
+            max_bytes: int = CACHE_MAX_BYTES,   # SQLite file values size before eviction
+    ):
+        if size < 0 or max_bytes < 0:
+            raise ValueError("Cache size must not be negative")
+
+        self.size = size
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._lock = Lock()
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path, timeout=SQLITE_TIMEOUT, check_same_thread=False)
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+                    "bytes INTEGER NOT NULL, used REAL NOT NULL)")
+                self._db.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+
+    def _remember(self, key: str, blob: bytes):
+        self._memory[key] = blob
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str, default=None):
+        """ Stored value of key, default when it is not stored
+        """
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+            elif self._db is not None:
+                with self._db:
+                    row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        blob = row[0]
+                        self._db.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+                        self._remember(key, blob)
+
+            if blob is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return pickle.loads(blob)
+
+    def put(self, key: str, value):
+        """ Stores value under key, least recently used entries are evicted
+        beyond the LRU size and the SQLite max_bytes
+        """
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._remember(key, blob)
+            if self._db is None:
+                return
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, bytes, used) VALUES (?, ?, ?, ?)",
+                    (key, blob, len(blob), time.time()))
+
+                total = self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM results").fetchone()[0]
+                if total > self.max_bytes:
+                    # Oldest entries until the values fit
+                    evicted = []
+                    for old_key, size in self._db.execute(
+                            "SELECT key, bytes FROM results ORDER BY used").fetchall():
+                        if total <= self.max_bytes:
+                            break
+                        evicted.append((old_key,))
+                        total -= size
+                    self._db.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+    def clear(self):
+        """ Drops every entry, from memory and from the SQLite file
+        """
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.misses = 0
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("DELETE FROM results")
+
+    def close(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+_default_cache = None
+_default_lock = Lock()
+
+def default_cache() -> ResultCache:
+    """ Shared cache used by the plant models
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache()
+        return _default_cache
+
+def configure(size: int = CACHE_SIZE, path: Optional[str] = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES) -> ResultCache:
+    """ Replaces the shared cache with a new one
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is not None:
+            _default_cache.close()
+        _default_cache = ResultCache(size=size, path=path, max_bytes=max_bytes)
+        return _default_cache
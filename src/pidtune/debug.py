@@ -0,0 +1,36 @@
+""" Runtime type checking switch. The typeguard checks on the models
+constructors are off by default, set the PIDTUNE_DEBUG environment variable
+(1, true, yes or on) or call pidtune.debug.enable() to turn them on.
+"""
+from functools import wraps
+from os import environ
+
+_enabled = environ.get('PIDTUNE_DEBUG', '').lower() in ('1', 'true', 'yes', 'on')
+
+def enable(flag: bool = True):
+    global _enabled
+    _enabled = bool(flag)
+
+def disable():
+    enable(False)
+
+def enabled() -> bool:
+    return _enabled
+
+def typechecked(func):
+    """ typeguard.typechecked only while the checks are enabled, the
+    function is instrumented on its first checked call
+    """
+    checked = None
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal checked
+        if not _enabled:
+            return func(*args, **kwargs)
+        if checked is None:
+            from typeguard import typechecked as _typechecked
+            checked = _typechecked(func)
+        return checked(*args, **kwargs)
+
+    return wrapper
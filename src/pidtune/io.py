@@ -0,0 +1,215 @@
+""" Step-test files reader. Text files (tab, space or comma separated
+time, step and response columns) are memory-mapped and parsed by chunks,
+.npy files are memory-mapped as they are, so the step window is found
+without loading the whole file.
+"""
+from typing import Optional
+from os import path
+import mmap
+import warnings
+
+import numpy as np
+
+CHUNK_BYTES = 1 << 22    # Text bytes parsed per chunk
+CHUNK_ROWS = 1 << 16     # .npy rows per chunk
+PRE_SAMPLES = 500        # Samples kept before the step
+HOLD_SAMPLES = 50        # Constant input samples before a change ends the window
+
+class StepWindow():
+    """ Step test segment around the first input change, from PRE_SAMPLES
+    before it to the next input change or the end of the file
+    """
+    def __init__(self, data, start_row: int, step_row: int):
+        self.time_vector = np.ascontiguousarray(data[:, 0])
+        self.step_vector = np.ascontiguousarray(data[:, 1])
+        self.resp_vector = np.ascontiguousarray(data[:, 2])
+        self.start_row = start_row # File row of the first window sample
+        self.step_row = step_row   # File row of the step, IDFOM tin sample
+
+    def __len__(self):
+        return len(self.time_vector)
+
+    @property
+    def flagtin(self) -> int:
+        """ Samples before the step inside the window, IDFOM.m flagtin
+        """
+        return self.step_row - self.start_row
+
+    @property
+    def tin(self) -> float:
+        """ Time the step is applied, relative to the window start
+        """
+        return float(self.time_vector[self.flagtin-1] - self.time_vector[0])
+
+    def vectors(self) -> tuple:
+        return self.time_vector, self.step_vector, self.resp_vector
+
+    def fractional_model(self, **kwargs):
+        """ FractionalOrderModel identified from the window
+        """
+        from .models.plant import FractionalOrderModel
+        return FractionalOrderModel(
+            time_vector=self.time_vector,
+            step_vector=self.step_vector,
+            resp_vector=self.resp_vector,
+            **kwargs
+        )
+
+    def alfaro123c(self, model: str = 'FOPDT'):
+        """ FOPDT, SOPDT or overdamped model identified from the window
+        """
+        from .models import plant_alfaro123c
+        if model not in ('FOPDT', 'SOPDT', 'overdamped'):
+            raise ValueError("Unknown Alfaro123c model {}".format(model))
+        return getattr(plant_alfaro123c, model)(analysis=self.analysis())
+
+    def analysis(self):
+        """ Alfaro123c preprocessing of the window, computed once
+        """
+        if not hasattr(self, '_analysis'):
+            from .models.plant_alfaro123c import StepTestAnalysis
+            self._analysis = StepTestAnalysis(*self.vectors())
+        return self._analysis
+
+def _text_chunks(file_path: str, chunk_bytes: int):
+    with open(file_path, 'rb') as data_file:
+        if not path.getsize(file_path):
+            return
+        with mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            columns = None
+            position = 0
+            size = len(mm)
+            while position < size:
+                # Chunks end on a line break
+                end = min(position + chunk_bytes, size)
+                if end < size:
+                    newline = mm.rfind(b'\n', position, end)
+                    end = newline + 1 if newline >= 0 else (mm.find(b'\n', end) + 1 or size)
+                text = mm[position:end].replace(b',', b' ').replace(b';', b' ')
+                position = end
+
+                if columns is None:
+                    # Skip header lines, the first numeric one sets the columns
+                    lines = text.split(b'\n')
+                    while lines and not _numeric(lines[0]):
+                        lines.pop(0)
+                    if not lines:
+                        continue
+                    columns = len(lines[0].split())
+                    if columns < 3:
+                        raise ValueError("Step test files need time, step and response columns")
+                    text = b'\n'.join(lines)
+
+                with warnings.catch_warnings():
+                    warnings.simplefilter('error', DeprecationWarning)
+                    try:
+                        values = np.fromstring(text, dtype=np.float64, sep=' ')
+                    except DeprecationWarning:
+                        raise ValueError("Step test file has non numeric values")
+                if len(values) % columns:
+                    raise ValueError("Step test file rows need {} columns".format(columns))
+                yield values.reshape(-1, columns)[:, :3]
+
+def _numeric(line: bytes) -> bool:
+    try:
+        [float(value) for value in line.split()]
+    except ValueError:
+        return False
+    return bool(line.split())
+
+def _npy_chunks(file_path: str, chunk_rows: int):
+    data = np.load(file_path, mmap_mode='r')
+    if data.ndim != 2 or data.shape[1] < 3:
+        raise ValueError("Step test arrays need time, step and response columns")
+    for start in range(0, len(data), chunk_rows):
+        yield np.asarray(data[start:start+chunk_rows, :3], dtype=np.float64)
+
+def iter_chunks(file_path: str, chunk_bytes: int = CHUNK_BYTES, chunk_rows: int = CHUNK_ROWS):
+    """ Yields the (rows, 3) float64 time, step and response chunks of a
+    step-test file
+    """
+    if file_path.endswith('.npy'):
+        return _npy_chunks(file_path, chunk_rows)
+    return _text_chunks(file_path, chunk_bytes)
+
+def read_step_test(file_path: str) -> tuple:
+    """ Reads the whole step-test file, it returns the time, step and
+    response float64 arrays
+    """
+    chunks = list(iter_chunks(file_path))
+    if not chunks:
+        raise ValueError("Step test file {} is empty".format(file_path))
+    data = np.concatenate(chunks)
+    return tuple(np.ascontiguousarray(data[:, i]) for i in range(3))
+
+def read_step_window(
+        file_path: str,
+        pre_samples: int = PRE_SAMPLES,   # Samples kept before the step
+        post_samples: Optional[int] = None,         # Max samples after the step, None to the end
+        hold_samples: int = HOLD_SAMPLES, # Constant samples before the next step ends the window
+        threshold: float = 0.0,           # Input changes up to threshold are noise
+        chunk_bytes: int = CHUNK_BYTES,
+) -> StepWindow:
+    """ Streams the file and returns the first step window. Only the
+    pre_samples before the step are kept while it is searched, so memory
+    scales with the window and not with the file.
+
+    The step is the first sample whose input differs from the previous
+    one, the IDFOM.m tin/flagtin definition. The window ends before the
+    next input change found after the input was constant for hold_samples,
+    after post_samples or at the end of the file.
+    """
+    if pre_samples < 1:
+        raise ValueError("pre_samples must be greater than 0")
+
+    pre = np.empty((0, 3))   # Tail kept before the step
+    rows = 0                 # File rows already read
+    step_row = None
+    window = []
+    last_change = None       # File row of the last input change inside the window
+    previous_u = None
+
+    for chunk in iter_chunks(file_path, chunk_bytes):
+        u = chunk[:, 1]
+        reference = np.concatenate(([u[0] if previous_u is None else previous_u], u[:-1]))
+        changes = np.flatnonzero(np.abs(u - reference) > threshold)
+        previous_u = u[-1]
+
+        if step_row is None:
+            if not len(changes):
+                pre = np.concatenate((pre, chunk))[-pre_samples:]
+                rows += len(chunk)
+                continue
+            step_row = rows + changes[0]
+            pre = np.concatenate((pre, chunk[:changes[0]]))[-pre_samples:]
+            start_row = step_row - len(pre)
+            window = [pre]
+            last_change = step_row
+            offset = changes[0]
+            changes = changes[1:]
+        else:
+            offset = 0
+
+        ## Window end, next step after hold_samples constant samples
+        end = len(chunk)
+        for change in changes:
+            if rows + change - last_change > hold_samples:
+                end = change
+                break
+            last_change = rows + change
+        if post_samples is not None:
+            end = max(min(end, step_row + post_samples - rows), offset)
+
+        window.append(chunk[offset:end])
+        rows += len(chunk)
+        if end < len(chunk):
+            break
+
+    if step_row is None:
+        raise ValueError("There is no step in the step vector")
+
+    data = np.concatenate(window)
+    if len(data) - (step_row - start_row) < 2:
+        raise ValueError("Step test window has no samples after the step")
+
+    return StepWindow(data, start_row, step_row)
@@ -1,3 +1,15 @@
-from . import plant
-from . import controller
-from . import plant_alfaro123c
+""" Plant and controller models. The submodules are imported on first access,
+so importing a rule or a light model does not load the identification and
+simulation stacks of the others.
+"""
+from importlib import import_module
+
+__all__ = ('plant', 'controller', 'plant_alfaro123c')
+
+def __getattr__(name):
+    if name in __all__:
+        return import_module('.' + name, __name__)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
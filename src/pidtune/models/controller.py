@@ -1,25 +1,49 @@
-from typeguard import typechecked
-from control import tf
+from ..debug import typechecked
+from ..utils.robustness import stabilityMargins
+from numbers import Real
+import numpy as np
+
+## Controller fields, in the Controller arguments order
+fields = (
+    'ctype', 'Ms', 'n_kp', 'n_ti', 'n_td', 'kp', 'ti', 'td',
+    'action', 'filter_constant', 'beta', 'gamma'
+)
+dict_fields = fields[:8] # toDict keys
+
+## ControllerSet columns
+controller_dtype = np.dtype(
+    [('ctype', 'U3'), ('Ms', 'U4')] + [(field, np.float64) for field in fields[2:]]
+)
+_defaults = {'action': 1.0, 'filter_constant': 0.1, 'beta': 1.0, 'gamma': 0.0}
 
 class Controller():
+    __slots__ = fields
+
     @typechecked
     def __init__(
             self,
             ctype: str,
             Ms: str,
-            n_kp: float,
-            n_ti: float,
-            n_td: float,
-            kp: float,
-            ti: float,
-            td: float,
+            n_kp: Real,
+            n_ti: Real,
+            n_td: Real,
+            kp: Real,
+            ti: Real,
+            td: Real,
 
             ## PID ODoF by default
-            action: float = 1,
-            filter_constant: float = 0.1,
-            beta: float = 1, # TODO
-            gamma: float = 0, # TODO
+            action: Real = 1,
+            filter_constant: Real = 0.1,
+            beta: Real = 1,  # Set-point weight, proportional action
+            gamma: Real = 0, # Set-point weight, derivative action
     ):
+        ## Cheap checks, typeguard only runs with pidtune.debug enabled
+        if not (isinstance(ctype, str) and isinstance(Ms, str)):
+            raise ValueError("Controller wrong input values")
+        for value in (n_kp, n_ti, n_td, kp, ti, td, action, filter_constant, beta, gamma):
+            if not isinstance(value, Real):
+                raise ValueError("Controller wrong input values")
+
         self.ctype = ctype
         self.Ms = Ms
         self.n_kp = n_kp
@@ -31,13 +55,11 @@ class Controller():
 
         self.action = action
         self.filter_constant = filter_constant
-
-        # raise Exception("Wrong value") #TODO
-        # raise ValueError("Wrong value") #TODO
-
-    # Print json format __str__ etc
+        self.beta = beta
+        self.gamma = gamma
 
     def tf(self):
+        from control import tf
         s = tf('s')
         return self.action * self.kp*( 1 + (1/(self.ti*s)) + ((self.td*s)/(1+self.filter_constant*self.td*s)))
 
@@ -55,3 +77,119 @@ class Controller():
 
     def __str__(self):
         return str(self.toDict())
+
+class ControllerSet():
+    """ Many controllers as NumPy columns, one controller_dtype row per
+    controller. Items are Controller objects, slices and masks return a
+    ControllerSet and field names return the column arrays.
+    """
+    __slots__ = ('data',)
+
+    def __init__(self, data=None):
+        if data is None:
+            data = np.zeros(0, dtype=controller_dtype)
+        data = np.asarray(data)
+        if data.dtype != controller_dtype:
+            raise ValueError("ControllerSet data needs the controller_dtype")
+        self.data = data
+
+    @classmethod
+    def from_controllers(cls, controllers):
+        controllers = list(controllers)
+        data = np.zeros(len(controllers), dtype=controller_dtype)
+        for field in fields:
+            data[field] = [getattr(controller, field) for controller in controllers]
+        return cls(data)
+
+    @classmethod
+    def from_records(cls, records):
+        """ ControllerSet from a structured array with (some of) the
+        controller fields, like the rules batch results. Rows flagged with
+        valid=False are dropped and missing columns take the Controller
+        defaults.
+        """
+        records = np.asarray(records).ravel()
+        if 'valid' in records.dtype.names:
+            records = records[records['valid']]
+        data = np.zeros(len(records), dtype=controller_dtype)
+        for field in fields:
+            if field in records.dtype.names:
+                data[field] = records[field]
+            elif field in _defaults:
+                data[field] = _defaults[field]
+            else:
+                raise ValueError("Records need the {} field".format(field))
+        return cls(data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self.data[key]
+        if isinstance(key, (int, np.integer)):
+            row = self.data[key]
+            return Controller(
+                str(row['ctype']),
+                str(row['Ms']),
+                *(float(row[field]) for field in fields[2:])
+            )
+        return ControllerSet(self.data[key])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def filter(self, ctype=None, Ms=None):
+        """ Controllers of the given ctype and Ms, each one a value or a
+        sequence of them
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if ctype is not None:
+            mask &= np.isin(self.data['ctype'], np.atleast_1d(ctype))
+        if Ms is not None:
+            mask &= np.isin(self.data['Ms'], np.atleast_1d(Ms))
+        return ControllerSet(self.data[mask])
+
+    def to_records(self) -> list:
+        """ Controller.toDict of every controller, built column by column
+        """
+        columns = (self.data[field].tolist() for field in dict_fields)
+        return [
+            {'ctype': ctype, 'Ms': Ms, 'n_kp': n_kp, 'n_ti': n_ti, 'n_td': n_td,
+             'kp': kp, 'ti': ti, 'td': td}
+            for ctype, Ms, n_kp, n_ti, n_td, kp, ti, td in zip(*columns)
+        ]
+
+    def tf_coefficients(self) -> tuple:
+        """ Numerator and denominator coefficients, (n, 3) arrays in
+        descending powers of s, of every Controller.tf()
+        """
+        d = self.data
+        gain = d['action']*d['kp']
+        ti, td = d['ti'], d['td']
+        ftd = d['filter_constant']*td # Derivative filter time
+
+        # kp*(ti*s*(1+ftd*s) + (1+ftd*s) + ti*td*s^2)/(ti*s*(1+ftd*s))
+        num = gain[:, np.newaxis]*np.column_stack((ti*ftd + ti*td, ti + ftd, np.ones(len(d))))
+        den = np.column_stack((ti*ftd, ti, np.zeros(len(d))))
+        return num, den
+
+    def tf(self) -> list:
+        """ Transfer function of every controller
+        """
+        from control import tf
+        return [tf(n, d) for n, d in zip(*self.tf_coefficients())]
+
+    def robustness(self, K, T, L, alpha=1.0, a=0.0) -> np.ndarray:
+        """ Achieved Ms, margins and crossovers of every controller with the
+        plant K*exp(-L*s)/((T*s^alpha + 1)(a*T*s + 1)), the plant parameters
+        may be arrays broadcast with the controllers.
+
+        :returns: A robustness_dtype array, see utils.robustness
+        :rtype: numpy.ndarray
+        """
+        d = self.data
+        return stabilityMargins(
+            d['kp'], d['ti'], d['td'], K, T, L, alpha, a,
+            filter_constant=d['filter_constant'], action=d['action'])
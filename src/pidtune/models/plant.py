@@ -1,32 +1,82 @@
 from ..rules import frac_order as _frac_order # Only rule it has by now
 from ..utils.cronePadula2 import cronePadula2
-from ..utils.vectUtils import normalizeVect, identify
-
-from typeguard import typechecked
-from subprocess import Popen, PIPE, STDOUT
-from os import path, remove, rmdir, environ
+from ..utils.vectUtils import FloatVector, asVector
+from ..utils import octavePool as _octave_pool
+from .. import cache as _cache
+
+from ..debug import typechecked
+from numbers import Real
+from typing import Optional
+from tempfile import TemporaryDirectory
+from os import path
 import json
 
-from control import tf, step_response # Transfer function, step response
-from control.matlab import zpk2tf as zpk
 import numpy as np
 
+valid_backends = ('native', 'octave') # Identification backends
+_shm_path = '/dev/shm' if path.isdir('/dev/shm') else None # Memory backed files for Octave
+
+def fractional_tf(K, T, alpha):
+    """ control.tf transfer function K/(T*s^alpha + 1), s^alpha being the
+    CRONE Oustaloup approximation (without dead time)
+    """
+    from control import tf # Transfer function
+    from control.matlab import zpk2tf as zpk
+
+    # Using CRONE Oustaloup to define Pm
+    if (alpha <1):
+        zz, pp, kk = cronePadula2(
+            k = 1,
+            v = -alpha,
+        )
+
+        mod = 1/zpk(zz,pp,kk)
+    else:
+        zz, pp, kk = cronePadula2(
+            k = 1,
+            v = alpha,
+        )
+        mod = zpk(zz,pp,kk)
+
+    ## Convert mod into tf
+    mod = tf(mod[0], mod[1])
+
+    # l_tf = K*exp(-L*s)/(T*mod+1);
+    return K/(T*mod+1) # No deadtime
+
 class FractionalOrderModel(): # TODO herence from generic plant model
     @typechecked
     def __init__(self,
                  ############### Raw data to identify the plant model
-                 time_vector: list=[], # Time vector to identify the plant model
-                 step_vector: list=[], # Step vector to identify the plant model
-                 resp_vector: list=[],  # Open-loop system response to identify the plant model
+                 time_vector: FloatVector=[], # Time vector to identify the plant model
+                 step_vector: FloatVector=[], # Step vector to identify the plant model
+                 resp_vector: FloatVector=[],  # Open-loop system response to identify the plant model
 
                  ############### Fractional order model in case it was calculated
-                 alpha: float = 0,                 # Fractional order   (alpha)
+                 alpha: Real = 0,                 # Fractional order   (alpha)
 
                  ############### Common models constants
-                 time_constant: float = 0,         # Main time constant (T)
-                 proportional_constant: float = 0, # Gain               (K)
-                 dead_time_constant: float = 0,    # Dead time          (L)
+                 time_constant: Real = 0,         # Main time constant (T)
+                 proportional_constant: Real = 0, # Gain               (K)
+                 dead_time_constant: Real = 0,    # Dead time          (L)
+
+                 ############### Identification backend, IDFOM Python port or octave-cli
+                 backend: str = 'native',
+
+                 ############### Native identification model step response, see identFractOrderModel.engines
+                 engine: str = 'oustaloup',
+
+                 ############### Native identification optimizer starts and the IAE that stops them, see identFractOrderModel.identify
+                 starts: int = 1,
+                 tolerance: Optional[Real] = None,
+
+                 ############### Reuse the results of the same vectors and backend, pidtune.cache
+                 cache: bool = True,
                  ):
+        ## Cheap checks, typeguard only runs with pidtune.debug enabled
+        for value in (alpha, time_constant, proportional_constant, dead_time_constant):
+            if not isinstance(value, Real):
+                raise ValueError("Plant model wrong input values")
 
         ## Identify the input plant
         if (alpha or time_constant or proportional_constant or dead_time_constant):
@@ -47,85 +97,37 @@ class FractionalOrderModel(): # TODO herence from generic plant model
         else:
             raise ValueError("Plant model wrong input values, no vectors or constants")
 
-        try: ## Plant model identification process
-            octalib_path = path.join(path.dirname(__file__), '../octalib/')
-            octave_run = Popen(
-                ['octave-cli'],
-                cwd=octalib_path,
-                stdout=PIPE,
-                stdin=PIPE,
-                stderr=PIPE,
-                start_new_session=True,
-                env=environ.copy()
-            )
-
-            # time_vector, step_vector, resp_vector = identify( # FIXME TODO
-            #     time_vector, step_vector, resp_vector)
-
-            IDFOM = str()
-            with open(path.join(octalib_path, 'IDFOM.m'), 'r') as IDFOM_file:
-                IDFOM = IDFOM_file.readlines()
-            script = """
-% Run on execution start
-version_info=ver("MATLAB");
-try
-  if (version_info.Name=="MATLAB")
-    % Running on Matlab
-  end
-catch ME
-  %% Running on Octave
-  %% Octave load packages
-  pkg load control
-  pkg load symbolic
-  pkg load optim
-end
-
-% Running initial module
-
-clear;
-
-%% Define
-s=tf('s');
+        if backend not in valid_backends:
+            raise ValueError("Unknown identification backend, valid options are {}".format(valid_backends))
+        from ..utils import identFractOrderModel as _ident # Identification stack, on first use
+        if engine not in _ident.engines:
+            raise ValueError("Unknown step response engine, valid options are {}".format(_ident.engines))
+        if backend == 'octave' and engine != 'oustaloup':
+            raise ValueError("The Octave backend only has the 'oustaloup' engine")
+        if backend == 'octave' and starts != 1:
+            raise ValueError("The Octave backend only runs one optimizer start")
 
-%% Global variables definition
-global To vo Lo Ko ynorm unorm tnorm long tin tmax tu
-
-%% Load data from thread cache
-t={};                                % time vector
-u={};                                % control signal vector
-y={};                                % controled variable vector
-long = {}; % define the default length
-            """.format(
-                str(time_vector).replace(',',';'),
-                str(step_vector).replace(',',';'),
-                str(resp_vector).replace(',',';'),
-                len(time_vector)
-            ) + "".join(IDFOM)
-
-            octave_run.stdin.write(script.encode('ascii'))
-            octave_run.stdin.close()
-
-            ### The two next lines will wait till the program ends. !IMPORTANT
-            lines_std = [ line.decode() for line in octave_run.stdout.readlines()]
-            lines = lines_std + [ line.decode() for line in octave_run.stderr.readlines()]
-
-            error_code = octave_run.terminate()
-            if error_code:
-                print("\n".join(lines))
-                raise Exception("Internal Octave/Matlab execution error: {}".format(error_code))
-
-            results_list =[ json.loads(i) for i in lines_std[-3:] if "fractional_model" in i]
-            if not len(results_list):
-                print("\n".join(lines))
-                raise ValueError("Bad result for IDFOM excecution, verify your data.")
-
-            results_dict = results_list[0]
-
-            signals_matrix = [ i.replace("\n", "").replace("result_signals\t", '').split('\t') for i in lines if "result_signals" in i ]
-            self.time_vector =       [ i[0] for i in signals_matrix ]  # Time vector
-            self.step_vector =       [ i[1] for i in signals_matrix ]  # Step vector
-            self.resp_vector =       [ i[2] for i in signals_matrix ]  # Open-loop system response
-            self.model_resp_vector = [ i[3] for i in signals_matrix ]  # Open-loop model-system response
+        try: ## Plant model identification process
+            key = None
+            if cache:
+                key = _cache.cache_key(time_vector, step_vector, resp_vector,
+                                       model='fractional', backend=backend, engine=engine,
+                                       starts=starts, tolerance=tolerance)
+                cached = _cache.default_cache().get(key)
+                if cached is not None:
+                    vars(self).update(cached)
+                    return # Identified and tuned before
+
+            if backend == 'native':
+                results_dict = _ident.identify(time_vector, step_vector, resp_vector, engine,
+                                         starts=starts, tolerance=tolerance)
+            else:
+                results_dict = self._identify_octave(time_vector, step_vector, resp_vector)
+
+            self.time_vector =       results_dict['time_vector']        # Time vector
+            self.step_vector =       results_dict['step_vector']        # Step vector
+            self.resp_vector =       results_dict['resp_vector']        # Open-loop system response
+            self.model_resp_vector = results_dict['model_resp_vector']  # Open-loop model-system response
 
             ## Computed params
             self.alpha = results_dict["v"]
@@ -133,6 +135,7 @@ long = {}; % define the default length
             self.K = results_dict["K"]
             self.L = results_dict["L"]
             self.IAE = results_dict["IAE"]
+            self.starts = results_dict.get("starts", []) # Per-start optimizer reports
 
         except Exception as e:
             raise ValueError("Plant response wrong input vectors, verify your data, {}".format(str(e)))
@@ -140,32 +143,75 @@ long = {}; % define the default length
         ## Tune controllers
         self.controllers = self.tune_controllers()
 
-    def tf (self):
-        """ Returns a control.tf transfer function (without dead time)
+        if key is not None:
+            _cache.default_cache().put(key, vars(self))
+
+    def _identify_octave(self, time_vector, step_vector, resp_vector):
+        """ Runs IDFOM.m on a warm worker of the shared Octave pool, the
+        vectors are exchanged as raw float64 files
         """
+        with TemporaryDirectory(prefix='pidtune_', dir=_shm_path) as data_path:
+            data_file = path.join(data_path, 'data.bin')
+            result_file = path.join(data_path, 'result.bin')
 
-        # Using CRONE Oustaloup to define Pm
-        if (self.alpha <1):
-            zz, pp, kk = cronePadula2(
-                k = 1,
-                v = -self.alpha,
-            )
+            ## t, u and y columns, Octave reads the matrix in column-major order
+            np.concatenate((
+                asVector(time_vector),
+                asVector(step_vector),
+                asVector(resp_vector)
+            )).tofile(data_file)
 
-            mod = 1/zpk(zz,pp,kk)
-        else:
-            zz, pp, kk = cronePadula2(
-                k = 1,
-                v = self.alpha,
-            )
-            mod = zpk(zz,pp,kk)
+            script = """
+% Running initial module, keep the loaded session values
+clear -x version_info s;
+
+%% Global variables definition
+global To vo Lo Ko ynorm unorm tnorm long tin tmax tu
+
+%% Load data from the binary data file
+long = {};                           % define the default length
+fid = fopen('{}', 'r');
+data = fread(fid, [long 3], 'double');
+fclose(fid);
+t = data(:,1);                       % time vector
+u = data(:,2);                       % control signal vector
+y = data(:,3);                       % controled variable vector
+result_file = '{}';                  % IDFOM.m writes the signals here
+
+IDFOM
+            """.format(len(time_vector), data_file, result_file)
+
+            lines = _octave_pool.default_pool().run(script)
+
+            errors = [ json.loads(i) for i in lines if '"type": "error"' in i ]
+            if len(errors):
+                raise Exception("Internal Octave/Matlab execution error: {}".format(errors[0]["message"]))
+
+            results_list =[ json.loads(i) for i in lines[-3:] if "fractional_model" in i]
+            if not len(results_list):
+                raise ValueError("Bad result for IDFOM excecution, verify your data.")
+
+            results_dict = results_list[0]
+
+            ## [tnorm unorm ynorm ym/Ko] columns
+            signals_matrix = np.fromfile(result_file, dtype=np.float64).reshape(4, -1)
 
-        ## Convert mod into tf
-        mod = tf(mod[0], mod[1])
+        results_dict['time_vector'] =       signals_matrix[0]  # Time vector
+        results_dict['step_vector'] =       signals_matrix[1]  # Step vector
+        results_dict['resp_vector'] =       signals_matrix[2]  # Open-loop system response
+        results_dict['model_resp_vector'] = signals_matrix[3]  # Open-loop model-system response
 
-        # l_tf = K*exp(-L*s)/(T*mod+1);
-        return self.K/(self.T*mod+1) # No deadtime
+        return results_dict
 
-    def tune_controllers(self):
+    def tf (self):
+        """ Returns a control.tf transfer function (without dead time)
+        """
+        return fractional_tf(self.K, self.T, self.alpha)
+
+    def tune_controllers(self, decimals: Optional[int] = None):
+        """ Tunes the valid controllers, decimals rounds the normalized
+        plant of the memoized rule lookup, see frac_order.tuning
+        """
         controllers = []
 
         if self.alpha > 1.6:
@@ -181,7 +227,8 @@ long = {}; % define the default length
                     self.K,
                     self.L,
                     Ms,
-                    ctype
+                    ctype,
+                    decimals
                 )
                 if temp:
                     controllers.append(temp)
@@ -199,20 +246,21 @@ long = {}; % define the default length
     def toResponse(self):
         try:
             result = {
-                'time'    :   self.time_vector,       # Time vector
-                'step'    :   self.step_vector,       # Step vector
-                'respo'   :   self.resp_vector,       # Open-loop system response
-                'm_respo' :   self.model_resp_vector  # Open-loop model-system response
+                'time'    :   self.time_vector.tolist(),       # Time vector
+                'step'    :   self.step_vector.tolist(),       # Step vector
+                'respo'   :   self.resp_vector.tolist(),       # Open-loop system response
+                'm_respo' :   self.model_resp_vector.tolist()  # Open-loop model-system response
             }
         except Exception as e:
+            from control import step_response
 
             t, y = step_response(self.tf())
 
             result = {
-                'time'    :   list(np.add(self.L, t)),       # Time vector
+                'time'    :   np.add(self.L, t).tolist(),       # Time vector
                 'step'    :   [],                     # Step vector
                 'respo'   :   [],                     # Open-loop system response
-                'm_respo' :   list(y)  # Open-loop model-system response
+                'm_respo' :   y.tolist()  # Open-loop model-system response
         }
 
         return result
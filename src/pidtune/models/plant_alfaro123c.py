@@ -1,15 +1,164 @@
+from typing import Optional
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import control as ctl
-import scipy.signal as signal
-from io import StringIO
 from scipy.signal import savgol_filter
-from os import path
-from ..rules.usort import usort
-import hashlib
+from ..rules.usort import tune as usort_tune, to_controller as usort_controller
+from ..utils.vectUtils import FloatVector, asVector
+from ..utils.forcedResponse import forcedResponses
 
 
+class StepTestAnalysis():
+    '''
+    Object: StepTestAnalysis
+    Step test preprocessing shared by the Alfaro123c models, it
+    filters the input and output once and keeps the initial and
+    final values, the gain and the 25%, 50% and 75% response times.
+    FOPDT, SOPDT and overdamped models take it with analysis=
+    so a single pass serves all of them.
+    '''
+    # Savitzky-Golay filter
+    FILTER_WINDOW = 51
+    FILTER_ORDER = 3
+
+    def __init__(self,
+                 time_vector : FloatVector = [],
+                 step_vector : FloatVector = [],
+                 resp_vector : FloatVector = [],
+                 ):
+        '''
+        Function: __init__
+        This function filters the input data and computes the
+        step test values the Alfaro123c models are built on.
+        '''
+        self.t = asVector(time_vector)
+        self.u = asVector(step_vector)
+        self.y = asVector(resp_vector)
+
+        if not (len(self.t) == len(self.u) == len(self.y)):
+            raise ValueError("Vectors need to keep the same length")
+        if len(self.t) < self.FILTER_WINDOW:
+            raise ValueError(f"Step test needs at least {self.FILTER_WINDOW} samples")
+
+        # Filtered input and output and their derivatives
+        self.filtered_input = savgol_filter(self.u, window_length=self.FILTER_WINDOW, polyorder=self.FILTER_ORDER, deriv=0)
+        self.input_derivative = np.abs(np.gradient(self.filtered_input, self.t))
+        self.filtered_output = savgol_filter(self.y, window_length=self.FILTER_WINDOW, polyorder=self.FILTER_ORDER, deriv=0)
+        self.output_derivative = np.abs(np.gradient(self.filtered_output, self.t))
+
+        ## Output initial and final values, 5% band around the filtered extremes
+        self.Yi, self.Yf, self.increasing = self.steady_values(
+            self.y, self.filtered_output, np.argmax(self.output_derivative), 0.05)
+
+        ## Input initial and final values, 10% band around the filtered extremes
+        self.Ui, self.Uf, _ = self.steady_values(
+            self.u, self.filtered_input, np.argmax(self.filtered_input), 0.1)
+
+        self.response_change = self.Yf - self.Yi
+        self.step_change = self.Uf - self.Ui
+        self.dc_gain = (self.response_change/self.step_change).item()
+
+        # The input changes where its derivative is max
+        self.input_change_time = self.t[np.argmax(self.input_derivative)]
+
+        ## Last times the filtered response is before the 25%, 50% and 75% of its change
+        self.response_at_25percent_time = self.response_time(0.25)
+        self.response_at_50percent_time = self.response_time(0.50)
+        self.response_at_75percent_time = self.response_time(0.75)
+
+        ## Input changes held from the first one, input vector for the simulations
+        change = np.diff(self.u, prepend=self.u[0])
+        changed = np.flatnonzero(change)
+        if len(changed):
+            last_change = np.maximum.accumulate(np.where(change != 0, np.arange(len(change)), 0))
+            self.input_simulation = change[last_change]
+        else:
+            self.input_simulation = np.full(len(change), np.nan)
+
+        # Model responses to the input changes, by model
+        self._responses = {}
+
+    @staticmethod
+    def steady_values(vector, filtered, split_index, band):
+        '''
+        Function: steady_values
+        This function splits the vector at split_index (the sample
+        is on both sides) and returns the mean of the samples inside
+        the band at each side of the filtered range, and whether the
+        signal is increasing.
+        '''
+        before = vector[:split_index+1]
+        after = vector[split_index:]
+
+        maximum = np.max(filtered)
+        minimum = np.min(filtered)
+        delta = band*(maximum - minimum)
+
+        increasing = np.mean(before) < np.mean(after)
+        if increasing:
+            initial = before[before < minimum + delta]
+            final = after[after > maximum - delta]
+        else:
+            initial = before[before > maximum - delta]
+            final = after[after < minimum + delta]
+
+        return np.mean(initial), np.mean(final), increasing
+
+    def forced_responses(self, models: list) -> list:
+        '''
+        Function: forced_responses
+        This function returns the responses to the input changes of
+        the (dc_gain, time_constant, a) models dc_gain/((T*s + 1)(a*T*s + 1)).
+        The models not simulated yet are convolved with the input
+        in a single FFT pass and kept, non uniform time vectors fall
+        back to control.forced_response.
+        '''
+        missing = list(dict.fromkeys(model for model in models if model not in self._responses))
+        if missing:
+            responses = forcedResponses(self.t, self.input_simulation, *zip(*missing))
+            if responses is None:
+                import control as ctl
+                responses = [
+                    ctl.forced_response(
+                        ctl.tf([K], np.trim_zeros(np.polymul([T, 1], [a*T, 1]), 'f')),
+                        self.t, self.input_simulation)[1]
+                    for K, T, a in missing
+                ]
+            self._responses.update(zip(missing, responses))
+        return [self._responses[model] for model in models]
+
+    def response_time(self, fraction: float):
+        '''
+        Function: response_time
+        This function returns the last time the filtered response
+        is before the fraction of its change, measured from the
+        input change time.
+        '''
+        if self.increasing:
+            level = self.Yi + self.response_change*fraction
+            # Suffix minimum is sorted, the last sample under the level
+            # is the last position where the suffix minimum is too
+            suffix = np.minimum.accumulate(self.filtered_output[::-1])[::-1]
+            index = np.searchsorted(suffix, level, side='left') - 1
+        else:
+            level = self.Yi - abs(self.response_change)*fraction
+            suffix = np.maximum.accumulate(self.filtered_output[::-1])[::-1]
+            index = np.searchsorted(-suffix, -level, side='left') - 1
+
+        if index < 0:
+            return np.float64(np.nan)
+        return self.t[index] - self.input_change_time
+
+def overdamped_parameters(t25, t50, t75) -> tuple:
+    '''
+    Function: overdamped_parameters
+    This function returns the 'a' time constant, the time constant
+    and the dead time (0 when negative) of the overdamped model from
+    the 25%, 50% and 75% response times.
+    '''
+    a = (-0.6240*t25 + 0.9866*t50 -0.3626*t75)/(0.3533*t25 - 0.7036*t50 + 0.3503*t75)
+    time_constant = (t75-t25)/(0.9866 + 0.7036*a)
+    dead_time = t75 - (1.3421 + 1.3455*a)*time_constant
+    return a, time_constant.item(), max(dead_time.item(), 0)
+
 class Alfaro123c(): 
     '''
     Object: Alfaro123c
@@ -18,13 +167,15 @@ class Alfaro123c():
     the parameters for the respective models.    
     '''
     def __init__(self, 
-                 time_vector : list = [],
-                 step_vector : list = [],
-                 resp_vector : list = [],
+                 time_vector : FloatVector = [],
+                 step_vector : FloatVector = [],
+                 resp_vector : FloatVector = [],
 
                  time_constant: float = 0,         # Main time constant (T)
                  dc_gain: float = 0, # Gain               (K)
                  dead_time: float = 0,    # Dead time          (L)
+
+                 analysis: Optional[StepTestAnalysis] = None, # Preprocessed step test
                  ):
         '''
         Function: __init__
@@ -45,7 +196,7 @@ class Alfaro123c():
                 raise ValueError("Plant model wrong input values")
 
         else:
-            if not (len(time_vector) and len(step_vector) and len(resp_vector)):
+            if analysis is None and not (len(time_vector) and len(step_vector) and len(resp_vector)):
                 raise ValueError("Plant model wrong input values, no vectors or constants")
 
         # Variables to store response value at time points of interest
@@ -67,8 +218,10 @@ class Alfaro123c():
         self.dc_gain : float = 0 # Final model DC Gain
         self.a_constant_time : float = 0
 
-        # Create a dataframe with the input vector
-        df = pd.DataFrame({'Tiempo': time_vector, 'Entrada': step_vector, 'Salida': resp_vector})
+        # Step test preprocessing, shared by the models when given
+        if analysis is None:
+            analysis = StepTestAnalysis(time_vector, step_vector, resp_vector)
+        self.analysis = analysis
 
         # FOPDT values
         a_FOPDT = 0.9102
@@ -78,169 +231,17 @@ class Alfaro123c():
         a_SOPDT = 0.5776
         b_SOPDT = 1.5552
 
-        # Calculates Input derivative
-        filter_input = savgol_filter(df['Entrada'], window_length=51, polyorder=3, deriv=0)
-        derivada_input = np.abs(np.gradient(filter_input, df['Tiempo']))
-        df['Input_Derivative'] = derivada_input
-
-        # Filtered plant response
-        filter_output =  savgol_filter(df['Salida'], window_length=51, polyorder=3, deriv=0)
-
-        # Calculates Output derivative
-        df['Filtered'] = filter_output # Stores new vector with the output filtered
-        derivada_output = np.abs(np.gradient(filter_output, df['Tiempo']))
-        df['Output_Derivative'] = derivada_output
-        
-
-        # Calculates the 5% of the response change using the filtered output
-        delta_output = np.subtract(np.max(filter_output, axis=0), np.min(filter_output, axis=0))
-        outputChange_5percent = np.multiply(0.05, delta_output) # Gets the 'Delta Y' 5%
-
-        # Gets the index of the max value
-        max_value_output_index =  np.where(derivada_output == np.max(derivada_output, axis=0))[0][0]
-
-        # Save the max and min value of the filtered response
-        maxim_output = np.max(filter_output, axis=0)
-        min_output = np.min(filter_output, axis=0)
-        
-        # Separates the output vector, before and after the maxim value
-        before_transient_response = df.loc[:max_value_output_index]
-        after_transient_response = df.loc[max_value_output_index:]
-
-        # Define the vector with only the output values
-        before_transient_response = before_transient_response['Salida']
-        after_transient_response = after_transient_response['Salida']
-
-        ### Verify if the signal is Increasing or decreasing
-        if np.mean(before_transient_response) < np.mean(after_transient_response):
-            ## If the mean of the first values is less than the mean of the last values
-            ## the signal is Increasing
-
-            # Values less than 5% of the output change magnitude
-            valores_iniciales_estables = before_transient_response[ before_transient_response < (min_output + outputChange_5percent ) ]
-
-            # Values greater than the 95% of the output change magnitude
-            valores_finales_estables = after_transient_response[ after_transient_response > (maxim_output - outputChange_5percent ) ]
-
-        else:
-            # Decreasing signal
-
-            # Values greater than the 95% of the output change magnitude
-            valores_finales_estables = after_transient_response[ after_transient_response < (min_output + outputChange_5percent ) ]
-
-            # Values less than 5% of the output change magnitude
-            valores_iniciales_estables = before_transient_response[ before_transient_response > (maxim_output - outputChange_5percent ) ]
-
         # Output first and last values
-        self.Yf = np.mean(valores_finales_estables)
-        self.Yi = np.mean(valores_iniciales_estables)
-
-        #Calculates change of the system response 
-        SystemResponse_change = self.Yf - self.Yi
-        SystemResponse_change = SystemResponse_change.item()
-
-        #Input change#
-        #Calculates the min and max point of the filtered input vector
-        maxim_input = np.max(filter_input, axis=0)
-        min_input = np.min(filter_input, axis=0)
-
-        #Looks for the input max value index
-        max_value_input_index = np.where(filter_input == np.max(filter_input, axis=0))[0][0]
-
-        #Divides the input vector into, before and after the maximun value
-        before_max_Input = df.loc[:max_value_input_index]
-        after_max_Input = df.loc[max_value_input_index:]
-        before_max_Input = before_max_Input['Entrada']
-        after_max_Input = after_max_Input['Entrada']
-
-        #Calculates the 10% of the input vector change
-        delta_input = np.subtract(np.max(filter_input, axis=0), np.min(filter_input, axis=0))
-        InputChange_10percent = np.multiply(0.1, delta_input) # Gets the 'Delta Y' 10%
-
-        ### Verify if the signal is increasing or decreasing
-        if np.mean(before_max_Input) < np.mean(after_max_Input):
-            ## If the mean of the first values is less than the mean of the last values
-            ## then the signal is Increasing
-
-            # Values less than 10% of the output change magnitude
-            valores_iniciales_estables_input = before_max_Input[ before_max_Input < (min_input + InputChange_10percent ) ]
-
-            # Values greater than the 90% of the output change magnitude
-            valores_finales_estables_input = after_max_Input[ after_max_Input > (maxim_input - InputChange_10percent ) ]
-
-        else:
-            # Decreasing signal
-
-            # # Values of the input less than 90% of the output change magnitude
-            valores_finales_estables_input = after_transient_response[ after_max_Input < (min_input + InputChange_10percent ) ]
-
-            # Values of the input greater than the 10% of the output change magnitude
-            valores_iniciales_estables_input = before_transient_response[ before_max_Input > (maxim_output - InputChange_10percent ) ]
-        
-        #Calculates the mean of the first and last values
-        Uf = np.mean(valores_finales_estables_input)
-        Ui = np.mean(valores_iniciales_estables_input)
-
-        #Calculate input change
-        systemStep_change = Uf - Ui
+        self.Yf = analysis.Yf
+        self.Yi = analysis.Yi
 
         #Calculate dc_gain
-        self.dc_gain = SystemResponse_change/systemStep_change
-        self.dc_gain =self.dc_gain
+        self.dc_gain = analysis.dc_gain
 
-        #Uses the derivatives's max value to find the time point when input changes
-        input_change = df.loc[[df['Input_Derivative'].idxmax()]]
-        input_change_time = input_change['Tiempo'].max()
-        
-        # Absolute value of the system response change 
-        SystemResponse_change_positivo = abs(SystemResponse_change)
-
-        # Increasing case
-        if np.mean(before_transient_response) < np.mean(after_transient_response):
-
-            #FOPDT
-            #Retrieves t25
-            porcent25 = SystemResponse_change * 0.25    #Gets the 25% of the response magnitude
-            p25 = self.Yi + porcent25                        #Add the 25% to the first value, to have the 25% in terms of the response
-            puntos25 = df[df['Filtered'] < p25]           #Select all the values before the 25%
-            self.response_at_25percent_time = puntos25['Tiempo'].max(numeric_only = True)  #Retrieves the last value before 25%
-            self.response_at_25percent_time = self.response_at_25percent_time - input_change_time  #Substract the initial time to the time found in order to have the time to reaches the 25% of the response
-            
-            #Retrieves t75
-            porcent75 = SystemResponse_change * 0.75     #Gets the 75% of the response magnitude
-            p75 = self.Yi + porcent75         #Add the 75% to the first value, to have the 75% in terms of the response
-            puntos75 = df[df['Filtered'] < p75]            #Select all the values before the 75%
-            self.response_at_75percent_time = puntos75['Tiempo'].max()  #Retrieves the last value before 75%
-            self.response_at_75percent_time = self.response_at_75percent_time - input_change_time #Substract the initial time to the time found in order to have the time to reaches the 75% of the response
-            
-            #Retrieves t50
-            porcent50 = SystemResponse_change * 0.50        #Gets the 50% of the response magnitude
-            p50 = self.Yi + porcent50            #Add the 50% to the first value, to have the 50% in terms of the response
-            puntos50 = df[df['Filtered'] < p50]               #Select all the values before the 50%
-            self.response_at_50percent_time = puntos50['Tiempo'].max()  #Retrieves the last value before 50%
-            self.response_at_50percent_time = self.response_at_50percent_time - input_change_time #Substract the initial time to the time found in order to have the time to reaches the 50% of the response
-        
-        else:
-            # Decreasing case 
-            #Retrieves t25
-            porcent25 = SystemResponse_change_positivo * 0.25 #Gets the 25% of the response magnitude
-            p25 = self.Yi - porcent25                             #Add the 25% to the first value, to have the 25% in terms of the response
-            puntos25 = df[df['Filtered'] > p25]                #Select all the values before the 25%
-            self.response_at_25percent_time = puntos25['Tiempo'].max()#Retrieves the last value before 25%
-            self.response_at_25percent_time = self.response_at_25percent_time - input_change_time #Substract the initial time to the time found in order to have the time to reaches the 25% of the response
-            
-            porcent75 = SystemResponse_change_positivo * 0.75 #Gets the 75% of the response magnitude
-            p75 = self.Yi - porcent75            #Add the 75% to the first value, to have the 75% in terms of the response
-            puntos75 = df[df['Filtered'] > p75]  #Select all the values before the 75%
-            self.response_at_75percent_time = puntos75['Tiempo'].max()  #Retrieves the last value before 75%
-            self.response_at_75percent_time = self.response_at_75percent_time - input_change_time  #Substract the initial time to the time found in order to have the time to reaches the 75% of the response
-
-            #Retrieves t50
-            porcent50 = SystemResponse_change_positivo * 0.50  #Gets the 50% of the response magnitude
-            p50 = self.Yi - porcent50            #Add the 50% to the first value, to have the 50% in terms of the response
-            puntos50 = df[df['Filtered'] > p50]        #Select all the values before the 50%
-            self.response_at_50percent_time = puntos50['Tiempo'].max() #Retrieves the last value before 50%
-            self.response_at_50percent_time = self.response_at_50percent_time - input_change_time  #Substract the initial time to the time found in order to have the time to reaches the 50% of the response
+        # Times to reach the 25%, 50% and 75% of the response
+        self.response_at_25percent_time = analysis.response_at_25percent_time
+        self.response_at_50percent_time = analysis.response_at_50percent_time
+        self.response_at_75percent_time = analysis.response_at_75percent_time
 
         # Calculate FOPDT parameters 
         self.FOPDT_time_constant = a_FOPDT*(self.response_at_75percent_time - self.response_at_25percent_time)
@@ -262,58 +263,44 @@ class Alfaro123c():
         
         self.SOPDT_time_constant = self.SOPDT_time_constant.item()
 
-
-
-
         # Simulation
-        # Time vector to simulate the system
-        self.t_simulation = df['Tiempo'].values
-
-        # Input and output vector to simulate the system
-        self.u_simulation = df['Entrada'].values
-
-        # Input vector for the simulation
-        # Looks for the diference between consecutive positions
-        # Adds an input simulation vector "Cambio" that contains tha magnitude of the input changes
-        df['Cambio'] = df['Entrada'].diff().fillna(0)
-
-        # Finds the first non zero value
-        first_non_zero = df['Cambio'].ne(0).idxmax()
-
-        # Replace the non useful values by NaN
-        df.loc[first_non_zero:, 'Cambio'] = np.where(df.loc[first_non_zero:, 'Cambio'] == 0, np.nan, df.loc[first_non_zero:, 'Cambio'])
-
-        # Fill NaN values with the last valid value
-        df['Cambio'].fillna(method='ffill', inplace=True)
-
-        self.input_simulation = df['Cambio'].values
-
-        # Output vector
-        self.y_sys_simulation = df['Salida'].values
-
-        #FOPDT Simulation
-        # Define numerator and denominator to the transfer function without deadtime
-        num = [self.dc_gain]  # Numerator
-        den = [self.FOPDT_time_constant, 1]  # Denominator
-
-        # Define transfer function
-        tf_FOPDT = ctl.tf(num, den)
-        
-        # Simulate the FOPDT model response to the input vector
-        self.t_out_model_simulation, self.youtFOPDT_simulation = ctl.forced_response(tf_FOPDT, self.t_simulation, self.input_simulation)
-
-        # SOPDT parameters and vectors
-        a_SOPDT = self.SOPDT_time_constant
-        num_SOPDT = [self.dc_gain]
-        den_SOPDT = [a_SOPDT*a_SOPDT, 2*a_SOPDT, 1]
+        # Time, input and output vectors to simulate the system
+        self.t_simulation = analysis.t
+        self.u_simulation = analysis.u
+        self.input_simulation = analysis.input_simulation
+        self.y_sys_simulation = analysis.y
+
+    def candidate_models(self) -> list:
+        '''
+        Function: candidate_models
+        This function returns the (dc_gain, time_constant, a) of the
+        FOPDT, SOPDT and overdamped models, the last one only when
+        its 'a' time constant is valid, to simulate them at once.
+        '''
+        models = [(self.dc_gain, self.FOPDT_time_constant, 0.0),
+                  (self.dc_gain, self.SOPDT_time_constant, 1.0)]
+        a, time_constant, _ = overdamped_parameters(self.response_at_25percent_time,
+                                                    self.response_at_50percent_time,
+                                                    self.response_at_75percent_time)
+        if 0 <= a <= 1:
+            models.append((self.dc_gain, time_constant, a))
+        return models
+
+    def simulate(self, time_constant: float, a_constant_time: float):
+        '''
+        Function: simulate
+        This function simulates the dc_gain/((T*s + 1)(a*T*s + 1))
+        model response to the input changes and returns the time and
+        output vectors. The candidate models are simulated with it
+        on the shared analysis, so the other models reuse them.
+        '''
+        model = (self.dc_gain, time_constant, a_constant_time)
+        models = self.candidate_models()
+        if model not in models:
+            models.append(model)
+        responses = self.analysis.forced_responses(models)
+        return self.t_simulation, responses[models.index(model)]
 
-        # Define transfer function
-        tf_SOPDT = ctl.tf(num_SOPDT, den_SOPDT)
-
-        # Simulation of the SOPDT model response to the input vector
-        self.t_out_model_simulation, self.youtSOPDT_simulation = ctl.forced_response(tf_SOPDT, self.t_simulation,  self.input_simulation)
-        
-        
     def toDict(self):
             '''
             Function: toDict
@@ -327,38 +314,26 @@ class Alfaro123c():
                 'L'     : self.dead_time,
                 'a'     : self.a_constant_time
             }
-            print(json)
             return json
     
-    def tune_controllers(self): 
+    def tune_controllers(self, decimals: Optional[int] = None): 
         '''
         Function: tune_controllers
-        This function executes four nested for loops to
-        go trough each possibility of controller for each
-        control mode, controller type, MS value, and degree of freedom.
-        This function calls the main function of USORT tunning on each iteration
-        and calculates and returns the possible tunned models.
+        This function tunes at once each possibility of controller
+        for each control mode, controller type, MS value, and degree
+        of freedom with the vectorized USORT rule, and returns the
+        possible tunned models out of the valid ones. The normalized
+        tuning is memoized, decimals rounds its (a, Tao) key.
         '''
-        rule = usort()
-
         controllers = list()
 
-        for control_mode in ["Regulatory", "Servo"]:
-            for controller_type in ["PI", "PID"]:
-                for ms_key in ["MS14", "MS16", "MS18", "MS2"]:
-                    for DoF in [1, 2]:
-                        try:
-                            controller = rule.get_value(control_mode, 
-                                           controller_type, 
-                                           constant_a = self.a_constant_time, 
-                                           ms_key = ms_key, 
-                                           time_constant = self.time_constant, 
-                                           dc_gain = self.dc_gain, 
-                                           dead_time = self.dead_time, 
-                                           DoF =  DoF)
-                            controllers.append(controller)
-                        except Exception as e:
-                            print(e)
+        for row in usort_tune(self.a_constant_time,
+                              self.time_constant,
+                              self.dc_gain,
+                              self.dead_time,
+                              decimals):
+            if row['valid']:
+                controllers.append(usort_controller(row))
         return controllers
     
 
@@ -369,9 +344,10 @@ class FOPDT(Alfaro123c):
     order plus dead time model.
     '''
     def __init__(self, 
-                time_vector : list = [],
-                step_vector : list = [],
-                resp_vector : list = [],
+                time_vector : FloatVector = [],
+                step_vector : FloatVector = [],
+                resp_vector : FloatVector = [],
+                analysis : Optional[StepTestAnalysis] = None,
                 ):
         '''
         Function: __init__
@@ -383,11 +359,14 @@ class FOPDT(Alfaro123c):
         self.FOPDT_time_constant : float = 0
         self.FOPDT_dead_time : float = 0
         self.youtFOPDT_simulation : list = [] # FOPDT model simulated
-        super().__init__(time_vector, step_vector, resp_vector)
+        super().__init__(time_vector, step_vector, resp_vector, analysis=analysis)
 
         self.a_constant_time = 0
         self.dead_time = self.FOPDT_dead_time
         self.time_constant = self.FOPDT_time_constant
+
+        # Simulate the FOPDT model response to the input vector
+        self.t_out_model_simulation, self.youtFOPDT_simulation = self.simulate(self.FOPDT_time_constant, 0.0)
         
 
     def simulation(self):
@@ -396,6 +375,7 @@ class FOPDT(Alfaro123c):
         This function take the vectors with the model simulated
         and prints the respective behavior for FOPDT.
         '''
+        import matplotlib.pyplot as plt # Only needed to plot
         plt.figure()
         plt.plot([x + self.dead_time for x in self.t_out_model_simulation], self.youtFOPDT_simulation+self.Yi, label='Model response')
         plt.plot(self.t_simulation, self.u_simulation, label='Input')
@@ -436,6 +416,7 @@ class FOPDT(Alfaro123c):
         den = [self.FOPDT_time_constant, 1]  # Denominator
 
         # Define transfer function
+        import control as ctl
         tf_FOPDT = ctl.tf(num, den)
         return tf_FOPDT
             
@@ -447,10 +428,10 @@ class FOPDT(Alfaro123c):
         a dictionary to return it as a response output.
         '''
         result = {
-            'time'    :   self.t_out_model_simulation,       # Time vector
-            'step'    :   self.u_simulation,       # Step vector
-            'respo'   :   self.y_sys_simulation,       # Open-loop system response
-            'm_respo' :   self.youtFOPDT_simulation  # Open-loop model-system response
+            'time'    :   self.t_out_model_simulation.tolist(),       # Time vector
+            'step'    :   self.u_simulation.tolist(),       # Step vector
+            'respo'   :   self.y_sys_simulation.tolist(),       # Open-loop system response
+            'm_respo' :   self.youtFOPDT_simulation.tolist()  # Open-loop model-system response
         }
         return result
             
@@ -461,9 +442,10 @@ class SOPDT(Alfaro123c):
     order plus dead time model.
     '''
     def __init__(self, 
-                time_vector : list = [],
-                step_vector : list = [],
-                resp_vector : list = [],
+                time_vector : FloatVector = [],
+                step_vector : FloatVector = [],
+                resp_vector : FloatVector = [],
+                analysis : Optional[StepTestAnalysis] = None,
                 ):
         '''
         Function: __init__
@@ -475,18 +457,22 @@ class SOPDT(Alfaro123c):
         self.SOPDT_time_constant : float = 0
         self.SOPDT_dead_time : float = 0
         self.youtSOPDT_simulation : list = [] # SOPDT model simulated
-        super().__init__(time_vector, step_vector, resp_vector)
+        super().__init__(time_vector, step_vector, resp_vector, analysis=analysis)
 
         self.a_constant_time = 1
         self.dead_time = self.SOPDT_dead_time
         self.time_constant = self.SOPDT_time_constant
 
+        # Simulation of the SOPDT model response to the input vector
+        self.t_out_model_simulation, self.youtSOPDT_simulation = self.simulate(self.SOPDT_time_constant, 1.0)
+
     def simulation_SOPDT(self):
         '''
         Function: simulation_SOPDT
         This function take the vectors with the model simulated
         and prints the respective behavior for SOPDT.
         '''
+        import matplotlib.pyplot as plt # Only needed to plot
         plt.figure()
         plt.plot([x + self.dead_time for x in self.t_out_model_simulation], self.youtSOPDT_simulation+self.Yi, label='Model response')
         plt.plot(self.t_simulation, self.u_simulation, label='Input')
@@ -519,6 +505,7 @@ class SOPDT(Alfaro123c):
         a_SOPDT = self.SOPDT_time_constant
         num_SOPDT = [self.dc_gain]
         den_SOPDT = [a_SOPDT*a_SOPDT, 2*a_SOPDT, 1]
+        import control as ctl
         tf_SOPDT = ctl.tf(num_SOPDT, den_SOPDT)
 
         return tf_SOPDT
@@ -530,10 +517,10 @@ class SOPDT(Alfaro123c):
         a dictionary to return it as a response output.
         '''
         result = {
-            'time'    :   self.t_out_model_simulation,       # Time vector
-            'step'    :   self.u_simulation,       # Step vector
-            'respo'   :   self.y_sys_simulation,       # Open-loop system response
-            'm_respo' :   self.youtSOPDT_simulation  # Open-loop model-system response
+            'time'    :   self.t_out_model_simulation.tolist(),       # Time vector
+            'step'    :   self.u_simulation.tolist(),       # Step vector
+            'respo'   :   self.y_sys_simulation.tolist(),       # Open-loop system response
+            'm_respo' :   self.youtSOPDT_simulation.tolist()  # Open-loop model-system response
         }
         return result
             
@@ -544,9 +531,10 @@ class overdamped(Alfaro123c):
     model.
     '''
     def __init__(self, 
-                time_vector : list = [],
-                step_vector : list = [],
-                resp_vector : list = [],
+                time_vector : FloatVector = [],
+                step_vector : FloatVector = [],
+                resp_vector : FloatVector = [],
+                analysis : Optional[StepTestAnalysis] = None,
                 ):
         '''
         Function: __init__
@@ -558,22 +546,14 @@ class overdamped(Alfaro123c):
         # FOPDT constants
         self.overdamped_time_constant : float = 0
         self.overdamped_dead_time : float = 0
-        super().__init__(time_vector, step_vector, resp_vector)
+        super().__init__(time_vector, step_vector, resp_vector, analysis=analysis)
 
-        self.a_constant_time = (-0.6240*self.response_at_25percent_time + 0.9866*self.response_at_50percent_time -0.3626*self.response_at_75percent_time)/(0.3533*self.response_at_25percent_time - 0.7036*self.response_at_50percent_time + 0.3503*self.response_at_75percent_time)
         # Calculate Overdamped parameters 
-        self.overdamped_time_constant = (self.response_at_75percent_time-self.response_at_25percent_time)/(0.9866 + 0.7036*self.a_constant_time)
-        self.L_overdamped = self.response_at_75percent_time - (1.3421 + 1.3455*self.a_constant_time)*self.overdamped_time_constant
-        
-        if(self.L_overdamped.item() < 0):   #If FOPDT_dead_time is < 0, FOPDT_dead_time = 0
-            self.L_overdamped = 0
-        else:
-            self.L_overdamped = self.L_overdamped.item()
+        self.a_constant_time, self.overdamped_time_constant, self.L_overdamped = overdamped_parameters(
+            self.response_at_25percent_time,
+            self.response_at_50percent_time,
+            self.response_at_75percent_time)
 
-        print(self.L_overdamped)
-        print(self.a_constant_time)
-        
-        self.overdamped_time_constant = self.overdamped_time_constant.item()
         if self.a_constant_time > 1 or self.a_constant_time < 0:
             raise ValueError(f"Model for this value of 'a' time constant not found. Valid values are: 0 < a < 1")
 
@@ -581,14 +561,9 @@ class overdamped(Alfaro123c):
         self.dead_time = self.overdamped_dead_time
         self.time_constant = self.overdamped_time_constant
         
-        #Overdamped parameters and vectors
-        Tao3 = self.overdamped_time_constant
-        num_overdamped = [self.dc_gain]
-        den_overdamped = [Tao3*Tao3*self.a_constant_time, Tao3*self.a_constant_time + Tao3, 1]
-        tf_overdamped = ctl.tf(num_overdamped, den_overdamped)
-        
         # Simulation od the overdamped model response to the input vector
-        self.t_out_model_simulation, self.youtOverdamped_simulation = ctl.forced_response(tf_overdamped, self.t_simulation,  self.input_simulation)
+        self.t_out_model_simulation, self.youtOverdamped_simulation = self.simulate(
+            self.overdamped_time_constant, self.a_constant_time)
 
     def simulation_overdamped(self):
         '''
@@ -596,6 +571,7 @@ class overdamped(Alfaro123c):
         This function take the vectors with the model simulated
         and prints the respective behavior for overdamped.
         '''
+        import matplotlib.pyplot as plt # Only needed to plot
         plt.figure()
         plt.plot([x + self.dead_time for x in self.t_out_model_simulation], self.youtOverdamped_simulation+self.Yi, label='Model response')
         plt.plot(self.t_simulation, self.u_simulation, label='Input')
@@ -633,6 +609,7 @@ class overdamped(Alfaro123c):
         Tao3 = self.time_constant
         num_overdamped = [self.dc_gain]
         den_overdamped = [Tao3*Tao3*self.a_constant_time, Tao3*self.a_constant_time + Tao3, 1]
+        import control as ctl
         tf_overdamped = ctl.tf(num_overdamped, den_overdamped)
 
         return tf_overdamped
@@ -644,10 +621,10 @@ class overdamped(Alfaro123c):
         a dictionary to return it as a response output.
         '''
         result = {
-            'time'    :   self.t_out_model_simulation,       # Time vector
-            'step'    :   self.u_simulation,       # Step vector
-            'respo'   :   self.y_sys_simulation,       # Open-loop system response
-            'm_respo' :   self.youtOverdamped_simulation  # Open-loop model-system response
+            'time'    :   self.t_out_model_simulation.tolist(),       # Time vector
+            'step'    :   self.u_simulation.tolist(),       # Step vector
+            'respo'   :   self.y_sys_simulation.tolist(),       # Open-loop system response
+            'm_respo' :   self.youtOverdamped_simulation.tolist()  # Open-loop model-system response
         }
         return result
     
@@ -1,8 +1,13 @@
-from typeguard import typechecked
+from ..debug import typechecked
 from . import controller as cnt, plant as pln
+from ..utils.loopSimulator import LoopSimulator, controllerSS
+from ..utils.grunwaldLetnikov import GrunwaldLetnikov
+from .. import cache as _cache
 import numpy as np
-from control import step_response as step, tf
-from control.matlab import pade, lsim
+from control import ss
+
+engines = ('oustaloup', 'grunwald_letnikov') # Closed-loop simulation engines
+KEY_DIGITS = 12 # Significant digits of the normalized loop cache keys
 
 class OpenLoop ():
     pass
@@ -14,6 +19,8 @@ class ClosedLoop ():
             controller: cnt.Controller,
             plant: pln.FractionalOrderModel ## TODO generic plant
     ):
+        if not (isinstance(controller, cnt.Controller) and isinstance(plant, pln.FractionalOrderModel)):
+            raise ValueError("Closed loop wrong input values")
 
         self.controller = controller
         self.plant = plant
@@ -21,104 +28,191 @@ class ClosedLoop ():
     def step_response(
             self,
             servo_magnitude: float = 1.0,
-            disturbance_magnitude: float = 0.1
+            disturbance_magnitude: float = 0.1,
+            engine: str = 'oustaloup',
+            cache: bool = False
     ):
-        ctl_tf = self.controller.tf()
-        pln_tf = self.plant.tf()
+        """ Servo and regulatory step responses, the dead time is simulated
+        exactly by a delay line over a fixed step of L/50. With cache the
+        normalized loop response is reused, see ClosedLoopBatch.
+
+        :returns: The time, servo and regulatory responses arrays and the
+        servo and regulatory IAE
+        :rtype: tuple
+        """
+        ts, ys, ys_reg, IAE, IAE_reg = ClosedLoopBatch(
+            [self.controller],
+            self.plant
+        ).step_response(servo_magnitude, disturbance_magnitude, engine, cache)
+
+        return ts, ys[:, 0], ys_reg[:, 0], IAE[0], IAE_reg[0]
+
+    def toResponse(
+            self,
+            servo_magnitude: float = 1.0,
+            disturbance_magnitude: float = 0.1,
+            cache: bool = False
+    ):
+        """ step_response with the vectors as lists, JSON serializable
+        """
+        ts, ys, ys_reg, IAE, IAE_reg = self.step_response(
+            servo_magnitude, disturbance_magnitude, cache=cache)
 
-        ## Define pade delay order 4
-        pade_delay_cf = pade(
-            self.plant.toDict()['L'],
-            4 # Order
+        ## Return full time vector, full yout vector
+        return (
+            ts.tolist(), # time vector
+            ys.tolist(), # Y vector
+            ys_reg.tolist(), # Y vector
+            IAE,
+            IAE_reg
         )
-        pade_delay = tf(pade_delay_cf[0], pade_delay_cf[1])
-
-        ## ClosedLoop using PADE deadtime approximation
-        My_r = ctl_tf*pln_tf*pade_delay / ( 1 + ctl_tf*pln_tf*pade_delay )
-        My_d = pln_tf*pade_delay / ( 1 + ctl_tf*pln_tf*pade_delay )
-
-        ## Time vectorn and Y(s) vector
-        ts, xs = step(My_r)
-
-        ## If the simulation time is less than L, simulate again for a longer period
-        if (np.max(ts) < self.plant.L):
-            ts, xs = step(My_r, np.arange(0, 30 * self.plant.L, self.plant.L/10))
-
-        # ## If there are not stationary points in the vector, let's simulate for two times the previuos time
-        for j in range(4):
-            i = np.abs(np.subtract(xs, 1))
-            temporary = np.sum(np.array(i > 0.00005, dtype=int))
-            if (temporary < 0.9*len(i)):
-                break
-            ts, xs = step(My_r, np.arange(0, 2*ts[-1], self.plant.L/10)) # FIXME
-
-        ts = ts[:temporary] # Drop stationary data
-        xs = xs[:temporary]
-
-        ## Regulatory response
-        ts_reg, xs_reg = step(My_d, ts)
-
-        series = int(ts[-1]/self.plant.L)
-        L_shift_factor = 50
-        if series > 30:
-            series = 30
-
-        ts = ts[ts > series * self.plant.L] # Drop PADE transitory data
-        xs = xs[(len(xs)-len(ts)):]
-        xs_reg = xs_reg[(len(xs_reg)-len(ts)):]
-
-        ## Servo
-        series_t = np.arange(0, series * self.plant.L, self.plant.L/L_shift_factor, dtype=float)
-        series_y = np.full(len(series_t), 0.0, dtype=float)
-        y_temp = np.full(len(series_t), 1.0, dtype=float)
-
-
-        ## Regulatory first serie
-        y_temp_reg, l_time_reg, l_x0_reg = lsim(pln_tf, y_temp, series_t)
-        y_temp_reg = [0] * L_shift_factor + list(y_temp_reg[:len(y_temp_reg) -L_shift_factor])
-        series_y_reg = np.full(len(series_t), 0.0, dtype=float) ## Regulatory response
-        series_y_reg = np.add(series_y_reg, y_temp_reg)
 
-        for i in range(series):
-            # Servo
-            y_temp, l_time, l_x0 = lsim(ctl_tf*pln_tf, y_temp, series_t)
-            y_temp = [0] * L_shift_factor + list(y_temp[:len(y_temp) -L_shift_factor])
-
-            # Regulatory
-            y_temp_reg, l_time_reg, l_x0_reg = lsim(ctl_tf*pln_tf, y_temp_reg, series_t)
-            y_temp_reg = [0] * L_shift_factor + list(y_temp_reg[:len(y_temp_reg) -L_shift_factor])
-
-            if i%2:
-                series_y = np.subtract(series_y, y_temp)
-                series_y_reg = np.add(series_y_reg, y_temp_reg)
-            else:
-                series_y = np.add(series_y, y_temp)
-                series_y_reg = np.subtract(series_y_reg, y_temp_reg)
-
-        ## Concatenate servo
-        series_y = list(series_y) + list(xs)
-        series_y = np.multiply(servo_magnitude, series_y)
+class ClosedLoopBatch ():
+    """ Closed loops of a plant with each one of the controllers, all of
+    them simulated at once over a common time grid.
+    """
+    @typechecked
+    def __init__(
+            self,
+            controllers: list,
+            plant: pln.FractionalOrderModel ## TODO generic plant
+    ):
+        if not controllers:
+            raise ValueError("No controllers to evaluate")
+        if not (all(isinstance(controller, cnt.Controller) for controller in controllers)
+                and isinstance(plant, pln.FractionalOrderModel)):
+            raise ValueError("Closed loop wrong input values")
 
-        ## Concatenate disturbance
-        series_y_reg = list(series_y_reg) + list(xs_reg)
-        series_y_reg = np.multiply(disturbance_magnitude, series_y_reg)
+        self.controllers = controllers
+        self.plant = plant
 
-        ## concatenate time
-        series_t = list(series_t) + list(ts)
+    def step_response(
+            self,
+            servo_magnitude: float = 1.0,
+            disturbance_magnitude: float = 0.1,
+            engine: str = 'oustaloup',
+            cache: bool = False
+    ) -> tuple:
+        """ Servo and regulatory step responses of every closed loop. The
+        'oustaloup' engine simulates the plant.tf() state space, the
+        'grunwald_letnikov' one the exact fractional order plant, see
+        utils.grunwaldLetnikov.
+
+        With cache, the unit responses of each normalized loop, see
+        normalized_loop, are kept on the pidtune.cache shared cache and
+        rescaled to the plant, only the loops not stored are simulated.
+        The 'oustaloup' engine then places the CRONE band on the normalized
+        time scale instead of the plant one.
+
+        :returns: The time vector, the (samples, controllers) servo and
+        regulatory responses matrices and the servo and regulatory IAE
+        vectors
+        :rtype: tuple
+        """
+        if engine not in engines:
+            raise ValueError("Unknown simulation engine {}, valid options are {}".format(engine, engines))
+
+        if cache:
+            ts, ys, IAE, IAE_reg = self._cached_responses(engine)
+        else:
+            ts, ys = self._simulate(engine, self.plant.K, self.plant.T, self.plant.L, self.plant.alpha, *(
+                [getattr(controller, field) for controller in self.controllers]
+                for field in ('kp', 'ti', 'td', 'filter_constant', 'action')
+            ))
+
+        series_y = np.multiply(servo_magnitude, ys[:, :, 0])
+        series_y_reg = np.multiply(disturbance_magnitude, ys[:, :, 1])
 
         ## Calculate IAE:
-        y_error =  np.abs(np.subtract(1, series_y))
-        IAE = np.trapz(y_error, series_t)
+        if not cache or servo_magnitude != 1:
+            y_error =  np.abs(np.subtract(1, series_y))
+            IAE = np.trapz(y_error, ts, axis=0)
 
         ## Calculate IAE_reg:
-        y_error =  np.abs(series_y_reg)
-        IAE_reg = np.trapz(y_error, series_t)
-
-        ## Return full time vector, full yout vector
-        return (
-            list(series_t), # time vector
-            list(series_y), # Y vector
-            list(series_y_reg), # Y vector
-            IAE,
-            IAE_reg
-        )
+        if cache:
+            IAE_reg = np.abs(disturbance_magnitude)*IAE_reg
+        else:
+            y_error =  np.abs(series_y_reg)
+            IAE_reg = np.trapz(y_error, ts, axis=0)
+
+        return ts, series_y, series_y_reg, IAE, IAE_reg
+
+    def _simulate(self, engine, K, T, L, alpha, kp, ti, td, filter_constant, action) -> tuple:
+        controllers_ss = controllerSS(kp, ti, td, filter_constant, action)
+        if engine == 'oustaloup':
+            sys = ss(pln.fractional_tf(K, T, alpha))
+            return LoopSimulator((sys.A, sys.B, sys.C, sys.D), L, controllers_ss).run()
+        return GrunwaldLetnikov(K, T, L, alpha).closed_loop(controllers_ss)
+
+    def _cached_responses(self, engine) -> tuple:
+        """ Unit servo and regulatory responses and IAE of every loop from
+        the normalized ones, the missing loops are simulated together
+        """
+        store = _cache.default_cache()
+        loops = [normalized_loop(controller, self.plant) for controller in self.controllers]
+        keys = [
+            _cache.cache_key(model='closed_loop', engine=engine,
+                             loop=[float('{:.{}g}'.format(x, KEY_DIGITS)) for x in loop])
+            for loop in loops
+        ]
+        entries = [store.get(key) for key in keys]
+
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+        if missing:
+            alpha, tao_o = loops[missing[0]][:2]
+            tn, yn = self._simulate(engine, 1.0, 1.0, tao_o, alpha, *(
+                [loops[i][field] for i in missing] for field in range(2, 6)), 1.0)
+            for j, i in enumerate(missing):
+                entries[i] = {
+                    'time'     : tn,
+                    'responses': yn[:, j],
+                    'IAE'      : (np.trapz(np.abs(1 - yn[:, j, 0]), tn),
+                                  np.trapz(np.abs(yn[:, j, 1]), tn)),
+                }
+                store.put(keys[i], entries[i])
+
+        ## Common grid, the settled responses hold their last value
+        tn = max((entry['time'] for entry in entries), key=len)
+        yn = np.stack([
+            np.concatenate((entry['responses'],
+                            np.repeat(entry['responses'][-1:], len(tn) - len(entry['time']), axis=0)))
+            for entry in entries], axis=1)
+
+        scale = np.power(self.plant.T, 1/self.plant.alpha)
+        ys = yn*np.array([1.0, self.plant.K])
+        IAE = scale*np.array([entry['IAE'][0] for entry in entries])
+        IAE_reg = scale*np.abs(self.plant.K)*np.array([entry['IAE'][1] for entry in entries])
+        return scale*tn, ys, IAE, IAE_reg
+
+    def robustness(self) -> np.ndarray:
+        """ Achieved Ms, gain and phase margins and crossover frequencies
+        of every loop, evaluated with the exact fractional order and delay
+        terms instead of plant.tf()
+
+        :returns: A robustness_dtype array, one row per controller
+        :rtype: numpy.ndarray
+        """
+        return cnt.ControllerSet.from_controllers(self.controllers).robustness(
+            self.plant.K, self.plant.T, self.plant.L, self.plant.alpha)
+
+def normalized_loop(controller, plant) -> tuple:
+    """ (alpha, tao_o, n_kp, n_ti, n_td, filter_constant) of a loop, with
+    the time normalized by T^(1/alpha) the closed loop only depends on them.
+    The servo response is the normalized one and the regulatory one is K
+    times it.
+    """
+    scale = np.power(plant.T, 1/plant.alpha)
+    return (
+        float(plant.alpha),
+        float(plant.L/scale),
+        float(controller.action*controller.kp*plant.K), # Loop gain
+        float(controller.ti/scale),
+        float(controller.td/scale),
+        float(controller.filter_constant),
+    )
+
+def plant_ss(plant) -> tuple:
+    """ State space (A, B, C, D) matrices of the plant without dead time
+    """
+    sys = ss(plant.tf())
+    return sys.A, sys.B, sys.C, sys.D
@@ -299,10 +299,17 @@ end
 
 ym=step(Gmo,tnorm);
 
-% send signals to stdout
 out = [tnorm unorm ynorm ym/Ko];
-for i = 1:length(out)
-  fprintf('result_signals\t%d\t%d\t%d\t%d\n',out(i,1),out(i,2),out(i,3),out(i,4));
+if exist('result_file', 'var')
+  % send signals as raw float64 columns
+  fid = fopen(result_file, 'w');
+  fwrite(fid, out, 'double');
+  fclose(fid);
+else
+  % send signals to stdout
+  for i = 1:length(out)
+    fprintf('result_signals\t%d\t%d\t%d\t%d\n',out(i,1),out(i,2),out(i,3),out(i,4));
+  end
 end
 
 %% Print optimal model JSON through STDOUT:
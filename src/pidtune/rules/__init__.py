@@ -1 +1,13 @@
-from . import frac_order
+""" Tuning rules, imported on first access like pidtune.models
+"""
+from importlib import import_module
+
+__all__ = ('frac_order', 'usort')
+
+def __getattr__(name):
+    if name in __all__:
+        return import_module('.' + name, __name__)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -2,7 +2,11 @@
 # TODO: quitar los raise, colocarlos donde corresponde
 
 import numpy as _np
+from functools import lru_cache
 from ..models.controller import Controller
+from ..utils.vectUtils import quantize
+
+CACHE_SIZE = 4096 # Normalized tunings kept by the (alpha, tao_o, Ms, ctype) LRU cache
 
 valid_controllers = ('PID', 'PI')
 valid_Ms          = ('1.4', '2.0')
@@ -433,6 +437,46 @@ PI_Ms_2_0 = {
     }
 }
 
+## Dense coefficient matrices for the batch tuning, one (alpha, coefficient)
+## matrix per (ctype, Ms) table, PI tables have no c coefficients and the
+## alpha rows out of the table range are NaN
+coefficients = ('a1', 'a2', 'a3', 'b1', 'b2', 'b3', 'b4', 'b5', 'c1', 'c2', 'c3', 'c4', 'c5')
+alpha_grid = _np.round(_np.arange(1.0, 1.85, 0.1), 1)
+
+def _pack_table (values_dict):
+    table = _np.full((len(alpha_grid), len(coefficients)), _np.nan)
+    for i, v in enumerate(alpha_grid):
+        if str(v) in values_dict:
+            table[i] = [ values_dict[str(v)].get(c, 0) for c in coefficients ]
+    return table
+
+@lru_cache(maxsize=None)
+def _packed_tables ():
+    # Packed on the first batch tuning
+    tables = _np.stack([
+        _pack_table(PID_Ms_1_4), # ('PID', '1.4')
+        _pack_table(PID_Ms_2_0), # ('PID', '2.0')
+        _pack_table(PI_Ms_1_4),  # ('PI', '1.4')
+        _pack_table(PI_Ms_2_0),  # ('PI', '2.0')
+    ])
+    tables.setflags(write=False)
+    return tables
+
+_alpha_max = _np.array([1.8, 1.6]) # PID, PI alpha range upper limit
+
+tuning_dtype = _np.dtype([
+    ('ctype', 'U3'),
+    ('Ms', 'U3'),
+    ('n_kp', 'f8'),
+    ('n_ti', 'f8'),
+    ('n_td', 'f8'),
+    ('kp', 'f8'),
+    ('ti', 'f8'),
+    ('td', 'f8'),
+    ('action', 'f8'),
+    ('valid', '?'),
+])
+
 def normalized_proportional_const (values_dict, v, tao_o):
     # param: in:  Values dict
     # param: in:  Fractional order
@@ -528,11 +572,43 @@ def normalized_differential_const (values_dict, v, tao_o):
     return result
 
 
-def tuning(alpha, T, K, L, Ms, ctype):
+@lru_cache(maxsize=CACHE_SIZE)
+def _normalized_tuning(alpha, tao_o, Ms, ctype):
+    """ Normalized (kappa_p, tao_i, tao_d) constants, the tuning only
+    depends on the plant gain and time constant by scaling
+    """
+    if Ms == '2.0':
+        values_dict = PID_Ms_2_0 if ctype == 'PID' else PI_Ms_2_0
+    else:
+        values_dict = PID_Ms_1_4 if ctype == 'PID' else PI_Ms_1_4
+
+    kappa_p = normalized_proportional_const(values_dict, alpha, tao_o)
+    tao_i = normalized_integral_const(values_dict, alpha, tao_o)
+    if ctype == 'PID':
+        tao_d = normalized_differential_const(values_dict, alpha, tao_o)
+    else:
+        tao_d = 0
+    return kappa_p, tao_i, tao_d
+
+def cache_info():
+    """ Hits, misses, maxsize and currsize of the tuning LRU cache
+    """
+    return _normalized_tuning.cache_info()
+
+def cache_clear():
+    _normalized_tuning.cache_clear()
+
+def tuning(alpha, T, K, L, Ms, ctype, decimals=None):
     """
     PI/PID Tunning rule for fractional order models
     # TODO: add tuning rule paper reference
 
+    The normalized constants of each (alpha, tao_o, Ms, ctype) are kept on
+    a LRU cache and only scaled by K and T. With decimals, alpha and tao_o
+    are rounded to significant digits inside the rule ranges before the
+    lookup, so near-identical plants share the tuning of the rounded plant,
+    scaled by its T^(1/alpha).
+
     :param alpha:     Fractional order
     :type alpha: float
 
@@ -551,6 +627,9 @@ def tuning(alpha, T, K, L, Ms, ctype):
     :param ctype:     Controler type ['PI','PID']
     :type ctype: strg
 
+    :param decimals:  alpha and tao_o cache key significant digits, exact by default
+    :type decimals: int
+
     :returns: A controller with the synthonized parameters for the input plant
     :rtype Controller:
     """
@@ -591,26 +670,14 @@ def tuning(alpha, T, K, L, Ms, ctype):
     else:
         raise ValueError('Fractional normalized dead time is not in range [0.1, 2.0]')
 
-    if Ms == '2.0':
-        if ctype == 'PID':
-            values_dict = PID_Ms_2_0
-        elif ctype == 'PI':
-            values_dict = PI_Ms_2_0
-    elif Ms == '1.4':
-        if ctype == 'PID':
-            values_dict = PID_Ms_1_4
-        elif ctype == 'PI':
-            values_dict = PI_Ms_1_4
-    else:
+    if Ms not in valid_Ms:
         raise ValueError('Maximum sensitivity is not in {1.4, 2.0}')
 
     # Calculate results:
-    kappa_p = normalized_proportional_const(values_dict, alpha, tao_o)
-    tao_i = normalized_integral_const(values_dict, alpha, tao_o)
-    if ctype == 'PID':
-        tao_d = normalized_differential_const(values_dict, alpha, tao_o)
-    else:
-        tao_d = 0
+    if decimals is not None:
+        alpha = quantize(alpha, decimals, alpha_range[1], alpha_range[0])
+        tao_o = quantize(tao_o, decimals, 0.1, 2.0)
+    kappa_p, tao_i, tao_d = _normalized_tuning(alpha, tao_o, Ms, ctype)
     K_p = _np.divide(kappa_p, K)
     T_i = _np.multiply(tao_i, _np.power(T, _np.divide(1, alpha)))
     if ctype == 'PID':
@@ -629,3 +696,91 @@ def tuning(alpha, T, K, L, Ms, ctype):
         td = T_d,     # Differential constant
         action = action,
     )
+
+
+def tuning_batch(alpha, T, K, L, Ms, ctype):
+    """
+    Vectorized PI/PID tuning rule for arrays of fractional order models
+
+    The inputs are broadcast together, every row is tuned in one pass over
+    the dense coefficient matrices. Rows out of the rule range are not
+    raised, they are marked on the valid field and their values are NaN.
+
+    :param alpha:     Fractional orders
+    :type alpha: array_like
+
+    :param T:         Time constants
+    :type T: array_like
+
+    :param K:         Proportional constants
+    :type K: array_like
+
+    :param L:         Dead time constants
+    :type L: array_like
+
+    :param Ms:        Maximum sensitivities {'1.4', '2.0'}
+    :type Ms: array_like
+
+    :param ctype:     Controler types ['PI','PID']
+    :type ctype: array_like
+
+    :returns: A tuning_dtype structured array with the broadcast shape
+    :rtype numpy.ndarray:
+    """
+    alpha, T, K, L, Ms, ctype = _np.broadcast_arrays(
+        _np.asarray(alpha, dtype=float),
+        _np.asarray(T, dtype=float),
+        _np.asarray(K, dtype=float),
+        _np.asarray(L, dtype=float),
+        _np.asarray(Ms).astype(str),
+        _np.asarray(ctype).astype(str),
+    )
+
+    result = _np.zeros(alpha.shape, dtype=tuning_dtype)
+    result['ctype'] = ctype
+    result['Ms'] = Ms
+
+    # Table index, (PID, PI) x (1.4, 2.0)
+    is_pi = (ctype == 'PI')
+    valid = _np.logical_or(is_pi, ctype == 'PID')
+    valid &= _np.logical_or(Ms == '1.4', Ms == '2.0')
+    table = 2*is_pi + (Ms == '2.0')
+
+    # Verify alpha is in range
+    valid &= (alpha >= 1.0) & (alpha <= _alpha_max[is_pi.astype(int)])
+
+    # Calculate fractional normalized dead time
+    with _np.errstate(all='ignore'):
+        T_alpha = _np.power(T, 1/alpha)
+        tao_o = L/T_alpha
+    valid &= (tao_o >= 0.1) & (tao_o <= 2.0)
+
+    # Linear interpolation between the alpha rows
+    row = _np.clip(_np.searchsorted(alpha_grid, alpha, side='right') - 1, 0, len(alpha_grid) - 2)
+    weight = ((alpha - alpha_grid[row])/0.1)[..., _np.newaxis]
+    packed = _packed_tables()
+    coef = (1 - weight)*packed[table, row] + weight*packed[table, row + 1]
+    coef = _np.where(weight == 0, packed[table, row], coef) # Exact table rows
+
+    a1, a2, a3, b1, b2, b3, b4, b5, c1, c2, c3, c4, c5 = _np.moveaxis(coef, -1, 0)
+
+    with _np.errstate(all='ignore'):
+        kappa_p = a1*_np.power(tao_o, a2) + a3
+        tao_i = (((b1*tao_o + b2)*tao_o + b3)*tao_o + b4)*tao_o + b5
+        tao_d = (((c1*tao_o + c2)*tao_o + c3)*tao_o + c4)*tao_o + c5
+        tao_d = _np.where(is_pi, 0.0, tao_d)
+
+        result['n_kp'] = kappa_p
+        result['n_ti'] = tao_i
+        result['n_td'] = tao_d
+        result['kp'] = kappa_p/_np.abs(K)
+        result['ti'] = tao_i*T_alpha
+        result['td'] = tao_d*T_alpha
+        result['action'] = _np.sign(K)
+
+    valid &= _np.isfinite(result['kp']) & _np.isfinite(result['ti']) & _np.isfinite(result['td'])
+    result['valid'] = valid
+    for field in ('n_kp', 'n_ti', 'n_td', 'kp', 'ti', 'td'):
+        result[field][~valid] = _np.nan
+
+    return result
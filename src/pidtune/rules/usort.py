@@ -1,9 +1,471 @@
+from typing import Optional
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-import control as ctl
-import scipy.signal as signal
 from ..models.controller import Controller
+from ..utils.vectUtils import quantize
+from functools import lru_cache
+from types import MappingProxyType
+
+CACHE_SIZE = 4096 # Normalized tunings kept by the (a, Tao) LRU cache
+
+# Dictionary to store all the tunning tables
+Alfaro123c_rule = {
+    "Regulatory": {
+        "PI": {
+            "MS2":{
+                '0': [0.265, 0.603, -0.971],
+                '0.25': [0.077, 0.739, -0.663],
+                '0.5': [0.023, 0.821, -0.625],
+                '0.75': [-0.128, 1.035, -0.555],
+                '1': [-0.244, 1.226, -0.517],
+                '2DoF': [0.730, 0.302, 0.386],
+            },
+            "MS18":{
+                '0': [0.229, 0.537, -0.952],
+                '0.25': [0.037, 0.684, -0.626],
+                '0.5': [-0.056, 0.803, -0.561],
+                '0.75': [-0.160, 0.958, -0.516],
+                '1': [-0.289, 1.151, -0.472],
+                '2DoF': [0.658, 0.578, 0.372],
+            },
+            "MS16":{
+                '0': [0.175, 0.466, -0.911],
+                '0.25': [-0.009, 0.612, -0.578],
+                '0.5': [0.080, 0.702, -0.522],
+                '0.75': [-0.247, 0.913, -0.442],
+                '1': [-0.394, 1.112, -0.397],
+                '2DoF': [0.649, 0.898, 0.446],
+            },
+            "MS14":{
+                '0': [0.016, 0.476, -0.708, -1.382, 2.837, 0.211],
+                '0.25': [-0.053, 0.507, -0.513, 0.866, 0.790, 0.520],
+                '0.5': [-0.129, 0.600, -0.449, 1.674, 0.268, 1.062],
+                '0.75': [-0.292, 0.792, -0.368, 2.130, 0.112, 1.654],
+                '1': [-0.461, 0.997, -0.317, 2.476, 0.073, 1.955],
+                '2DoF': [0.811, 1.205, 0.608],
+            }
+        },
+        "PID":{
+            "MS2":{
+                '0': [0.235, 0.840, -0.919],
+                '0.25': [0.435, 0.551, -1.123],
+                '0.5': [0.454, 0.588, -1.211],
+                '0.75': [0.464, 0.677, -1.251],
+                '1': [-0.488, 0.767, -1.273],
+                '2DoF': [0.306, 0.416, 0.367],
+            },
+            "MS18":{
+                '0': [0.210, 0.745, -0.919],
+                '0.25': [0.380, 0.500, -1.108],
+                '0.5': [0.400, 0.526, -1.194],
+                '0.75': [0.410, 0.602, -1.234],
+                '1': [0.432, 0.679, -1.257],
+                '2DoF': [0.248, 0.571, 0.362],
+            },
+            "MS16":{
+                '0': [0.179, 0.626, -0.921],
+                '0.25': [0.311, 0.429, -1.083],
+                '0.5': [0.325, 0.456, -1.160],
+                '0.75': [0.333, 0.519, -1.193],
+                '1': [0.351, 0.584, -1.217],
+                '2DoF': [0.255, 0.727, 0.476],
+            },
+            "MS14":{ #c y b
+                '0': [0.155, 0.455, -0.939, -0.198, 1.291, 0.485, 0.004, 0.389, 0.869],
+                '0.25': [0.228, 0.336, -1.057, 0.095, 1.165, 0.517, 0.104, 0.414, 0.758],
+                '0.5': [0.041, 0.571, -0.725, 0.132, 1.263, 0.496, 0.095, 0.540, 0.566],
+                '0.75': [0.231, 0.418, -1.136, 0.235, 1.291, 0.521, 0.074, 0.647, 0.511],
+                '1': [0.114, 0.620, -0.932, 0.236, 1.424, 0.495, 0.033, 0.756, 0.452],
+                '2DoF': [0.383, 0.921, 0.612],
+            }
+        }
+    },
+    "Servo":{
+        "PI":{
+            "MS18":{
+                '0': [0.243, 0.509, -1.063],
+                '0.25': [0.094, 0.606, -0.706],
+                '0.5': [0.013, 0.703, -0.621],
+                '0.75': [-0.075, 0.837, -0.569],
+                '1': [-0.164, 0.986, -0.531],
+            },
+            "MS16":{
+                '0': [0.209, 0.417, -1.064],
+                '0.25': [0.057, 0.528, -0.667],
+                '0.5': [-0.010, 0.607, -0.584],
+                '0.75': [-0.130, 0.765, -0.506],
+                '1': [-0.220, 0.903, -0.468],
+            },
+            "MS14":{
+                '0': [0.164, 0.305, -1.066, 14.650, 8.450, 0.0, 15.740],
+                '0.25': [0.019, 0.420, -0.617, 0.107, 1.164, 0.377, 0.066],
+                '0.5': [-0.061, 0.509, -0.511, 0.309, 1.362, 0.359, 0.146],
+                '0.75': [-0.161, 0.636, -0.439, 0.594, 1.532, 0.371, 0.237],
+                '1': [-0.253, 0.762, -0.397, 0.0625, 1.778, 0.355, 0.209],
+            }
+        },
+        "PID":{
+            "MS2":{
+                '0': [0.377, 0.727, -1.041],
+                '0.25': [0.502, 0.518, -1.194],
+                '0.5': [0.518, 0.562, -1.290],
+                '0.75': [0.533, 0.653, -1.329],
+                '1': [0.572, 0.728, -1.363],
+            },
+            "MS18":{
+                '0': [0.335, 0.644, -1.040],
+                '0.25': [0.432, 0.476, -1.163],
+                '0.5': [0.435, 0.526, -1.239],
+                '0.75': [0.439, 0.617, -1.266],
+                '1': [0.482, 0.671, -1.315],
+            },
+            "MS16":{
+                '0': [0.282, 0.544, -1.038],
+                '0.25': [0.344, 0.423, -1.117],
+                '0.5': [0.327, 0.488, -1.155],
+                '0.75': [0.306, 0.589, -1.154],
+                '1': [0.482, 0.622, -1.221],
+            },
+            "MS14":{
+                '0': [0.214, 0.413, -1.036, 1687, 339.2, 39.86, 1299, -0.016, 0.333, 0.815],
+                '0.25': [0.234, 0.352, -1.042, 0.135, 1.355, 0.333, 0.007, 0.026, 0.403, 0.613],
+                '0.5': [0.184, 0.423, -1.011, 0.246, 1.608, 0.273, 0.003, -0.042, 0.571, 0.446],
+                '0.75': [0.118, 0.575, -0.956, 0.327, 1.896, 0.243, -0.006, 0.086, 0.684, 0.772],
+                '1': [0.147, 0.607, -1.015, 0.381, 2.234, 0.204, -0.015, -0.110, 0.772, 0.372],
+            }
+        }
+    }
+}
+
+def _freeze(rule):
+    # Read-only views and tuples, the tables are shared by every thread
+    if isinstance(rule, dict):
+        return MappingProxyType({key: _freeze(value) for key, value in rule.items()})
+    return tuple(rule)
+
+Alfaro123c_rule = _freeze(Alfaro123c_rule)
+
+## Dense tables, axes: (mode, type, Ms, a-breakpoint, coefficient)
+control_modes = ('Regulatory', 'Servo')
+controller_types = ('PI', 'PID')
+ms_keys = ('MS14', 'MS16', 'MS18', 'MS2')
+a_breakpoints = (0, 0.25, 0.5, 0.75, 1)
+dofs = (1, 2)
+TABLE_COEFFICIENTS = 10 # Longest row, servo PID Ms 1.4
+
+def _compile_table(rule):
+    table = np.full(
+        (len(control_modes), len(controller_types), len(ms_keys),
+         len(a_breakpoints), TABLE_COEFFICIENTS),
+        np.nan
+    )
+    for m, control_mode in enumerate(control_modes):
+        for t, controller_type in enumerate(controller_types):
+            for s, ms_key in enumerate(ms_keys):
+                rows = rule[control_mode][controller_type].get(ms_key, {})
+                for b, a_limit in enumerate(a_breakpoints):
+                    row = rows.get(str(a_limit))
+                    if row is not None:
+                        table[m, t, s, b, :len(row)] = row
+    table.setflags(write=False)
+    return table
+
+def _compile_2DoF_table(rule):
+    # Beta coefficients (d0, d1, d2), only the regulatory Ms 1.4 ones are used
+    table = np.array([rule['Regulatory'][controller_type]['MS14']['2DoF']
+                      for controller_type in controller_types])
+    table.setflags(write=False)
+    return table
+
+@lru_cache(maxsize=None)
+def _tables():
+    # Dense and 2DoF tables, compiled on the first tuning
+    return _compile_table(Alfaro123c_rule), _compile_2DoF_table(Alfaro123c_rule)
+
+def __getattr__(name):
+    if name == 'Alfaro123c_table':
+        return _tables()[0]
+    if name == 'Alfaro123c_2DoF_table':
+        return _tables()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+## One row per controller, ordered as mode, type, Ms and DoF
+combinations_dtype = np.dtype([
+    ('mode', 'U10'),
+    ('ctype', 'U3'),
+    ('Ms', 'U4'),
+    ('DoF', np.int8),
+    ('kp', float),
+    ('ti', float),
+    ('td', float),
+    ('n_kp', float),
+    ('n_ti', float),
+    ('n_td', float),
+    ('beta', float),
+    ('action', float),
+    ('valid', bool),
+])
+
+## normalized_values rows, the tuning of an unitary gain and time constant plant
+normalized_dtype = np.dtype([
+    ('mode', 'U10'),
+    ('ctype', 'U3'),
+    ('Ms', 'U4'),
+    ('DoF', np.int8),
+    ('n_kp', float),  # kp*|K|
+    ('tau_i', float), # ti/T
+    ('tau_d', float), # td/T
+    ('beta', float),
+    ('valid', bool),
+])
+
+# Table indices (mode, type, Ms, DoF) of each row
+_grid = tuple(np.ravel(x) for x in np.indices(
+    (len(control_modes), len(controller_types), len(ms_keys), len(dofs))))
+
+def normalized_values(
+        constant_a,    # a constant, float or array
+        Tao,           # Normalized dead time L/T, float or array
+) -> np.ndarray:
+    '''
+    Function: normalized_values
+    Table math of get_values, the tuning normalized by the plant
+    gain and time constant only depends on a and Tao. The result is
+    a normalized_dtype array with shape (*plants, 32), rows out of
+    the rule intervals are flagged with valid=False and NaN values.
+    '''
+    a, Tao = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (constant_a, Tao)))
+    plants_shape = a.shape
+    a, Tao = (np.ravel(x)[:, np.newaxis] for x in (a, Tao))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ## a interval, [0, .25), [.25, .5), [.5, .75) and [.75, 1]
+        segment = np.clip(np.searchsorted(a_breakpoints[1:-1], a, side='right'), 0, 3)
+        a_i = np.take(a_breakpoints, segment)
+        a_f = np.take(a_breakpoints, segment+1)
+
+        m, t, s, d = _grid
+        Alfaro123c_table, Alfaro123c_2DoF_table = _tables()
+        servo = m == 1
+        pid = t == 1
+
+        initial = Alfaro123c_table[m, t, s, segment]
+        final = Alfaro123c_table[m, t, s, segment+1]
+        initial_14 = Alfaro123c_table[m, t, 0, segment]
+        final_14 = Alfaro123c_table[m, t, 0, segment+1]
+
+        def interpolate(y1, y2):
+            slope = (y2 - y1) / (a_f - a_i)
+            return slope*a + (y1 - slope*a_i)
+
+        def power_law(c, offset):
+            return c[..., offset] + c[..., offset+1]*Tao**c[..., offset+2]
+
+        ## Proportional gain times |K|
+        kappa_p = interpolate(power_law(initial, 0), power_law(final, 0))
+
+        ## Integral time over T, Ms 1.4 coefficients, servo b3 from the final row
+        b3 = final_14[..., 6]
+        Ti_servo = lambda c: (c[..., 3] + c[..., 4]*Tao + c[..., 5]*Tao*Tao)/(b3 + Tao)
+        tau_i = np.where(
+            servo,
+            interpolate(Ti_servo(initial_14), Ti_servo(final_14)),
+            interpolate(power_law(initial_14, 3), power_law(final_14, 3))
+        )
+
+        ## Derivative time over T, Ms 1.4 coefficients
+        tau_d = np.where(
+            servo,
+            interpolate(power_law(initial_14, 7), power_law(final_14, 7)),
+            interpolate(power_law(initial_14, 6), power_law(final_14, 6))
+        )
+        tau_d = np.where(pid, tau_d, 0.0)
+
+        ## Set-point weight, regulatory two degrees of freedom only
+        beta = np.where(
+            np.logical_and(~servo, d == 1),
+            power_law(Alfaro123c_2DoF_table[t], 0),
+            1.0
+        )
+
+        valid = (
+            (Tao >= 0.1) & (Tao <= 2) # usort restriction
+            & (a >= 0) & (a <= 1)
+            # Regulatory PID Ms 1.4 restriction
+            & ~(~servo & pid & (s == 0) & (a < 0.25) & (Tao < 0.4))
+            & np.isfinite(kappa_p) & np.isfinite(tau_i) & np.isfinite(tau_d) & np.isfinite(beta)
+        )
+
+        result = np.zeros(kappa_p.shape, dtype=normalized_dtype)
+        result['mode'] = np.take(control_modes, m)
+        result['ctype'] = np.take(controller_types, t)
+        result['Ms'] = np.take(ms_keys, s)
+        result['DoF'] = np.take(dofs, d)
+        result['n_kp'] = kappa_p
+        result['tau_i'] = tau_i
+        result['tau_d'] = tau_d
+        result['beta'] = beta
+        result['valid'] = valid
+
+    for field in ('n_kp', 'tau_i', 'tau_d', 'beta'):
+        result[field][~valid] = np.nan
+
+    return result.reshape(plants_shape + (len(m),))
+
+def denormalize(
+        normalized,    # normalized_values array, (*plants, 32)
+        time_constant, # Main time constant (T), float or (*plants,) array
+        dc_gain,       # Gain (K), float or (*plants,) array
+        dead_time,     # Dead time (L), float or (*plants,) array
+) -> np.ndarray:
+    '''
+    Function: denormalize
+    This function scales the normalized tuning of each plant by its
+    gain and time constant, the get_values combinations_dtype array.
+    '''
+    T, K, L = (np.asarray(x, dtype=float)[..., np.newaxis] for x in (time_constant, dc_gain, dead_time))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Tao = L/T
+        Kp = normalized['n_kp']/np.abs(K)
+        Ti = normalized['tau_i']*T
+        Td = normalized['tau_d']*T
+
+        valid = (
+            normalized['valid'] & (K != 0)
+            & np.isfinite(Kp) & np.isfinite(Ti) & np.isfinite(Td)
+        )
+
+        result = np.zeros(Kp.shape, dtype=combinations_dtype)
+        for field in ('mode', 'ctype', 'Ms', 'DoF', 'n_kp', 'beta'):
+            result[field] = normalized[field]
+        result['kp'] = Kp
+        result['ti'] = Ti
+        result['td'] = Td
+        result['n_ti'] = Ti/Tao
+        result['n_td'] = Td/Tao
+        result['action'] = np.broadcast_to(np.sign(K), Kp.shape)
+        result['valid'] = valid
+
+    for field in ('kp', 'ti', 'td', 'n_kp', 'n_ti', 'n_td', 'beta', 'action'):
+        result[field][~valid] = np.nan
+
+    return result
+
+def get_values(
+        constant_a,    # a constant, float or array
+        time_constant, # Main time constant (T), float or array
+        dc_gain,       # Gain (K), float or array
+        dead_time,     # Dead time (L), float or array
+) -> np.ndarray:
+    '''
+    Function: get_values
+    Vectorized get_value, it tunes every control mode, controller
+    type, Ms and degree of freedom combination for one or many plants
+    at once. The inputs are broadcast together and the result is a
+    combinations_dtype array with shape (*plants, 32), rows out of
+    the rule intervals are flagged with valid=False and NaN values.
+    '''
+    a, T, K, L = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (constant_a, time_constant, dc_gain, dead_time)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Tao = L/T
+    return denormalize(normalized_values(a, Tao), T, K, L)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_normalized(constant_a, Tao):
+    normalized = normalized_values(constant_a, Tao)
+    normalized.setflags(write=False)
+    return normalized
+
+def tune(
+        constant_a: float,      # a constant
+        time_constant: float,   # Main time constant (T)
+        dc_gain: float,         # Gain (K)
+        dead_time: float,       # Dead time (L)
+        decimals: Optional[int] = None,   # a and Tao key significant digits, exact keys by default
+) -> np.ndarray:
+    '''
+    Function: tune
+    Memoized get_values for one plant, the normalized tuning of each
+    (a, Tao) is kept on a LRU cache and only scaled by K and T, so
+    repeated plants skip the table math. With decimals, a and Tao are
+    rounded to significant digits before the lookup, inside the rule
+    intervals, and near-identical plants share the tuning of the
+    rounded plant. See cache_info for the counters.
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Tao = float(np.divide(dead_time, time_constant))
+    a = float(constant_a)
+    if decimals is not None:
+        # Keys keep the validity of the plant, see the normalized_values restrictions
+        a = quantize(a, decimals, 0, 1, edges=(0.25,))
+        Tao = quantize(Tao, decimals, 0.1, 2, edges=(0.4,))
+    return denormalize(_cached_normalized(a, Tao), time_constant, dc_gain, dead_time)
+
+def cache_info():
+    '''
+    Function: cache_info
+    Hits, misses, maxsize and currsize of the tune LRU cache.
+    '''
+    return _cached_normalized.cache_info()
+
+def cache_clear():
+    _cached_normalized.cache_clear()
+
+def to_controller(row) -> Controller:
+    '''
+    Function: to_controller
+    This function builds the Controller of a valid tune or
+    get_values row.
+    '''
+    return Controller(
+        ctype = str(row['ctype']),
+        Ms = str(row['Ms']),
+        kp = float(row['kp']),
+        ti = float(row['ti']),
+        td = float(row['td']),
+        n_kp = float(row['n_kp']),
+        n_ti = float(row['n_ti']),
+        n_td = float(row['n_td']),
+        beta = float(row['beta']),
+        action = float(row['action'])
+    )
+
+def get_value(
+        control_mode: str,      # 'Regulatory' or 'Servo'
+        controller_type: str,   # 'PI' or 'PID'
+        constant_a: float,      # a constant
+        ms_key: str,            # 'MS14', 'MS16', 'MS18' or 'MS2'
+        time_constant: float,   # Main time constant (T)
+        dc_gain: float,         # Gain (K)
+        dead_time: float,       # Dead time (L)
+        DoF: int,               # Degrees of freedom, 1 or 2
+        decimals: Optional[int] = None,   # a and Tao key rounding, see tune
+) -> Controller:
+    '''
+    Function: get_value
+    Stateless usort.get_value, the controller row of the memoized
+    tune. It only reads the read-only module tables and the LRU
+    cache, so it needs no rule instance and may be called
+    concurrently from threads or executors.
+    '''
+    if control_mode not in control_modes:
+        raise ValueError(f"Control type {control_mode} not found. Valid options are 'Servo' or 'Regulatory'.")
+    if controller_type not in controller_types:
+        raise ValueError(f"Controller type {controller_type} not found. Valid options are 'PI' or 'PID'.")
+    if ms_key not in ms_keys:
+        raise ValueError(f"Ms {ms_key} not found. Valid options are {ms_keys}.")
+    if DoF not in dofs:
+        raise ValueError(f"Degree of freedom {DoF} not found. Valid options are 1 or 2.")
+
+    row = tune(constant_a, time_constant, dc_gain, dead_time, decimals)[np.ravel_multi_index(
+        (control_modes.index(control_mode), controller_types.index(controller_type),
+         ms_keys.index(ms_key), dofs.index(DoF)),
+        (len(control_modes), len(controller_types), len(ms_keys), len(dofs)))]
+    if not row['valid']:
+        raise ValueError("Controller for these constants not found. Valid intervals for this rule are: 0 <= a <= 1 and 0.1 <= Tao <= 2")
+    return to_controller(row)
+
 
 class usort():
     '''
@@ -16,142 +478,13 @@ class usort():
                  ):
         '''
         Function: __init__
-        This function initialize the variables and vectors
-        to store the input data and also stores the dictionary
-        with all the USORT rule values tables. 
+        The rule keeps no state, every method works on its arguments
+        and the read-only USORT rule tables, so an instance may be
+        shared by many threads. See the module get_value for the
+        memoized functional rule.
         '''
-        # Global variables for Time values
-        self.Ti : float = 0,
-        self.Td : float = 0,
-
-        # Dictionary to store all the tunning tables
-        self.Alfaro123c_rule = {
-            "Regulatory": {
-                "PI": {
-                    "MS2":{
-                        '0': [0.265, 0.603, -0.971],
-                        '0.25': [0.077, 0.739, -0.663],
-                        '0.5': [0.023, 0.821, -0.625],
-                        '0.75': [-0.128, 1.035, -0.555],
-                        '1': [-0.244, 1.226, -0.517],
-                        '2DoF': [0.730, 0.302, 0.386],
-                    },
-                    "MS18":{
-                        '0': [0.229, 0.537, -0.952],
-                        '0.25': [0.037, 0.684, -0.626],
-                        '0.5': [-0.056, 0.803, -0.561],
-                        '0.75': [-0.160, 0.958, -0.516],
-                        '1': [-0.289, 1.151, -0.472],
-                        '2DoF': [0.658, 0.578, 0.372],
-                    },
-                    "MS16":{
-                        '0': [0.175, 0.466, -0.911],
-                        '0.25': [-0.009, 0.612, -0.578],
-                        '0.5': [0.080, 0.702, -0.522],
-                        '0.75': [-0.247, 0.913, -0.442],
-                        '1': [-0.394, 1.112, -0.397],
-                        '2DoF': [0.649, 0.898, 0.446],
-                    },
-                    "MS14":{
-                        '0': [0.016, 0.476, -0.708, -1.382, 2.837, 0.211],
-                        '0.25': [-0.053, 0.507, -0.513, 0.866, 0.790, 0.520],
-                        '0.5': [-0.129, 0.600, -0.449, 1.674, 0.268, 1.062],
-                        '0.75': [-0.292, 0.792, -0.368, 2.130, 0.112, 1.654],
-                        '1': [-0.461, 0.997, -0.317, 2.476, 0.073, 1.955],
-                        '2DoF': [0.811, 1.205, 0.608],
-                    }
-                },
-                "PID":{
-                    "MS2":{
-                        '0': [0.235, 0.840, -0.919],
-                        '0.25': [0.435, 0.551, -1.123],
-                        '0.5': [0.454, 0.588, -1.211],
-                        '0.75': [0.464, 0.677, -1.251],
-                        '1': [-0.488, 0.767, -1.273],
-                        '2DoF': [0.306, 0.416, 0.367],
-                    },
-                    "MS18":{
-                        '0': [0.210, 0.745, -0.919],
-                        '0.25': [0.380, 0.500, -1.108],
-                        '0.5': [0.400, 0.526, -1.194],
-                        '0.75': [0.410, 0.602, -1.234],
-                        '1': [0.432, 0.679, -1.257],
-                        '2DoF': [0.248, 0.571, 0.362],
-                    },
-                    "MS16":{
-                        '0': [0.179, 0.626, -0.921],
-                        '0.25': [0.311, 0.429, -1.083],
-                        '0.5': [0.325, 0.456, -1.160],
-                        '0.75': [0.333, 0.519, -1.193],
-                        '1': [0.351, 0.584, -1.217],
-                        '2DoF': [0.255, 0.727, 0.476],
-                    },
-                    "MS14":{ #c y b
-                        '0': [0.155, 0.455, -0.939, -0.198, 1.291, 0.485, 0.004, 0.389, 0.869],
-                        '0.25': [0.228, 0.336, -1.057, 0.095, 1.165, 0.517, 0.104, 0.414, 0.758],
-                        '0.5': [0.041, 0.571, -0.725, 0.132, 1.263, 0.496, 0.095, 0.540, 0.566],
-                        '0.75': [0.231, 0.418, -1.136, 0.235, 1.291, 0.521, 0.074, 0.647, 0.511],
-                        '1': [0.114, 0.620, -0.932, 0.236, 1.424, 0.495, 0.033, 0.756, 0.452],
-                        '2DoF': [0.383, 0.921, 0.612],
-                    }
-                }
-            },
-            "Servo":{
-                "PI":{
-                    "MS18":{
-                        '0': [0.243, 0.509, -1.063],
-                        '0.25': [0.094, 0.606, -0.706],
-                        '0.5': [0.013, 0.703, -0.621],
-                        '0.75': [-0.075, 0.837, -0.569],
-                        '1': [-0.164, 0.986, -0.531],
-                    },
-                    "MS16":{
-                        '0': [0.209, 0.417, -1.064],
-                        '0.25': [0.057, 0.528, -0.667],
-                        '0.5': [-0.010, 0.607, -0.584],
-                        '0.75': [-0.130, 0.765, -0.506],
-                        '1': [-0.220, 0.903, -0.468],
-                    },
-                    "MS14":{
-                        '0': [0.164, 0.305, -1.066, 14.650, 8.450, 0.0, 15.740],
-                        '0.25': [0.019, 0.420, -0.617, 0.107, 1.164, 0.377, 0.066],
-                        '0.5': [-0.061, 0.509, -0.511, 0.309, 1.362, 0.359, 0.146],
-                        '0.75': [-0.161, 0.636, -0.439, 0.594, 1.532, 0.371, 0.237],
-                        '1': [-0.253, 0.762, -0.397, 0.0625, 1.778, 0.355, 0.209],
-                    }
-                },
-                "PID":{
-                    "MS2":{
-                        '0': [0.377, 0.727, -1.041],
-                        '0.25': [0.502, 0.518, -1.194],
-                        '0.5': [0.518, 0.562, -1.290],
-                        '0.75': [0.533, 0.653, -1.329],
-                        '1': [0.572, 0.728, -1.363],
-                    },
-                    "MS18":{
-                        '0': [0.335, 0.644, -1.040],
-                        '0.25': [0.432, 0.476, -1.163],
-                        '0.5': [0.435, 0.526, -1.239],
-                        '0.75': [0.439, 0.617, -1.266],
-                        '1': [0.482, 0.671, -1.315],
-                    },
-                    "MS16":{
-                        '0': [0.282, 0.544, -1.038],
-                        '0.25': [0.344, 0.423, -1.117],
-                        '0.5': [0.327, 0.488, -1.155],
-                        '0.75': [0.306, 0.589, -1.154],
-                        '1': [0.482, 0.622, -1.221],
-                    },
-                    "MS14":{
-                        '0': [0.214, 0.413, -1.036, 1687, 339.2, 39.86, 1299, -0.016, 0.333, 0.815],
-                        '0.25': [0.234, 0.352, -1.042, 0.135, 1.355, 0.333, 0.007, 0.026, 0.403, 0.613],
-                        '0.5': [0.184, 0.423, -1.011, 0.246, 1.608, 0.273, 0.003, -0.042, 0.571, 0.446],
-                        '0.75': [0.118, 0.575, -0.956, 0.327, 1.896, 0.243, -0.006, 0.086, 0.684, 0.772],
-                        '1': [0.147, 0.607, -1.015, 0.381, 2.234, 0.204, -0.015, -0.110, 0.772, 0.372],
-                    }
-                }
-            }
-        }
+        # Tunning tables, compiled once at import
+        self.Alfaro123c_rule = Alfaro123c_rule
 
     # Function to calculate proportional gains
     def calculate_Kp(self, a0, a1, a2, Tao, dc_gain):
@@ -270,7 +603,7 @@ class usort():
             Ti2 = usort.calculate_Ti_regulatory(self, b0f, b1f, b2f, Tao, time_constant)
 
             # Get the model final Integral Time
-            self.Ti = usort.interpolate(self, limit_1, limit_2, Ti1, Ti2, constant_a)
+            Ti = usort.interpolate(self, limit_1, limit_2, Ti1, Ti2, constant_a)
 
             if controller_type == 'PID'and ms_key == 'MS14' and constant_a < 0.25 and Tao < 0.4:
                 raise ValueError(f"Controller for this values constants not found. Valid interval for this rule is: a > 0.25 and Tao > 0.4")
@@ -294,35 +627,22 @@ class usort():
                 Td2 = usort.calculate_Td_regulatory(self, c0f, c1f, c2f, Tao, time_constant)
 
                 # Get the model final derivative time
-                self.Td = usort.interpolate(self, limit_1, limit_2, Td1, Td2, constant_a)
+                Td = usort.interpolate(self, limit_1, limit_2, Td1, Td2, constant_a)
 
             else:
-                self.Td = 0
+                Td = 0
 
-            self.Parameters = {
-                'Integral Time'    :   self.Ti,      # Time vector
-                'Derivative Time'   :   self.Td,
+            parameters = {
+                'Integral Time'    :   Ti,      # Time vector
+                'Derivative Time'   :   Td,
                 'Proportional Gain'    :   Kp,       # Step vector
                 'Beta'  : 1
             }
 
             # 2 degrees of freedom, includes Beta parameter
             if DoF == 2:
-                self.Parameters['Beta'] = d0 + d1*(Tao**d2)
-            #print(self.Parameters)
-
-            cont = Controller(
-                    ctype = controller_type,
-                    Ms = ms_key,
-                    kp = Kp,
-                    ti = self.Ti,
-                    td = self.Td,
-                    n_kp = Kp*abs(dc_gain),
-                    n_ti = self.Ti/Tao,
-                    n_td = self.Td / Tao,
-                    beta = self.Parameters['Beta'],
-                    action = dc_gain/abs(dc_gain)
-                )
+                parameters['Beta'] = d0 + d1*(Tao**d2)
+            #print(parameters)
 
         elif control_mode == 'Servo':
             #Get first limit of 'b' values:
@@ -342,7 +662,7 @@ class usort():
             Ti2 = usort.calculate_Ti_servo(self, b0f, b1f, b2f, b3f, Tao, time_constant)
 
             # Get the model final Integral Time
-            self.Ti = usort.interpolate(self, limit_1, limit_2, Ti1, Ti2, constant_a)
+            Ti = usort.interpolate(self, limit_1, limit_2, Ti1, Ti2, constant_a)
 
             if controller_type == 'PID':
                 initial_c_values = self.Alfaro123c_rule[control_mode][controller_type]['MS14'][str(limit_1)]
@@ -363,13 +683,13 @@ class usort():
                 Td2 = usort.calculate_Td_servo(self, c0f, c1f, c2f, Tao, time_constant)
 
                 # Get the model final derivative time
-                self.Td = usort.interpolate(self, limit_1, limit_2, Td1, Td2, constant_a)
+                Td = usort.interpolate(self, limit_1, limit_2, Td1, Td2, constant_a)
             else:
-                self.Td = 0
+                Td = 0
 
-            self.Parameters = {
-                'Integral Time'    :   self.Ti,      # Time vector
-                'Derivative Time'   :   self.Td,
+            parameters = {
+                'Integral Time'    :   Ti,      # Time vector
+                'Derivative Time'   :   Td,
                 'Proportional Gain'    :   Kp,       # Step vector
                 'Beta'  : 1
             }
@@ -378,13 +698,13 @@ class usort():
                 ctype = controller_type,
                 Ms = ms_key,
                 kp = Kp,
-                ti = self.Ti,
-                td = self.Td,
+                ti = Ti,
+                td = Td,
                 n_kp = Kp*abs(dc_gain),
-                n_ti = self.Ti/Tao,
-                n_td = self.Td / Tao,
+                n_ti = Ti/Tao,
+                n_td = Td / Tao,
                 action = dc_gain/abs(dc_gain),
-                beta = self.Parameters['Beta']
+                beta = parameters['Beta']
             )
 
         return cont
@@ -394,19 +714,19 @@ class usort():
         Function: get_value
         This function is the main function that calls all the other functions
         to implements the interpolation and calculates the parameters.
-        Finally the parameters retrieved from the previous function
-        are stored in the global variable Parameters, to be retrieved
-        for all the interfaces.
+        Finally the controller built by the previous function is
+        returned, nothing is stored on the instance.
         '''
         # Calculates normalized time
         Tao = dead_time / time_constant
 
-        print(Tao)
-
         # If is in usort restriction interval, raise an error
         if Tao < 0.1000 or Tao > 2: # usort restriction
             raise ValueError(f"Controller for this time constants not found. Valid interval for this rule is: 0.1 < Tao < 2")
 
+        if constant_a < 0 or constant_a > 1:
+            raise ValueError(f"Controller for this a constant not found. Valid interval for this rule is: 0 <= a <= 1")
+
         # Check if the parameters are valid
         if control_mode not in self.Alfaro123c_rule:
             raise ValueError(f"Control type {control_mode} not found. Valid options are 'Servo' or 'Regulatory'.")
@@ -422,32 +742,32 @@ class usort():
         # Calculates PI or PID regulatory parameters
         if control_mode == 'Regulatory':
             if constant_a >= 0 and constant_a < 0.25:
-                self.Parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0, 0.25, DoF)
+                parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0, 0.25, DoF)
 
             elif constant_a >= 0.25 and constant_a < 0.50:
-                self.Parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0.25, 0.50, DoF)
+                parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0.25, 0.50, DoF)
 
             elif constant_a >= 0.50 and constant_a < 0.75:
-                self.Parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0.50, 0.75, DoF)
+                parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0.50, 0.75, DoF)
 
             elif constant_a >= 0.75 and constant_a <= 1:
-                self.Parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0.75, 1, DoF)
+                parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0.75, 1, DoF)
 
         # Repeats the process for servo control, but without the Regulatory PID Ms 1.4 restriction
         elif control_mode == 'Servo':
             if constant_a >= 0 and constant_a < 0.25:
-                self.Parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0, 0.25, DoF)
+                parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0, 0.25, DoF)
 
             elif constant_a >= 0.25 and constant_a < 0.50:
-                self.Parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0.25, 0.50, DoF)
+                parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0.25, 0.50, DoF)
 
             elif constant_a >= 0.50 and constant_a < 0.75:
-                self.Parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0.5, 0.75, DoF)
+                parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0.5, 0.75, DoF)
 
             elif constant_a >= 0.75 and constant_a <= 1:
-                self.Parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0.75, 1, DoF)
+                parameters=usort.interpolated_parameters(self,control_mode, controller_type, constant_a, ms_key, time_constant,Tao, dc_gain, 0.75, 1, DoF)
 
-        #print(self.Parameters)
-        #print(type(self.Parameters))
-        return(self.Parameters)
+        #print(parameters)
+        #print(type(parameters))
+        return(parameters)
 
@@ -1,8 +1,44 @@
-from typeguard import typechecked
-from control import tf
-from control.matlab import zpk2tf as zpk, dcgain, bode
+from ..debug import typechecked
+from functools import lru_cache
+from numbers import Real
 import numpy as np
 
+CACHE_SIZE = 256 # Approximations kept by the (v, wl, wh, n) LRU cache
+
+def _oustaloup(v, wl, wh, n):
+    """ Vectorized recursive zeros/poles distribution. For the v orders array
+    it returns the zeros and poles (without sign) as (len(v), n) arrays and
+    the gains as a len(v) array for an unitary desired gain.
+
+    The gain is computed from the zero/pole sets, dcgain(C) = prod(z)/prod(p)
+    and |C(j*wm)| = prod(|j*wm+z|)/prod(|j*wm+p|), the dcgain normalization
+    cancels out and only the one at wm remains.
+    """
+    v = np.asarray(v, dtype=float)
+
+    # Round to the floor value
+    f = np.trunc(v)
+    vf = v - f
+
+    ratio = np.power(wh/wl, 1/n) # alpha*eta
+    alpha = np.power(wh/wl, vf/n)
+    eta   = np.power(wh/wl, (1-vf)/n)
+
+    z = np.multiply.outer(wl * np.sqrt(eta), np.power(ratio, np.arange(n)))
+    p = z * alpha[:, np.newaxis]
+
+    wm = np.sqrt(wl*wh)
+    wm2 = wm*wm
+    log_mag = 0.5*np.sum(np.log(wm2 + z*z) - np.log(wm2 + p*p), axis=1)
+    k = np.exp(vf*np.log(wm) - log_mag)
+
+    return z, p, k, f.astype(int)
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _cached_oustaloup(v, wl, wh, n):
+    z, p, k, f = _oustaloup([v], wl, wh, n)
+    return tuple(-z[0]), tuple(-p[0]), k[0], f[0]
+
 @typechecked
 def cronePadula2 (
         k: float,          # Gain
@@ -22,6 +58,9 @@ def cronePadula2 (
       Synthesis. IEEE TRANSACTIONS ON CIRCUITS AND SYSTEMS,I: FUNDAMENTAL
       THEORY AND APPLICATIONS, VOL.47, NO.1, pp.25-39.
 
+    The approximation for each (v, wl, wh, n) is kept on a LRU cache, the
+    gain k only scales the cached one.
+
     :param gain: Float which represents the model gain
     :type gain: float
 
@@ -37,40 +76,30 @@ def cronePadula2 (
     :returns: A transfer function which approximates the real factorial one
     :rtype: tf
     """
+    ## Cheap checks, typeguard only runs with pidtune.debug enabled
+    if not (isinstance(k, Real) and isinstance(v, Real) and isinstance(n, int) and n > 0
+            and isinstance(wl, Real) and isinstance(wh, Real) and 0 < wl < wh):
+        raise ValueError("CRONE approximation wrong input values")
 
-    # Round to the floor value
-    f = int(v)
-    vf = v - f
+    negz, negp, gain, f = _cached_oustaloup(v, wl, wh, n)
 
-    z = [] # Zeros
-    p = [] # Poles
-
-    alpha = np.power(wh/wl,vf/n)
-    eta   = np.power(wh/wl,(1-vf)/n)
-
-    z.append(wl * np.sqrt(eta))
-    p.append(z[0]*alpha)
-
-    for x in range(n-1): # n-1 due first case already done
-        z.append(p[-1]*eta)
-        p.append(z[-1]*alpha)
-
-
-    negz = [ -x for x in z ]
-    negp = [ -x for x in p ]
-
-    num, den = zpk(negz, negp, 1)
-    C = tf(num, den)
-
-    k1 = k / dcgain(C)
-    C= k1*C
-
-    wm = np.sqrt(wl*wh)
+    if (v>0):
+        return (list(negz) + [0]*f, list(negp), k*gain)
+    return (list(negz), list(negp) + [0]*f, k*gain)
 
-    bode_result = bode(C, [wm])
-    k2=(k*np.power(wm,vf))/bode_result[0][0] ## FIXME gain matrix
-    k=k2*k1
+def cronePadula2Batch (
+        k,                 # Gain, float or array
+        v,                 # Fractional orders array
+        wl: float = 0.001, # Floor frequency
+        wh: float = 1000,  # Ceil frequency
+        n : int = 8        # Approximation order (n)
+) -> tuple:
+    """ cronePadula2 for an array of fractional orders.
 
-    if (v>0):
-        return (negz + [0]*f, negp, k)
-    return (negz, negp + [0]*f, k)
+    It returns the stacked (len(v), n) zeros and poles arrays, the gains
+    array and the integer part of each order. The integer part is the
+    number of zeros at the origin to add when the order is positive, the
+    same ones cronePadula2 appends to the zeros list.
+    """
+    z, p, gain, f = _oustaloup(np.ravel(v), wl, wh, n)
+    return -z, -p, np.multiply(k, gain), f
@@ -0,0 +1,124 @@
+""" Normalized step-response atlas of the fractional order model. With the
+time scaled by T^(1/alpha), the step response of 1/(T*s^alpha + 1) only
+depends on alpha, so the packaged atlas holds it for a dense alpha grid and
+a model step response is an interpolation plus a time scaling and shift.
+
+The atlas is built from the exact response, see stepResponse, and regenerated
+with
+
+    python -m pidtune.utils.fomAtlas
+"""
+from os import path
+from threading import Lock
+import numpy as np
+
+ATLAS_VERSION = 1
+ATLAS_PATH = path.join(path.dirname(__file__), '../data/fomAtlas_v{}.npy'.format(ATLAS_VERSION))
+
+## Atlas grids, changing them needs a new ATLAS_VERSION
+ALPHA_GRID = np.round(np.arange(0.05, 1.9 + 1e-9, 0.01), 2)
+TAU_GRID = np.concatenate((
+    [0],
+    np.geomspace(1e-6, 1, 200)[:-1],  # Head, y ~ tau^alpha/gamma(alpha + 1)
+    np.arange(1, 80, 0.04),           # Oscillations of alpha near 2
+    np.geomspace(80, 1e5, 156),       # Slow tail of alpha < 1
+))
+CONTOUR_NODES = 32 # stepResponse trapezoidal nodes, errors below 1e-12
+
+def stepResponse(alpha: float, tau, nodes: int = CONTOUR_NODES) -> np.ndarray:
+    """ Exact unit step response of 1/(s^alpha + 1), 1 - E_alpha(-tau^alpha),
+    for 0 < alpha < 2.
+
+    It is the inverse Laplace transform of 1/(s*(s^alpha + 1)) on the
+    Weideman–Trefethen parabolic contour s = mu*(1 + j*u)^2. For alpha > 1
+    the complex poles exp(+-j*pi/alpha) are subtracted from the integrand
+    and added back as exponentials, so the contour may cross them.
+    """
+    if not 0 < alpha < 2:
+        raise ValueError("Fractional order out of (0, 2)")
+
+    tau = np.asarray(tau, dtype=float)
+    y = np.zeros(tau.shape)
+    positive = tau > 0
+    t = tau[positive][:, np.newaxis]
+
+    h = 3/nodes
+    u = h*np.arange(nodes + 1)
+    mu = np.pi*nodes/(12*t)
+    s = mu*(1 + 1j*u)**2
+    ds = 2j*mu*(1 + 1j*u)
+
+    F = 1/(s*(np.power(s, alpha) + 1))
+    if alpha > 1: # Residues -1/alpha
+        pole = np.exp(1j*np.pi/alpha)
+        F += (1/(s - pole) + 1/(s - np.conj(pole)))/alpha
+
+    weights = np.ones(nodes + 1)
+    weights[0] = 0.5 # Conjugate symmetric half of the contour
+    y[positive] = (h/np.pi)*np.sum(weights*(np.exp(s*t)*F*ds/1j).real, axis=1)
+    if alpha > 1:
+        y[positive] -= (2/alpha)*np.exp(pole*t[:, 0]).real
+    return y
+
+class FomAtlas():
+    """ Step responses of the atlas file, the responses are memory-mapped
+    and only the alpha rows used are read
+    """
+    def __init__(self, atlas_path: str = ATLAS_PATH):
+        data = np.load(atlas_path, mmap_mode='r')
+        self.alpha = np.array(data[1:, 0], dtype=float)  # First column
+        self.tau = np.array(data[0, 1:], dtype=float)    # First row
+        self.steps = data[1:, 1:]
+
+    def covers(self, alpha: float) -> bool:
+        return self.alpha[0] <= alpha <= self.alpha[-1]
+
+    def step(self, alpha: float, tau) -> np.ndarray:
+        """ Unit step response of 1/(s^alpha + 1) on the normalized times
+        tau, linear between the atlas samples and alpha rows. It is null for
+        tau <= 0 and follows the 1 - c*tau^-alpha tail after the atlas.
+        """
+        if not self.covers(alpha):
+            raise ValueError("Fractional order out of the atlas range [{}, {}]".format(
+                self.alpha[0], self.alpha[-1]))
+
+        tau = np.asarray(tau, dtype=float)
+        row = min(np.searchsorted(self.alpha, alpha, side='right') - 1, len(self.alpha) - 2)
+        weight = (alpha - self.alpha[row])/(self.alpha[row+1] - self.alpha[row])
+
+        y = (1 - weight)*np.interp(tau, self.tau, self.steps[row], left=0) \
+            + weight*np.interp(tau, self.tau, self.steps[row+1], left=0)
+
+        tail = tau > self.tau[-1]
+        if np.any(tail):
+            last = (1 - weight)*self.steps[row, -1] + weight*self.steps[row+1, -1]
+            y[tail] = 1 - (1 - last)*np.power(self.tau[-1]/tau[tail], alpha)
+        return y
+
+_default_atlas = None
+_default_lock = Lock()
+
+def default_atlas() -> FomAtlas:
+    """ Packaged atlas, loaded on first use
+    """
+    global _default_atlas
+    with _default_lock:
+        if _default_atlas is None:
+            _default_atlas = FomAtlas()
+        return _default_atlas
+
+def buildAtlas(atlas_path: str = ATLAS_PATH) -> np.ndarray:
+    """ Computes the atlas and saves it as a float32 .npy matrix, the tau
+    grid on the first row and the alpha grid on the first column
+    """
+    data = np.zeros((len(ALPHA_GRID) + 1, len(TAU_GRID) + 1), dtype=np.float32)
+    data[0, 1:] = TAU_GRID
+    data[1:, 0] = ALPHA_GRID
+    for row, alpha in enumerate(ALPHA_GRID, 1):
+        data[row, 1:] = stepResponse(alpha, TAU_GRID)
+    np.save(atlas_path, data)
+    return data
+
+if __name__ == '__main__':
+    buildAtlas()
+    print("Atlas saved on {}".format(path.abspath(ATLAS_PATH)))
@@ -0,0 +1,98 @@
+from scipy.signal import fftconvolve
+import numpy as np
+
+UNIFORM_RTOL = 1e-6   # Relative spread of the sample periods of an uniform grid
+REPEATED_POLE = 1e-6  # |a - 1| under which both time constants are the same
+
+def uniformStep(t):
+    """ Sample period of an uniform time vector, None when it is not
+    """
+    t = np.asarray(t, dtype=float)
+    if len(t) < 2:
+        return None
+    h = (t[-1] - t[0])/(len(t) - 1)
+    if not (h > 0 and np.allclose(np.diff(t), h, rtol=UNIFORM_RTOL, atol=0)):
+        return None
+    return h
+
+def fohKernels(
+        h: float,   # Sample period
+        n: int,     # Kernel samples
+        T,          # Main time constants array
+        a,          # Second time constant ratios array, [0, 1]
+) -> tuple:
+    """ Exact first order hold kernels of the unitary gain models
+    1/((T*s + 1)(a*T*s + 1)), the FOPDT (a=0), SOPDT (a=1) and overdamped
+    Alfaro123c models.
+
+    An input linear between samples is a sum of hat functions, whose
+    responses are second differences of the ramp response
+    R(t) = t - (T1 + T2) + E(t). Only the exponential part E is
+    differenced, in forms without cancellation or overflow.
+
+    :returns: The (models, n) kernels, y_k = sum(w_j*u_{k-j}), and the
+    kernels of the first sample, which only holds the right half of its hat
+    :rtype: tuple
+    """
+    T1 = np.asarray(T, dtype=float).reshape(-1, 1)
+    a = np.asarray(a, dtype=float).reshape(-1, 1)
+    T2 = a*T1
+    t = h*np.arange(1, n)          # Samples after the first one
+    x1 = h/T1
+    decay1 = np.exp(-(t - h)/T1)   # exp(-(t - h)/T1)
+
+    repeated = np.abs(a - 1) < REPEATED_POLE
+    distinct = ~repeated & (T2 > 0)
+    T2_safe = np.where(distinct, T2, 1.0)
+    x2 = h/T2_safe
+    decay2 = np.where(distinct, np.exp(-(t - h)/T2_safe), 0.0)
+
+    ## Distinct or single pole, E(t) = (T1^2*exp(-t/T1) - T2^2*exp(-t/T2))/(T1 - T2)
+    scale = np.where(repeated, 0.0, 1/np.where(repeated, 1.0, T1 - T2))
+    c1, c2 = scale*T1*T1, -scale*T2*T2
+    kernel = (c1*np.expm1(-x1)**2*decay1 + c2*np.expm1(-x2)**2*decay2)/h
+    first = c1*decay1*(-np.expm1(-x1)/h - np.exp(-x1)/T1) \
+        + c2*decay2*(-np.expm1(-x2)/h - np.exp(-x2)/T2_safe)
+
+    ## Repeated pole, E(t) = (t + 2*T1)*exp(-t/T1)
+    tc = t + 2*T1
+    kernel_r = decay1*(tc*np.expm1(-x1)**2 + h*np.expm1(-2*x1))/h
+    first_r = decay1*(np.exp(-x1)*(1 - tc/T1) - (tc*np.expm1(-x1) + h)/h)
+    kernel = np.where(repeated, kernel_r, kernel)
+    first = np.where(repeated, first_r, first)
+
+    ## First sample, R(h)/h and a null step response
+    T_sum = np.where(repeated, 2*T1, T1 + T2)
+    E_h = np.where(
+        repeated,
+        (h + 2*T1)*np.exp(-x1),
+        c1*np.exp(-x1) + c2*np.where(distinct, np.exp(-x2), 0.0))
+    kernel = np.concatenate(((h - T_sum + E_h)/h, kernel), axis=1)
+    first = np.concatenate((np.zeros((len(T1), 1)), first), axis=1)
+
+    return kernel, first
+
+def forcedResponses(
+        t,          # Time vector
+        u,          # Input vector
+        K,          # Gains array
+        T,          # Main time constants array
+        a,          # Second time constant ratios array
+):
+    """ Responses of the models K/((T*s + 1)(a*T*s + 1)) to the input u
+    linear between samples, from rest, the control.forced_response
+    convention. Every model is convolved with the input on one FFT pass.
+
+    :returns: The (models, len(t)) responses, None when t is not uniform so
+    the caller falls back to control.forced_response
+    :rtype: numpy.ndarray
+    """
+    h = uniformStep(t)
+    if h is None:
+        return None
+    u = np.asarray(u, dtype=float)
+    n = len(u)
+
+    kernel, first = fohKernels(h, n, T, a)
+    y = fftconvolve(kernel, u[np.newaxis, :], axes=-1)[:, :n] + u[0]*(first - kernel)
+    return np.asarray(K, dtype=float).reshape(-1, 1)*y
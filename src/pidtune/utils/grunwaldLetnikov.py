@@ -0,0 +1,242 @@
+from scipy.signal import fftconvolve
+import numpy as np
+
+from .loopSimulator import CHUNK_DELAYS, MAX_SAMPLES, SETTLING_BAND
+
+## Simulation defaults, the accuracy/speed knobs
+SCALE_SAMPLES = 100   # Samples per plant time scale T^(1/alpha)
+DELAY_SAMPLES = 100   # Samples per dead time on closed-loop simulations
+SERIES_BLOCK = 64     # seriesInverse direct block size
+
+def glWeights(alpha: float, n: int) -> np.ndarray:
+    """ First n Grünwald–Letnikov weights, the (1 - z)^alpha series
+    coefficients c_j = c_{j-1}*(1 - (alpha + 1)/j) with c_0 = 1
+    """
+    c = np.ones(n)
+    c[1:] = np.cumprod(1 - (alpha + 1)/np.arange(1, n))
+    return c
+
+def seriesInverse(q, n: int, block: int = SERIES_BLOCK) -> np.ndarray:
+    """ First n coefficients of the power series 1/q(z) along the last axis.
+
+    It is the forward substitution q*g = 1, the recursion itself, split by
+    halves: the contribution of the first half of the coefficients to the
+    second one is a single FFT product and the blocks are solved with the
+    inverse of their lower triangular Toeplitz matrix. It costs
+    O(n log^2 n) and, unlike Newton iterations, does not amplify rounding
+    errors on slowly decaying series.
+    """
+    q = np.asarray(q, dtype=float)
+    lead = q.shape[:-1]
+    q = np.concatenate((q[..., :n], np.zeros(lead + (max(0, n - q.shape[-1]),))), axis=-1)
+    b = min(block, n)
+
+    ## First block coefficients, they invert the block matrices
+    head = np.zeros(lead + (b,))
+    head[..., 0] = 1/q[..., 0]
+    for k in range(1, b):
+        head[..., k] = -np.sum(q[..., 1:k+1]*head[..., k-1::-1], axis=-1)/q[..., 0]
+    lag = np.subtract.outer(np.arange(b), np.arange(b))
+    block_inverse = np.where(lag >= 0, head[..., np.maximum(lag, 0)], 0.0)
+
+    g = np.zeros(lead + (n,))
+    known = np.zeros(lead + (n,)) # Contributions of the solved coefficients
+
+    def solve(start, stop):
+        if stop - start <= b:
+            rhs = -known[..., start:stop]
+            if start == 0:
+                rhs[..., 0] += 1
+            g[..., start:stop] = np.einsum(
+                '...ij,...j->...i', block_inverse[..., :stop-start, :stop-start], rhs)
+            return
+        middle = (start + stop)//2
+        solve(start, middle)
+        known[..., middle:stop] += fftconvolve(
+            g[..., start:middle], q[..., :stop-start], axes=-1)[..., middle-start:stop-start]
+        solve(middle, stop)
+
+    solve(0, n)
+    return g
+
+def _uniform_step(t) -> float:
+    t = np.asarray(t, dtype=float)
+    if len(t) < 2:
+        raise ValueError("Time vector needs at least two samples")
+    h = (t[-1] - t[0])/(len(t) - 1)
+    if not (h > 0 and np.allclose(np.diff(t), h, rtol=1e-6, atol=0)):
+        raise ValueError("Grünwald–Letnikov simulation needs an uniform time vector")
+    return h
+
+def _controller_series(controllers_ss, h: float, n: int) -> np.ndarray:
+    """ First n samples of the controllers impulse responses with a first
+    order hold on the error, (m, n) array. controllerSS realizations are
+    diagonal, each state x' = p*x + b*e is integrated exactly for an error
+    linear between samples.
+    """
+    Ac, Bc, Cc, Dc = controllers_ss
+    p = np.diagonal(Ac, axis1=1, axis2=2) # (m, states)
+    b, c = Bc[:, :, 0], Cc[:, 0, :]
+
+    ph = p*h
+    phi = np.exp(ph)
+    nonzero = p != 0
+    p_safe = np.where(nonzero, p, 1.0)
+    g0 = b*np.where(nonzero, np.expm1(ph)/p_safe, h)                    # Error sample
+    g1 = b*np.where(nonzero, (np.expm1(ph) - ph)/(p_safe*p_safe*h), h/2) # Error slope
+
+    weights = c*(phi*g1 + g0 - g1)
+    series = np.empty((len(p), n))
+    series[:, 0] = Dc[:, 0, 0] + np.sum(c*g1, axis=1)
+    series[:, 1:] = np.einsum('ms,msj->mj', weights, phi[:, :, None]**np.arange(n-1))
+    return series
+
+class GrunwaldLetnikov():
+    """ Direct simulation of the fractional order model
+    K*exp(-L*s)/(T*s^alpha + 1), without a rational approximation of s^alpha.
+
+    The model is discretized on an uniform grid t_k = k*h with the full
+    memory Grünwald–Letnikov derivative, shifted to t_k - alpha*h/2 (the
+    Crank–Nicolson rule for alpha = 1), so its impulse response is the
+
+        (1 - alpha/2 + alpha/2*z)/(T*h^-alpha*(1 - z)^alpha + 1 - alpha/2 + alpha/2*z)
+
+    series. The series and the closed-loop ones are inverted with FFT
+    products, see seriesInverse, n samples cost O(n log^2 n) instead of the
+    O(n^2) of the recursion, and forced responses are FFT convolutions.
+
+    The step h is the accuracy/speed knob: the error is O(h^2) for smooth
+    responses and O(h^alpha) right after a step, the cost O(n log^2 n)
+    with n = horizon/h. forced_response inputs are linear between samples,
+    step_response and closed_loop take half the step on the first sample.
+    """
+    def __init__(
+            self,
+            K: float,       # Proportional constant
+            T: float,       # Time constant
+            L: float,       # Dead time
+            alpha: float,   # Fractional order, (0, 2)
+            scale_samples: int = SCALE_SAMPLES,
+    ):
+        if not (T > 0 and L >= 0 and 0 < alpha < 2 and scale_samples >= 1):
+            raise ValueError("Grünwald–Letnikov model wrong input values")
+
+        self.K, self.T, self.L, self.alpha = K, T, L, alpha
+        self.h = np.power(T, 1/alpha)/scale_samples # Default step
+        if L > 0: # Whole dead time samples
+            self.h = L/np.ceil(L/self.h - 1e-9)
+        self._impulse = {} # Impulse responses by step
+
+    def impulse(self, h: float, n: int) -> np.ndarray:
+        """ First n samples of the delay free discrete impulse response, K
+        excluded, kept for each step h
+        """
+        g = self._impulse.get(h)
+        if g is None or len(g) < n:
+            shift = np.array([1 - self.alpha/2, self.alpha/2])
+            q = self.T*np.power(h, -self.alpha)*glWeights(self.alpha, n)
+            q[:2] += shift[:n]
+            g = self._impulse[h] = fftconvolve(seriesInverse(q, n), shift)[:n]
+        return g[:n]
+
+    def _step(self, h: float, n: int) -> np.ndarray:
+        g = self.impulse(h, n)
+        steps = np.cumsum(g) - g/2 # Half step on the first sample
+        steps[0] = 0.0
+        return steps
+
+    def forced_response(self, t, u) -> np.ndarray:
+        """ Response to the input u sampled on the uniform time vector t,
+        the plant is at rest with zero input before t[0]. u may hold one
+        input per column.
+        """
+        h = _uniform_step(t)
+        t = np.asarray(t, dtype=float)
+        u = np.asarray(u, dtype=float)
+        n = len(t)
+
+        # u(t - L), zero before t[0]
+        delayed = np.stack([
+            np.interp(t - self.L, t, column, left=0) for column in u.reshape(n, -1).T], axis=1)
+        g = self.impulse(h, n)
+        y = self.K*fftconvolve(g[:, np.newaxis], delayed, axes=0)[:n]
+        return y.reshape(u.shape)
+
+    def step_response(self, t=None) -> tuple:
+        """ Unit step response on the uniform time vector t. Without t it
+        runs on the default grid until the response is inside SETTLING_BAND
+        of K or MAX_SAMPLES.
+
+        :returns: The time vector and the response
+        :rtype: tuple
+        """
+        if t is not None:
+            h = _uniform_step(t)
+            t = np.asarray(t, dtype=float)
+            steps = self._step(h, len(t))
+            return t, self.K*np.interp(t - t[0] - self.L, np.arange(len(t))*h, steps, left=0)
+
+        n = min(CHUNK_DELAYS*SCALE_SAMPLES, MAX_SAMPLES)
+        while True:
+            steps = self._step(self.h, n)
+            if n >= MAX_SAMPLES or abs(steps[-1] - 1) <= SETTLING_BAND:
+                break
+            n = min(2*n, MAX_SAMPLES)
+
+        delay = int(round(self.L/self.h))
+        y = self.K*np.concatenate((np.zeros(delay), steps))
+        return np.arange(len(y))*self.h, y
+
+    def closed_loop(
+            self,
+            controllers_ss,                 # Batched controllers (A, B, C, D), loopSimulator.controllerSS
+            delay_samples: int = DELAY_SAMPLES,
+    ) -> tuple:
+        """ Servo (r=1, d=0) and regulatory (r=0, d=1) step responses of the
+        loops u = C(s)(r - y), y = P(s)(u + d) for m controllers, the same
+        outputs LoopSimulator.run returns.
+
+        The step is the smallest of L/delay_samples and the default one and the controllers are
+        discretized with a first order hold on the error. The loop series
+        y = P*C/(1 + P*C)*r + P/(1 + P*C)*d are inverted for a horizon that
+        doubles until every response is stationary or MAX_SAMPLES.
+
+        :returns: The time vector and the (samples, m, 2) outputs
+        :rtype: tuple
+        """
+        if not self.L > 0:
+            raise ValueError("Closed-loop simulation needs a plant with dead time")
+        if delay_samples < 1:
+            raise ValueError("Dead time needs at least one sample")
+        delay = max(delay_samples, int(round(self.L/self.h)))
+        h = self.L/delay
+
+        target = np.array([1.0, 0.0]) # Servo goes to 1, regulatory to 0
+        n = min(CHUNK_DELAYS*delay, MAX_SAMPLES)
+        while True:
+            plant = np.zeros(n)
+            plant[delay:] = self.K*self.impulse(h, n - delay)
+
+            loop = fftconvolve(_controller_series(controllers_ss, h, n), plant[None, :], axes=-1)[:, :n]
+            loop[:, 0] += 1
+            sensitivity = seriesInverse(loop, n)
+
+            servo = -sensitivity # P*C/(1 + P*C) = 1 - S
+            servo[:, 0] += 1
+            regulatory = fftconvolve(sensitivity, plant[None, :], axes=-1)[:, :n]
+            impulses = np.stack((servo, regulatory), axis=-1).transpose(1, 0, 2)
+            y = np.cumsum(impulses, axis=0) - impulses/2 # Half steps on the first sample
+            y[:delay+1] = 0.0 # Exact, the output is continuous and still at L
+
+            last = y[-CHUNK_DELAYS*delay:]
+            if (n >= MAX_SAMPLES or not np.all(np.isfinite(last))
+                    or np.all(np.abs(last - target) <= SETTLING_BAND)):
+                break
+            n = min(2*n, MAX_SAMPLES)
+
+        # Keep up to the last sample out of the band
+        moving = np.flatnonzero(np.any(np.abs(y - target) > SETTLING_BAND, axis=(1, 2)))
+        samples = max(moving[-1] + 2, delay + 1) if len(moving) else len(y)
+        y = y[:min(samples, len(y))]
+
+        return np.arange(len(y))*h, y
@@ -1,40 +1,420 @@
-from typeguard import typechecked
-from control import tf
-from control.matlab import zpk2tf as zpk, trapz, pade, step
-from .cronePalula2 import cronePalula2 as APC
-#import numpy as np
+from typing import Optional
+from ..debug import typechecked
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Event
+from os import cpu_count
+from control import tf, pade, step_response
+from control.matlab import zpk2tf as zpk
+from scipy.optimize import minimize
+from scipy.stats import qmc
+import time
+from .cronePadula2 import cronePadula2 as APC
+from .vectUtils import FloatVector, asVector
+from . import fomAtlas
+from collections import OrderedDict
+from threading import Lock
+import numpy as np
+
+## IDFOM.m constants
+SAMPLE = 7                 # Samples used to average the initial/final values
+MAX_ITER = 200             # fmincon MaxIter
+MAX_FUN_EVALS = 1000       # fmincon MaxFunEvals
+BOUNDS_FACTOR = 0.9        # Optimization range x0*(1-0.9), x0*(1+0.9)
+PADE_ORDER = 18            # Octave padecoef order for the dead time
+SHIFT_CACHE_SIZE = 64      # Delay free responses kept by ShiftedStep
+
+## Model step response engines, the f_IDFOM.m simulation, the same model with
+## the dead time as a time shift or the packaged atlas
+engines = ('oustaloup', 'oustaloup_shift', 'atlas')
+
+class _MaxFunEvals(Exception):
+    pass
+
+class _Stopped(Exception):
+    pass
+
+_stop_event = None # Set by the multi-start pool when a start is good enough
+
+def fomModel(
+        T: float,     # Model main time constant
+        v: float,     # Model fractional order
+        delay: float, # Model dead time, L+tin
+):
+    """ Returns the control.tf of 1*exp(-delay*s)/(T*s^v+1) using the CRONE
+    approximation for s^v and a Padé approximation for the dead time, the
+    same model f_IDFOM.m builds on Octave.
+    """
+    if v < 1:
+        z, p, k = APC(1.0, float(-v), 0.001, 1000)
+        den, num = zpk(z, p, k) # Gmm = 1/zpk
+    else:
+        z, p, k = APC(1.0, float(v), 0.001, 1000)
+        num, den = zpk(z, p, k) # Gmm = zpk
+
+    # 1/(T*Gmm+1)
+    Gm0 = tf(den, np.polyadd(np.multiply(T, num), den))
+    if not delay:
+        return Gm0
+    pade_num, pade_den = pade(delay, PADE_ORDER)
+    return Gm0*tf(pade_num, pade_den)
+
+def fomStep(
+        T: float,     # Model main time constant
+        v: float,     # Model fractional order
+        delay: float, # Model dead time, L+tin
+        tnorm,        # Normalized time vector
+):
+    """ Step response of the fractional model over tnorm
+    """
+    return step_response(fomModel(T, v, delay), tnorm).outputs
+
+class ShiftedStep():
+    """ fomStep with the dead time as an exact time shift instead of the Padé
+    approximation. The delay free model is simulated once per (T, v) over
+    tnorm and shifted by linear interpolation, the last SHIFT_CACHE_SIZE
+    responses are kept so the evaluations that only move L reuse them.
+    """
+    def __init__(self, size: int = SHIFT_CACHE_SIZE):
+        self.size = size
+        self._tnorm = None
+        self._responses = OrderedDict()
+        self._lock = Lock()
+
+    def delay_free(self, T: float, v: float, tnorm) -> np.ndarray:
+        tnorm = np.asarray(tnorm, dtype=float)
+        key = (float(T), float(v))
+        with self._lock:
+            if self._tnorm is None or not (
+                    tnorm is self._tnorm or np.array_equal(tnorm, self._tnorm)):
+                self._tnorm = tnorm # A new time vector, a new cache
+                self._responses.clear()
+            response = self._responses.get(key)
+            if response is not None:
+                self._responses.move_to_end(key)
+                return response
+
+        response = step_response(fomModel(T, v, 0.0), tnorm).outputs
+        with self._lock:
+            if tnorm is self._tnorm or np.array_equal(tnorm, self._tnorm):
+                self._responses[key] = response
+                while len(self._responses) > self.size:
+                    self._responses.popitem(last=False)
+        return response
+
+    def __call__(
+            self,
+            T: float,     # Model main time constant
+            v: float,     # Model fractional order
+            delay: float, # Model dead time, L+tin
+            tnorm,        # Normalized time vector
+    ):
+        tnorm = np.asarray(tnorm, dtype=float)
+        return np.interp(tnorm - delay, tnorm, self.delay_free(T, v, tnorm), left=0)
+
+shiftedStep = ShiftedStep()
+
+def atlasStep(
+        T: float,     # Model main time constant
+        v: float,     # Model fractional order
+        delay: float, # Model dead time, L+tin
+        tnorm,        # Normalized time vector
+):
+    """ Exact step response of the fractional model over tnorm from the
+    normalized response atlas, scaled by T^(1/v) and shifted by the dead
+    time. Orders out of the atlas and non positive T fall back to fomStep.
+    """
+    atlas = fomAtlas.default_atlas()
+    if not (T > 0 and atlas.covers(v)):
+        return fomStep(T, v, delay, tnorm)
+    return atlas.step(v, (np.asarray(tnorm) - delay)/np.power(T, 1/v))
+
+_steps = {'oustaloup': fomStep, 'oustaloup_shift': shiftedStep, 'atlas': atlasStep}
 
-@typechecked
 def IDFOM(
         T: float,        # Plant main time constant
         v: float,        # Plant fractional order
         L: float,        # Plant dead time
-        tnorm: list,     # Normalized time vector
-        ynorm: list,     # Normalized plantresponse vector
+        tnorm,           # Normalized time vector
+        ynorm,           # Normalized plant response vector
         tin: float,      # Time the step input is applied to the plant
         flagtin: int,    # Indicates the tin position in data vector
-        opp: bool = True # Flag TODO
-) -> any: # TODO
+        opp: bool = True, # Drop the error before the step is applied
+        engine: str = 'oustaloup', # Model step response engine
+) -> float:
+    """ IDFOM cost function, f_IDFOM.m port. It returns the IAE between the
+    normalized plant response and the model step response.
+    """
+    yout = _steps[engine](T, v, L+tin, tnorm)
+    error = np.abs(np.subtract(yout, ynorm))
 
-    s = tf('s') # Defines the S operator
-    if v < 1:
-        z,p,k = APC(1,-v,0.001,1000)
-        temp_l = zpk(z,p,k);
-        Gmm=1/tf(temp_l[0],temp_l[1])
+    if opp:
+        return float(np.trapz(error, tnorm) - np.trapz(error[:flagtin], tnorm[:flagtin]))
+
+    return float(np.trapz(error, tnorm))
+
+def _firstIndex(condition):
+    """ First index where condition is True, the last sample is excluded
+    the same way IDFOM.m loops do (while m<long)
+    """
+    index = np.flatnonzero(condition[:-1])
+    if not len(index):
+        raise ValueError("Plant response does not reach the expected values")
+    return index[0]
+
+def _halfPeriod(t, y):
+    """ Time between the first y>=1 point and the next y<=1 one
+    """
+    os1 = np.flatnonzero(y[:-1] >= 1)
+    if not len(os1):
+        return None
+    os2 = np.flatnonzero(y[os1[0]:-1] <= 1)
+    if not len(os2):
+        return None
+    return t[os1[0] + os2[0]] - t[os1[0]]
+
+def initialValues(tnorm, ynorm, tin: float, engine: str = 'oustaloup') -> tuple:
+    """ IDFOM.m initial values heuristics, it returns (T0, v0, L0)
+    """
+    yinf = ynorm[-1]
+    ymax = np.max(ynorm)
+
+    t63 = tnorm[_firstIndex(ynorm > 0.632*yinf)]
+    t3 = tnorm[_firstIndex(np.logical_and(ynorm > 0.03*yinf, tnorm > tin))]
+    t90 = tnorm[_firstIndex(ynorm > 0.9*yinf)]
+
+    ## Fractional order initial value
+    tt = t63/t90
+    Mp = (ymax-yinf)/yinf # Overshoot when dynamic underdamped
+
+    if ymax > yinf:
+        root = np.sqrt(np.power(-1.4182, 2) - 4*0.8032*(0.6115-Mp))
+        v1 = (1.4182+root) / (2*0.8032)
+        v2 = (1.4182-root) / (2*0.8032)
+        v0 = v1 if (v1 >= 1 and v1 <= 3) else v2
+    elif (tt >= 0 and tt < 0.4325):
+        x = np.arange(71)*0.01 + 0.3 # Fractional order variation
+        tx = -0.1621*np.power(x, 3) + 0.9351*np.power(x, 2) - 0.4089*x + 0.0711
+        col = np.flatnonzero(tx >= tt)
+        v0 = x[col[0]] if len(col) else 1.0
     else:
-        z,p,k = APC(1,v,0.001,1000)
-        temp_l = zpk(z,p,k);
-        Gmm=tf(temp_l[0],temp_l[1])
+        v0 = 1.0
 
-    Gm0 = 1*pade(L+tin, 18)/(v*Gmm+1)
-    yout, i = step(Gm0,tnorm);
+    ## Times the signal crosses over 1
+    totalosc = 0
+    if v0 > 1.3: # Only compute this data when FT or MTE is introduced
+        totalosc = np.count_nonzero(np.logical_and(ynorm[:-1] < 1, ynorm[1:] > 1))
 
-    if opp:
-        tnorm_temp = tnorm[:flagtin]
-        ynorm_temp = ynorm[:flagtin]
-        yout_temp = yout[:flagtin]
+    ## L0 definition
+    L0 = t3-tin
+
+    tu = _halfPeriod(tnorm, ynorm) if (v0 >= 1.4349 and totalosc >= 2) else None
+    if tu is not None:
+        ## Oscillation half period search for T0
+        T0 = 0.05
+        while T0 < 1000:
+            tuT0 = _halfPeriod(tnorm, _steps[engine](T0, v0, 0.0, tnorm))
+            if tuT0 is not None and tu <= tuT0:
+                break
+            T0 += 0.05
+    else:
+        T0 = np.power(t63-(tin+L0), v0)
+
+    return float(T0), float(v0), float(L0)
+
+def _optimize(
+        start: int,     # Start index on the report
+        x0,             # Initial [T, v, L]
+        bounds,         # Optimization range
+        tnorm, ynorm,   # Normalized time and response vectors
+        tin: float,     # Time the step input is applied to the plant
+        flagtin: int,   # Indicates the tin position in data vector
+        engine: str,    # Model step response engine
+        Tolf: float,    # SLSQP ftol
+) -> dict:
+    """ One bounded SLSQP run from x0, it keeps the best evaluated point.
+
+    :returns: The start report, its x0, best x and IAE, cost evaluations,
+    seconds and status: 'done', 'max_evals' or 'stopped' by another start
+    :rtype: dict
+    """
+    started = time.perf_counter()
+    x0 = np.asarray(x0, dtype=float)
+    lower, upper = np.transpose(bounds)
+    best = {'J': np.inf, 'x': x0, 'nfev': 0}
+    def costfun(xns):
+        if best['nfev'] >= MAX_FUN_EVALS:
+            raise _MaxFunEvals()
+        if _stop_event is not None and _stop_event.is_set():
+            raise _Stopped()
+        best['nfev'] += 1
+        xns = np.clip(xns, lower, upper) # Finite differences may step out
+        J = IDFOM(xns[0], xns[1], xns[2], tnorm, ynorm, tin, flagtin, True, engine)
+        if J < best['J']:
+            best['J'], best['x'] = J, np.array(xns)
+        return J
+
+    status = 'done'
+    try:
+        minimize(
+            costfun,
+            x0,
+            method='SLSQP',
+            bounds=bounds,
+            options={'maxiter': MAX_ITER, 'ftol': Tolf}
+        )
+    except _MaxFunEvals:
+        status = 'max_evals'
+    except _Stopped:
+        status = 'stopped'
+
+    return {
+        'start'  : start,
+        'x0'     : x0.tolist(),
+        'x'      : best['x'].tolist(),
+        'IAE'    : float(best['J']),
+        'nfev'   : best['nfev'],
+        'seconds': time.perf_counter() - started,
+        'status' : status,
+    }
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+def latinStarts(bounds, n: int, seed: int = 0) -> np.ndarray:
+    """ n Latin hypercube points over the optimization range, (n, 3)
+    """
+    lower, upper = np.transpose(bounds)
+    return lower + qmc.LatinHypercube(d=len(lower), seed=seed).random(n)*(upper - lower)
+
+def _multiStart(x0s, args, max_workers: int, tolerance: float) -> list:
+    """ Runs _optimize from every x0, a start with IAE <= tolerance stops the
+    running ones and cancels the queued ones. Starts run one after the other
+    in this process with max_workers=1, concurrently on a process pool
+    otherwise.
+    """
+    reports = {}
+    cancelled = lambda i: {'start': i, 'x0': list(map(float, x0s[i])), 'x': None,
+                           'IAE': np.inf, 'nfev': 0, 'seconds': 0.0, 'status': 'cancelled'}
+
+    if max_workers == 1:
+        for i, x0 in enumerate(x0s):
+            if tolerance is not None and any(r['IAE'] <= tolerance for r in reports.values()):
+                reports[i] = cancelled(i)
+            else:
+                reports[i] = _optimize(i, x0, *args)
+        return [reports[i] for i in range(len(x0s))]
+
+    stop = Event()
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(stop,)) as executor:
+        futures = {executor.submit(_optimize, i, x0, *args): i for i, x0 in enumerate(x0s)}
+        for future in as_completed(futures):
+            i = futures[future]
+            if future.cancelled():
+                reports[i] = cancelled(i)
+                continue
+            reports[i] = future.result()
+            if tolerance is not None and reports[i]['IAE'] <= tolerance:
+                stop.set()
+                for pending in futures:
+                    pending.cancel()
+    return [reports[i] for i in range(len(x0s))]
+
+@typechecked
+def identify(
+        time_vector: FloatVector, # Time vector to identify the plant model
+        step_vector: FloatVector, # Step vector to identify the plant model
+        resp_vector: FloatVector, # Open-loop system response to identify the plant model
+        engine: str = 'oustaloup', # Model step response engine, see engines
+        starts: int = 1,           # Optimizer starts, the heuristic one and a Latin hypercube
+        tolerance: Optional[float] = None,   # IAE that stops the other starts
+        max_workers: Optional[int] = None,   # Multi-start process pool size, CPUs by default
+        seed: int = 0,             # Latin hypercube seed
+) -> dict:
+    """ Native IDFOM.m port, it identifies a fractional order model
+    K*exp(-L*s)/(T*s^v+1) from an open-loop step test.
+
+    The fmincon active-set optimization is replaced by the SLSQP bounded
+    optimizer with the same range, iterations and tolerances. The 'oustaloup'
+    engine simulates the CRONE and Padé approximated model as f_IDFOM.m
+    does, 'oustaloup_shift' applies the dead time as a time shift, see
+    ShiftedStep, and 'atlas' interpolates the exact response, see fomAtlas.
+
+    With starts > 1 the optimizer also runs from starts - 1 Latin hypercube
+    points of the range, concurrently on a process pool of max_workers, and
+    the best point is kept. The first start reaching an IAE <= tolerance
+    stops the others.
+
+    :returns: The model constants (v, T, K, L, IAE), the normalized
+    time, step, response and model response vectors and the per-start
+    reports, see _optimize
+    :rtype: dict
+    """
+    if engine not in engines:
+        raise ValueError("Unknown step response engine, valid options are {}".format(engines))
+    if starts < 1:
+        raise ValueError("At least one optimizer start is needed")
+
+    t = asVector(time_vector)
+    u = asVector(step_vector)
+    y = asVector(resp_vector)
+
+    if not (len(t) == len(u) == len(y)) or len(t) <= 2*SAMPLE:
+        raise ValueError("Vectors need to keep the same length")
+
+    ## Static gain processing
+    Uo = np.mean(u[:SAMPLE])
+    Uf = np.mean(u[-SAMPLE:])
+    Yo = np.mean(y[:SAMPLE])
+    Yf = np.mean(y[-SAMPLE:])
+    Ko = (Yf-Yo)/(Uf-Uo)
+
+    ## Parameters normalization
+    ynorm = (y-Yo)/(Yf-Yo)
+    unorm = (u-Uo)/(Uf-Uo)
+    tnorm = t-np.min(t)
+
+    ## Get step time
+    changes = np.flatnonzero(np.diff(unorm))
+    if not len(changes):
+        raise ValueError("There is no step in the step vector")
+    flagtin = int(changes[0]) + 1 # Samples before the step, Octave index
+    tin = float(tnorm[changes[0]])
+
+    T0, v0, L0 = initialValues(tnorm, ynorm, tin, engine)
+
+    x0 = np.array([T0, v0, L0])
+    bounds = list(zip(x0*(1-BOUNDS_FACTOR), x0*(1+BOUNDS_FACTOR)))
+
+    ym0 = _steps[engine](T0, v0, L0+tin, tnorm)
+    Tolf = np.trapz(np.abs(ym0-ynorm), tnorm)*1e-7
+
+    ## Optimization, keep the best evaluated point of every start
+    x0s = [x0]
+    if starts > 1:
+        x0s.extend(latinStarts(bounds, starts - 1, seed))
+    max_workers = max_workers or min(starts, cpu_count() or 1)
+    if max_workers < 1:
+        raise ValueError("max_workers must be greater than 0")
+    reports = _multiStart(
+        x0s, (bounds, tnorm, ynorm, tin, flagtin, engine, Tolf), max_workers, tolerance)
+
+    best = min((r for r in reports if r['x'] is not None), key=lambda r: r['IAE'])
+    To, vo, Lo = best['x']
+    IAE = best['IAE']
 
-        return trapz(tnorm, [abs(i-j) for i,j in zip(yout-ynorm)]) - \
-            trapz(tnorm_temp, [abs(i-j) for i,j in zip(yout_temp-ynorm_temp)])
+    ym = _steps[engine](To, vo, Lo+tin, tnorm)
 
-    return trapz(tnorm, [abs(i-j) for i,j in zip(yout-ynorm)])
+    return {
+        'v'   : float(vo),
+        'T'   : float(To),
+        'K'   : float(Ko),
+        'L'   : float(Lo),
+        'IAE' : float(IAE),
+        'time_vector'       : tnorm,
+        'step_vector'       : unorm,
+        'resp_vector'       : ynorm,
+        'model_resp_vector' : ym,
+        'starts'            : reports,
+    }
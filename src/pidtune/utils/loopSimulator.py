@@ -0,0 +1,168 @@
+from scipy.linalg import expm
+import numpy as np
+
+## Simulation defaults
+DELAY_SAMPLES = 50       # Samples per dead time, the step is h = L/50
+CHUNK_DELAYS = 10        # Dead times simulated before each settling check
+MAX_SAMPLES = 100000     # Horizon limit for slow or unstable loops
+SETTLING_BAND = 0.00005  # Responses inside this band are stationary
+
+def controllerSS(
+        kp,                  # Proportional gain, float or array
+        ti,                  # Integral time, float or array
+        td,                  # Derivative time, float or array
+        filter_constant=0.1, # Derivative filter constant, float or array
+        action=1,            # Controller action, float or array
+) -> tuple:
+    """ State space realization of the ODoF PID controller
+    action*kp*(1 + 1/(ti*s) + td*s/(1 + filter_constant*td*s)) for an
+    array of controllers, the states are the error integral and the
+    derivative filter output.
+
+    :returns: The (m, 2, 2), (m, 2, 1), (m, 1, 2) and (m, 1, 1) A, B, C, D
+    matrices for m controllers
+    :rtype: tuple
+    """
+    kp, ti, td, filter_constant, action = np.broadcast_arrays(
+        *(np.ravel(np.asarray(x, dtype=float)) for x in (kp, ti, td, filter_constant, action)))
+    m = len(kp)
+    gain = action*kp
+    derivative = td > 0
+
+    # PI controllers keep an inert filter state
+    tf = np.where(derivative, filter_constant*td, 1.0)
+    d_gain = np.where(derivative, 1/np.where(derivative, filter_constant, 1.0), 0.0)
+
+    A = np.zeros((m, 2, 2))
+    A[:, 1, 1] = -1/tf
+    B = np.zeros((m, 2, 1))
+    B[:, 0, 0] = 1.0
+    B[:, 1, 0] = np.where(derivative, 1/tf, 0.0)
+    C = np.zeros((m, 1, 2))
+    C[:, 0, 0] = gain/ti
+    C[:, 0, 1] = -gain*d_gain
+    D = (gain*(1 + d_gain)).reshape(m, 1, 1)
+
+    return A, B, C, D
+
+class LoopSimulator():
+    """ Discrete time simulator for m closed loops sharing a plant with
+    dead time L, the loops are u = C(s)(r - y) and y = P(s)exp(-L*s)(u + d).
+
+    The dead time is an integer number of steps held on a ring buffer,
+    so it is exact. The reference and disturbance steps enter through a
+    zero order hold and the delayed output through a first order hold,
+    each loop runs the servo (r=1, d=0) and regulatory (r=0, d=1)
+    responses as two columns of the same state update.
+    """
+    def __init__(
+            self,
+            plant_ss,               # Plant (A, B, C, D) matrices without dead time
+            dead_time: float,       # Plant dead time (L)
+            controllers_ss,         # Batched controllers (A, B, C, D) matrices
+            delay_samples: int = DELAY_SAMPLES
+    ):
+        if not dead_time > 0:
+            raise ValueError("Closed-loop simulation needs a plant with dead time")
+        if delay_samples < 1:
+            raise ValueError("Dead time needs at least one sample")
+
+        self.h = dead_time/delay_samples
+        self.delay_samples = delay_samples
+
+        Ap, Bp, Cp, Dp = (np.atleast_2d(np.asarray(x, dtype=float)) for x in plant_ss)
+        Ac, Bc, Cc, Dc = controllers_ss
+        m, nc, n_p = len(Ac), Ac.shape[1], Ap.shape[0]
+        n = nc + n_p
+
+        ## Loop state z = [xc, xp], inputs [r, d] (ZOH) and -y(t-L) (FOH)
+        A = np.zeros((m, n, n))
+        A[:, :nc, :nc] = Ac
+        A[:, nc:, :nc] = Bp @ Cc
+        A[:, nc:, nc:] = Ap
+        Be = np.concatenate((Bc, Bp @ Dc), axis=1) # Controller input
+        Bd = np.broadcast_to(np.concatenate((np.zeros((nc, 1)), Bp)), (m, n, 1))
+
+        self.C = np.concatenate((Dp @ Cc, np.broadcast_to(Cp, (m, 1, n_p))), axis=2)
+        self.De = (Dp @ Dc)[:, 0, 0]
+        self.Dd = float(Dp[0, 0])
+
+        ## Block matrix exponential, expm([[A, B, 0], [0, 0, I], [0, 0, 0]]*h)
+        M = np.zeros((m, n+4, n+4))
+        M[:, :n, :n] = A
+        M[:, :n, n:n+1] = Be
+        M[:, :n, n+1:n+2] = Bd
+        M[:, :n, n+2:n+3] = Be
+        M[:, n+2, n+3] = 1.0
+        E = np.array([expm(Mi*self.h) for Mi in M])
+
+        self.Phi = E[:, :n, :n]
+        self.Gzoh = E[:, :n, n:n+2]          # [r, d] columns
+        self.G0 = E[:, :n, n+2]              # -y(t-L) sample
+        self.G1 = E[:, :n, n+3]/self.h       # -y(t-L) slope
+
+        ## Columns: servo and regulatory responses
+        self.inputs = np.eye(2)
+        self.z = np.zeros((m, n, 2))
+        self.ring = np.zeros((delay_samples, m, 2))
+        self.k = 0
+
+    def advance(self, steps: int) -> np.ndarray:
+        """ Simulates the next steps samples, it returns a (steps, m, 2)
+        array with the servo and regulatory outputs.
+        """
+        out = np.empty((steps, len(self.z), 2))
+        N = self.delay_samples
+        Phi, G0, G1, C = self.Phi, self.G0, self.G1, self.C
+        ring = self.ring
+
+        # r and d steps are applied at t=0 and arrive L later
+        arrived = self.Gzoh @ self.inputs
+        arrived_out = self.De[:, None]*self.inputs[0] + self.Dd*self.inputs[1]
+
+        z = self.z
+        for i in range(steps):
+            k = self.k + i
+            delayed = ring[k % N].copy() # y(k - N)
+            step_on = k >= N
+
+            y = (C @ z)[:, 0, :] - self.De[:, None]*delayed
+            if step_on:
+                y = y + arrived_out
+            out[i] = y
+            ring[k % N] = y
+
+            # Next delayed sample, y(k+1-N), available for N >= 1
+            delayed_next = ring[(k+1) % N]
+            z = Phi @ z \
+                - G0[:, :, None]*delayed[:, None, :] \
+                - G1[:, :, None]*(delayed_next - delayed)[:, None, :]
+            if step_on:
+                z = z + arrived
+
+        self.z = z
+        self.k += steps
+        return out
+
+    def run(self) -> tuple:
+        """ Simulates until every response is stationary or MAX_SAMPLES,
+        the stationary tail is dropped. It returns the time vector and the
+        (samples, m, 2) outputs.
+        """
+        chunk = CHUNK_DELAYS*self.delay_samples
+        outputs = [self.advance(chunk)]
+        target = self.inputs[0] # Servo goes to 1, regulatory to 0
+        while self.k < MAX_SAMPLES:
+            last = outputs[-1]
+            if np.all(np.abs(last - target) <= SETTLING_BAND) or not np.all(np.isfinite(last)):
+                break
+            outputs.append(self.advance(chunk))
+
+        y = np.concatenate(outputs)
+
+        # Keep up to the last sample out of the band
+        moving = np.flatnonzero(np.any(np.abs(y - target) > SETTLING_BAND, axis=(1, 2)))
+        samples = max(moving[-1] + 2, self.delay_samples + 1) if len(moving) else len(y)
+        y = y[:min(samples, len(y))]
+
+        return np.arange(len(y))*self.h, y
@@ -0,0 +1,260 @@
+from typing import Optional
+from subprocess import Popen, PIPE, STDOUT
+from threading import Thread, Lock, BoundedSemaphore
+from queue import Queue, LifoQueue, Empty
+from os import path, environ, killpg, getpid, register_at_fork
+from signal import SIGKILL
+import atexit
+import time
+
+OCTALIB_PATH = path.join(path.dirname(__file__), '../octalib/')
+
+## Pool default values, they can be overridden with environment variables
+POOL_SIZE = int(environ.get('PIDTUNE_OCTAVE_WORKERS', 2))        # Number of workers
+JOB_TIMEOUT = float(environ.get('PIDTUNE_OCTAVE_TIMEOUT', 600))  # Seconds per job
+MAX_JOBS = int(environ.get('PIDTUNE_OCTAVE_MAX_JOBS', 100))      # Jobs before recycling
+STARTUP_TIMEOUT = 120    # Seconds to load the Octave packages
+HEALTH_CHECK_IDLE = 60   # Idle seconds before a worker is pinged on borrow
+HEALTH_CHECK_TIMEOUT = 5 # Seconds to answer a ping
+
+## Run once per worker, loads the packages and warms up APC.m/f_IDFOM.m
+STARTUP_SCRIPT = """
+more off;
+version_info=ver("MATLAB");
+pkg load control
+pkg load symbolic
+pkg load optim
+s=tf('s');
+[z0, p0, k0]=APC(1, 1.5, 0.001, 1000);
+f_IDFOM([1 1.5 0.1], [0; 0.5; 1], [0; 0.5; 1], 0, 1, 1);
+"""
+
+class OctaveError(Exception):
+    pass
+
+class OctaveWorker():
+    """ Long-lived octave-cli process, jobs are sent through stdin and
+    framed on stdout by an end marker line.
+    """
+    def __init__(self, cwd: str = OCTALIB_PATH, startup_script: str = STARTUP_SCRIPT):
+        self.jobs = 0
+        self.last_used = time.monotonic()
+        self._marker_count = 0
+
+        self.process = Popen(
+            ['octave-cli', '--quiet', '--no-history'],
+            cwd=cwd,
+            stdout=PIPE,
+            stdin=PIPE,
+            stderr=STDOUT,
+            start_new_session=True,
+            env=environ.copy()
+        )
+
+        ## stdout lines are read on a thread so jobs can time out
+        self._lines = Queue()
+        self._reader = Thread(target=self._read_stdout, daemon=True)
+        self._reader.start()
+
+        try:
+            self.run(startup_script, STARTUP_TIMEOUT)
+        except Exception:
+            self.close()
+            raise
+
+    def _read_stdout(self):
+        for line in iter(self.process.stdout.readline, b''):
+            self._lines.put(line.decode(errors='replace'))
+        self._lines.put(None) # EOF, the process ended
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, script: str, timeout: float = JOB_TIMEOUT) -> list:
+        """ Runs an Octave script and returns its output lines. Errors inside
+        the script are reported as a {"type": "error"} JSON line.
+        """
+        if not self.alive():
+            raise OctaveError("Octave worker is not running")
+
+        self._marker_count += 1
+        marker = "__pidtune_job_end_{}__".format(self._marker_count)
+        frame = """
+try
+{}
+catch err
+  fprintf('\\n{{"type": "error", "message": "%s"}}\\n', strrep(err.message, '"', "'"));
+end
+fprintf('\\n%s\\n', '{}');
+fflush(stdout);
+""".format(script, marker)
+
+        try:
+            self.process.stdin.write(frame.encode('ascii'))
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise OctaveError("Octave worker stdin closed: {}".format(e))
+
+        deadline = time.monotonic() + timeout
+        lines = []
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                line = self._lines.get(timeout=max(remaining, 0))
+            except Empty:
+                self.close()
+                raise TimeoutError("Octave job exceeded {} seconds".format(timeout))
+            if line is None:
+                raise OctaveError("Octave worker ended: {}".format("".join(lines[-10:])))
+            if line.strip() == marker:
+                break
+            lines.append(line)
+
+        self.jobs += 1
+        self.last_used = time.monotonic()
+        return lines
+
+    def ping(self, timeout: float = HEALTH_CHECK_TIMEOUT) -> bool:
+        try:
+            return "pong" in "".join(self.run("disp('pong');", timeout))
+        except Exception:
+            return False
+
+    def close(self):
+        if self.alive():
+            try:
+                killpg(self.process.pid, SIGKILL)
+            except OSError:
+                pass
+        self.process.wait()
+
+class OctavePool():
+    """ Pool of warm Octave workers. Workers are started on demand up to
+    size, recycled after max_jobs or a timeout and pinged when they were
+    idle for a while before a job is handed to them.
+    """
+    def __init__(
+            self,
+            size: int = POOL_SIZE,          # Max number of workers
+            timeout: float = JOB_TIMEOUT,   # Default seconds per job
+            max_jobs: int = MAX_JOBS,       # Jobs before the worker is recycled
+            cwd: str = OCTALIB_PATH,
+            startup_script: str = STARTUP_SCRIPT
+    ):
+        if size < 1:
+            raise ValueError("Octave pool size must be greater than 0")
+
+        self.size = size
+        self.timeout = timeout
+        self.max_jobs = max_jobs
+        self.cwd = cwd
+        self.startup_script = startup_script
+
+        self._idle = LifoQueue()
+        self._slots = BoundedSemaphore(size)
+        self._lock = Lock()
+        self._workers = set()
+
+    def _healthy(self, worker) -> bool:
+        if not worker.alive() or worker.jobs >= self.max_jobs:
+            return False
+        if time.monotonic() - worker.last_used > HEALTH_CHECK_IDLE:
+            return worker.ping()
+        return True
+
+    def _acquire(self) -> OctaveWorker:
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except Empty:
+                break
+            if self._healthy(worker):
+                return worker
+            self._discard(worker)
+
+        worker = OctaveWorker(self.cwd, self.startup_script)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _discard(self, worker):
+        worker.close()
+        with self._lock:
+            self._workers.discard(worker)
+
+    def run(self, script: str, timeout: Optional[float] = None) -> list:
+        """ Runs the script on a warm worker and returns its output lines
+        """
+        with self._slots:
+            worker = self._acquire()
+            try:
+                lines = worker.run(script, timeout or self.timeout)
+            except Exception:
+                self._discard(worker)
+                raise
+            self._idle.put(worker)
+            return lines
+
+    def health_check(self) -> int:
+        """ Pings the idle workers, dead ones are dropped. It returns the
+        number of healthy idle workers.
+        """
+        healthy = []
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except Empty:
+                break
+            if worker.alive() and worker.ping():
+                healthy.append(worker)
+            else:
+                self._discard(worker)
+        for worker in healthy:
+            self._idle.put(worker)
+        return len(healthy)
+
+    def close(self):
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.close()
+
+_default_pool = None
+_default_pid = None # Process that started the shared pool workers
+_default_lock = Lock()
+
+def default_pool() -> OctavePool:
+    """ Shared pool used by FractionalOrderModel octave backend. A pool
+    inherited through fork belongs to the parent process, its pipes and
+    reader threads are not usable here, so the child starts its own.
+    """
+    global _default_pool, _default_pid
+    with _default_lock:
+        if _default_pool is None or _default_pid != getpid():
+            _default_pool = OctavePool()
+            _default_pid = getpid()
+        return _default_pool
+
+def configure(size: int = POOL_SIZE, timeout: float = JOB_TIMEOUT, max_jobs: int = MAX_JOBS) -> OctavePool:
+    """ Replaces the shared pool with a new one
+    """
+    global _default_pool, _default_pid
+    with _default_lock:
+        if _default_pool is not None and _default_pid == getpid():
+            _default_pool.close() # Never close the workers of the parent process
+        _default_pool = OctavePool(size=size, timeout=timeout, max_jobs=max_jobs)
+        _default_pid = getpid()
+        return _default_pool
+
+def _reset_after_fork():
+    # The lock may have been held by another thread at fork time
+    global _default_lock
+    _default_lock = Lock()
+
+register_at_fork(after_in_child=_reset_after_fork)
+
+@atexit.register
+def _close_default_pool():
+    if _default_pool is not None and _default_pid == getpid():
+        _default_pool.close()
@@ -0,0 +1,183 @@
+import numpy as np
+
+## Frequency grid defaults
+POINTS_PER_DECADE = 100  # Shared log grid density
+DECADES_BELOW = 2        # Decades under the slowest plant time scale
+DECADES_ABOVE = 2        # Decades over the fastest plant time scale
+
+## stabilityMargins result, one row per plant/controller pair
+robustness_dtype = np.dtype([
+    ('Ms', np.float64),    # Maximum sensitivity, max |1/(1 + L(jw))|
+    ('w_Ms', np.float64),  # Maximum sensitivity frequency
+    ('GM', np.float64),    # Gain margin (ratio), inf without phase crossover
+    ('w_pc', np.float64),  # Phase crossover frequency
+    ('PM', np.float64),    # Phase margin (degrees), inf without gain crossover
+    ('w_gc', np.float64),  # Gain crossover frequency
+])
+
+def plantResponse(
+        w,            # Frequencies array
+        K,            # Proportional constant, float or array
+        T,            # Time constant, float or array
+        L,            # Dead time, float or array
+        alpha=1.0,    # Fractional order, float or array
+        a=0.0,        # Second time constant ratio, float or array
+) -> tuple:
+    """ Exact frequency response of K*exp(-L*s)/((T*s^alpha + 1)(a*T*s + 1))
+    for arrays of plants, it covers the fractional order model (a=0), FOPDT
+    (alpha=1, a=0), SOPDT (alpha=1, a=1) and overdamped (alpha=1) models.
+
+    :returns: The (plants, len(w)) complex responses without the dead time
+    and the (plants, 1) dead times
+    :rtype: tuple
+    """
+    K, T, L, alpha, a = (np.asarray(x, dtype=float)[..., np.newaxis]
+                         for x in np.broadcast_arrays(*(np.ravel(x) for x in (K, T, L, alpha, a))))
+    jw = 1j*np.asarray(w, dtype=float)
+    # (jw)^alpha = w^alpha*exp(j*alpha*pi/2), exact for any order
+    frac = np.power(w, alpha)*np.exp(0.5j*np.pi*alpha)
+    return K/((T*frac + 1)*(a*T*jw + 1)), L
+
+def controllerResponse(
+        w,                   # Frequencies array
+        kp,                  # Proportional gain, float or array
+        ti,                  # Integral time, float or array
+        td,                  # Derivative time, float or array
+        filter_constant=0.1, # Derivative filter constant, float or array
+        action=1,            # Controller action, float or array
+) -> np.ndarray:
+    """ Frequency response of the ODoF PID controller
+    action*kp*(1 + 1/(ti*s) + td*s/(1 + filter_constant*td*s)), the
+    Controller.tf() transfer function, for arrays of controllers.
+
+    :returns: The (controllers, len(w)) complex responses
+    :rtype: numpy.ndarray
+    """
+    kp, ti, td, filter_constant, action = (
+        np.asarray(x, dtype=float)[..., np.newaxis]
+        for x in np.broadcast_arrays(*(np.ravel(x) for x in (kp, ti, td, filter_constant, action))))
+    jw = 1j*np.asarray(w, dtype=float)
+    return action*kp*(1 + 1/(ti*jw) + td*jw/(1 + filter_constant*td*jw))
+
+def frequencyGrid(
+        T,          # Time constants, float or array
+        L,          # Dead times, float or array
+        alpha=1.0,  # Fractional orders, float or array
+        points_per_decade: int = POINTS_PER_DECADE,
+) -> np.ndarray:
+    """ Log frequency grid shared by a batch of plants, it spans from
+    DECADES_BELOW under the slowest time scale to DECADES_ABOVE over the
+    fastest one, T^(1/alpha) and L being the time scales.
+    """
+    scales = np.concatenate((
+        np.ravel(np.power(np.asarray(T, dtype=float), 1/np.asarray(alpha, dtype=float))),
+        np.ravel(L)
+    ))
+    scales = scales[np.isfinite(scales) & (scales > 0)]
+    if not len(scales):
+        raise ValueError("Frequency grid needs positive time constants")
+
+    low = np.log10(1/scales.max()) - DECADES_BELOW
+    high = np.log10(1/scales.min()) + DECADES_ABOVE
+    return np.logspace(low, high, int(np.ceil((high - low)*points_per_decade)) + 1)
+
+def _crossings(x):
+    """ Rows, left indices and interpolation fractions where the rows of x
+    change of sign
+    """
+    rows, cols = np.nonzero(np.signbit(x[:, :-1]) != np.signbit(x[:, 1:]))
+    x0, x1 = x[rows, cols], x[rows, cols+1]
+    return rows, cols, x0/(x0 - x1)
+
+def _select(m, rows, values, w_values):
+    """ Minimum value per row and its frequency, inf and NaN for the rows
+    without values
+    """
+    best = np.full(m, np.inf)
+    w_best = np.full(m, np.nan)
+    order = np.lexsort((values, rows))
+    rows, values, w_values = rows[order], values[order], w_values[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = rows[1:] != rows[:-1]
+    best[rows[first]] = values[first]
+    w_best[rows[first]] = w_values[first]
+    return best, w_best
+
+def loopMargins(
+        w,        # Increasing frequencies array
+        loop,     # (pairs, len(w)) loop responses without the dead time
+        L=0.0,    # Dead times, float or (pairs,) array
+) -> np.ndarray:
+    """ Maximum sensitivity, gain and phase margins and crossover frequencies
+    of the loops loop*exp(-j*w*L).
+
+    The delay phase -w*L is added analytically to the unwrapped phase of the
+    delay free loop, so it does not limit the grid. Crossovers are linearly
+    interpolated on log(w) and the sensitivity peak parabolically, when a
+    loop crosses more than once the smallest margin is reported.
+
+    :returns: A robustness_dtype array, one row per loop
+    :rtype: numpy.ndarray
+    """
+    w = np.asarray(w, dtype=float)
+    loop = np.atleast_2d(loop)
+    m = len(loop)
+    L = np.broadcast_to(np.ravel(np.asarray(L, dtype=float)), (m,))[:, np.newaxis]
+    log_w = np.log(w)
+
+    phase = np.unwrap(np.angle(loop), axis=1) - w*L
+    magnitude = np.abs(loop)
+    result = np.zeros(m, dtype=robustness_dtype)
+
+    ## Maximum sensitivity, parabolic refinement of the grid peak on log(w)
+    sensitivity = 1/np.abs(1 + magnitude*np.exp(1j*phase))
+    peak = np.clip(np.argmax(sensitivity, axis=1), 1, len(w)-2)
+    rows = np.arange(m)
+    s0, s1, s2 = (sensitivity[rows, peak+k] for k in (-1, 0, 1))
+    curvature = s0 - 2*s1 + s2
+    shift = np.where(curvature < 0, 0.5*(s0 - s2)/np.where(curvature < 0, curvature, 1), 0.0)
+    result['Ms'] = np.maximum(s1 - 0.25*(s0 - s2)*shift, np.max(sensitivity, axis=1))
+    result['w_Ms'] = np.exp(log_w[peak] + shift*(log_w[1] - log_w[0]))
+
+    ## Gain crossovers, |L| = 1
+    rows, cols, f = _crossings(np.log(magnitude))
+    w_gc = np.exp(log_w[cols] + f*(log_w[cols+1] - log_w[cols]))
+    phase_gc = phase[rows, cols] + f*(phase[rows, cols+1] - phase[rows, cols])
+    pm = np.mod(phase_gc + np.pi, 2*np.pi)
+    pm = np.degrees(np.where(pm > np.pi, pm - 2*np.pi, pm))
+    result['PM'], result['w_gc'] = _select(m, rows, pm, w_gc)
+
+    ## Phase crossovers, phase = -180 degrees (mod 360)
+    turns = np.floor((phase + np.pi)/(2*np.pi))
+    rows, cols = np.nonzero(turns[:, :-1] != turns[:, 1:])
+    level = np.maximum(turns[rows, cols], turns[rows, cols+1])*2*np.pi - np.pi
+    p0, p1 = phase[rows, cols], phase[rows, cols+1]
+    f = (level - p0)/(p1 - p0)
+    w_pc = np.exp(log_w[cols] + f*(log_w[cols+1] - log_w[cols]))
+    log_mag = np.log(magnitude)
+    gm = np.exp(-(log_mag[rows, cols] + f*(log_mag[rows, cols+1] - log_mag[rows, cols])))
+    result['GM'], result['w_pc'] = _select(m, rows, gm, w_pc)
+
+    return result
+
+def stabilityMargins(
+        kp, ti, td,          # Controller parameters, floats or arrays
+        K, T, L,             # Plant parameters, floats or arrays
+        alpha=1.0,           # Plant fractional order, float or array
+        a=0.0,               # Plant second time constant ratio, float or array
+        filter_constant=0.1, # Derivative filter constant, float or array
+        action=1,            # Controller action, float or array
+        w=None,              # Frequency grid, frequencyGrid by default
+) -> np.ndarray:
+    """ Achieved robustness of plant/controller pairs, the controller and
+    plant parameters are broadcast together and evaluated on one shared
+    frequency grid, see plantResponse and controllerResponse for the models.
+
+    :returns: A robustness_dtype array, one row per pair
+    :rtype: numpy.ndarray
+    """
+    if w is None:
+        w = frequencyGrid(T, L, alpha)
+    plant, dead_time = plantResponse(w, K, T, L, alpha, a)
+    controller = controllerResponse(w, kp, ti, td, filter_constant, action)
+    return loopMargins(w, controller*plant, dead_time)
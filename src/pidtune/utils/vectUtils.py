@@ -1,5 +1,19 @@
+from typing import Union
+from array import array
 import numpy as np
 
+## Float vectors accepted by the array-first API
+FloatVector = Union[list, tuple, np.ndarray, memoryview, array]
+
+def asVector (vector) -> np.ndarray:
+    """ Contiguous float64 array of the vector, float64 arrays and buffers
+    are returned without a copy
+    """
+    result = np.ascontiguousarray(vector, dtype=np.float64)
+    if result.ndim != 1:
+        raise ValueError("Vectors must be one-dimensional")
+    return result
+
 def normalizeVect (vector):
     result = np.subtract(vector, vector[0])
     result = np.divide(result, np.subtract(vector[-1],vector[0]))
@@ -15,3 +29,18 @@ def identify (v1, v2, v3):
 
     ## FIXME convert from matrix to list
     return norm[0][0], norm[2][0], norm[1][0] # time, step, response
+
+def quantize (value: float, digits: int, low: float, high: float, edges=()) -> float:
+    """ Cache key of value rounded to digits significant digits. The key of
+    a value inside [low, high] stays inside, and a key that would cross one
+    of the edges, the strict limits of the rule intervals, is the exact value.
+    """
+    if digits < 1:
+        raise ValueError("Key rounding needs at least one significant digit")
+    value = float(value)
+    key = float('{:.{}g}'.format(value, digits))
+    if low <= value <= high:
+        key = min(max(key, low), high)
+    if any((value < edge) != (key < edge) for edge in edges):
+        return value
+    return key
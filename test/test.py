@@ -1,21 +1,45 @@
 #!/usr/bin/python
 
 import hashlib
+import io
 from sys import exit
-from os import path
-
+from os import path, environ, _exit
+import subprocess
+import sys
+from shutil import which
+from tempfile import TemporaryDirectory
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import multiprocessing
+
+import pidtune
 from pidtune import __version__ as vs
 
 print("PIDtune version: {}".format(vs.__version__));
 
 import control
+import numpy as np
 from pidtune import utils
+from pidtune.utils import cronePadula2
 
 from pidtune.models import controller
 from pidtune.models import plant
 from pidtune.models import system as close_loop_system
-from pidtune.models.plant_alfaro123c import FOPDT,SOPDT, overdamped
+from pidtune.models.plant_alfaro123c import FOPDT,SOPDT, overdamped, StepTestAnalysis
 from pidtune.rules import usort
+from pidtune.rules import frac_order
+from pidtune.utils import octavePool
+from pidtune.utils import loopSimulator
+from pidtune.utils import robustness
+from pidtune.utils import grunwaldLetnikov
+from pidtune.utils import forcedResponse
+from pidtune.utils import fomAtlas
+from pidtune.utils import identFractOrderModel
+from pidtune import batch
+from pidtune import debug
+from typeguard import TypeCheckError
+from pidtune import io as pidtune_io
+from pidtune import cache as pidtune_cache
 
 
 import unittest
@@ -156,10 +180,10 @@ class Test_fractional_model(unittest.TestCase):
     def test_closeloop_system_response(self):
         # Resulting hashed close-loop system response list
         hashed_sys_response_list_reference = \
-            ['062e7e4b3a43dcf088b55d74da354073a6f043179337e4e48f6d0fcb523b298f',
-             'e6db3f0489f1b8d3e7047a4029da2cb75cb734bf25cf2ec43439cb2f61f8f2b1',
-             '857462f0c65da6b3006a762e710c30f2d75dd36da2cc97d8635f30e7ddcd58c9',
-             '0ac6851e54f9142093b729b733d7072b04beac2e3111433f2b2ab2671250856c']
+            ['d6b1264e484cf37755d28366f1a67306a134d8199d88f317f98cbf659237b0a6',
+             '03243b9b042135097a75dffd6a532ff0dd81087e264f830180ee80e1b0e7b7ca',
+             'b1d758b3d132def428cbde129a62045324293567d12fa5938aa334d69b57a7cc',
+             'c4ffff80113cf3025c1173e4ad70b3e4ba3f03d06f6936af25f2469966a518dd']
 
         e_plant = plant.FractionalOrderModel(
             alpha=1.6,
@@ -177,7 +201,7 @@ class Test_fractional_model(unittest.TestCase):
 
         hashed_sys_response_list = list()
         for system in sys_list:
-            response=system.step_response()
+            response=system.toResponse()
             hashed_sys_response_list.append(
                 hashlib.sha256(str(response).encode('ascii')).hexdigest()
             )
@@ -188,6 +212,65 @@ class Test_fractional_model(unittest.TestCase):
             msg="Reference hashed list and computed one do not match"
         )
 
+    def test_closeloop_batch(self):
+        e_plant = plant.FractionalOrderModel(
+            alpha=1.6,
+            time_constant=1.1,
+            proportional_constant=1.0,
+            dead_time_constant=1.1
+        )
+        controllers = e_plant.tune_controllers()
+
+        ts, ys, ys_reg, IAE, IAE_reg = close_loop_system.ClosedLoopBatch(
+            controllers, e_plant).step_response()
+        self.assertEqual(ys.shape, (len(ts), len(controllers)))
+        self.assertEqual(ys_reg.shape, ys.shape)
+
+        for j, controller in enumerate(controllers):
+            t, y, y_reg, iae, iae_reg = close_loop_system.ClosedLoop(
+                controller = controller,
+                plant = e_plant).step_response()
+            # Common grid only extends the stationary tail
+            self.assertTrue(np.allclose(ys[:len(t), j], y))
+            self.assertTrue(np.allclose(ys_reg[:len(t), j], y_reg))
+            self.assertAlmostEqual(IAE[j], iae, places=2)
+            self.assertAlmostEqual(IAE_reg[j], iae_reg, places=3)
+
+    def assert_native_identification(self, time_vector, step_vector, resp_vector, K):
+        """
+        Native IDFOM backend fits the step test, the gain is compared with the
+        Alfaro123c reference and the IAE with the test time span
+        """
+        e_plant = plant.FractionalOrderModel(
+            time_vector=time_vector,
+            step_vector=step_vector,
+            resp_vector=resp_vector,
+            backend='native'
+        )
+
+        self.assertAlmostEqual(e_plant.K, K, delta=abs(K)*0.05)
+        self.assertTrue(0.3 <= e_plant.alpha <= 2.0, "Fractional order out of range")
+        self.assertTrue(e_plant.T > 0 and e_plant.L >= 0, "Wrong time constants")
+        self.assertLess(e_plant.IAE, 0.05*(time_vector[-1]-time_vector[0]))
+        self.assertEqual(len(e_plant.model_resp_vector), len(time_vector))
+
+        response = e_plant.toResponse()
+        for key in ('time', 'step', 'respo', 'm_respo'):
+            self.assertEqual(len(response[key]), len(time_vector))
+            self.assertIsInstance(response[key][-1], float)
+
+    def test_unknown_backend(self):
+        """
+        FractionalOrderModel raise ValueError for an unknown identification backend
+        """
+        self.assertRaises(
+            ValueError,
+            plant.FractionalOrderModel,
+            time_vector=[0.0, 1.0],
+            step_vector=[0.0, 1.0],
+            resp_vector=[0.0, 1.0],
+            backend='matlab')
+
     def test_GUNT_identification (self):
 
         with open("{}/{}".format(path.dirname(__file__), "plant_raw_data/GUNT.txt"), 'r') as data_file:
@@ -195,7 +278,8 @@ class Test_fractional_model(unittest.TestCase):
             time_vector = [float(cols[0]) for cols in raw_data] # Time vector
             step_vector = [float(cols[1]) for cols in raw_data] # Step vector
             resp_vector = [float(cols[2]) for cols in raw_data] # Open-loop system response vector
-            # TODO
+
+        self.assert_native_identification(time_vector, step_vector, resp_vector, 4.9745)
 
     def test_dataIDFOM_identification (self):
 
@@ -204,7 +288,8 @@ class Test_fractional_model(unittest.TestCase):
             time_vector = [float(cols[0]) for cols in raw_data] # Time vector
             step_vector = [float(cols[1]) for cols in raw_data] # Step vector
             resp_vector = [float(cols[2]) for cols in raw_data] # Open-loop system response vector
-            # TODO
+
+        self.assert_native_identification(time_vector, step_vector, resp_vector, -1.2638)
 
     def test_dataIDFOM1_identification (self):
 
@@ -213,7 +298,8 @@ class Test_fractional_model(unittest.TestCase):
             time_vector = [float(cols[0]) for cols in raw_data] # Time vector
             step_vector = [float(cols[1]) for cols in raw_data] # Step vector
             resp_vector = [float(cols[2]) for cols in raw_data] # Open-loop system response vector
-            # TODO
+
+        self.assert_native_identification(time_vector, step_vector, resp_vector, 4.355)
 
     def test_dataIDFOM2_identification (self):
 
@@ -222,7 +308,898 @@ class Test_fractional_model(unittest.TestCase):
             time_vector = [float(cols[0]) for cols in raw_data] # Time vector
             step_vector = [float(cols[1]) for cols in raw_data] # Step vector
             resp_vector = [float(cols[2]) for cols in raw_data] # Open-loop system response vector
-            # TODO
+
+        self.assert_native_identification(time_vector, step_vector, resp_vector, 4.7742)
+
+class Test_frac_order_batch(unittest.TestCase):
+    """
+    Fractional order rule batch tuning test class
+    """
+    def test_batch_matches_tuning(self):
+        alpha = np.array([1.0, 1.25, 1.6, 1.8])
+        for ctype in frac_order.valid_controllers:
+            for Ms in frac_order.valid_Ms:
+                result = frac_order.tuning_batch(alpha, 1.1, -2.0, 1.1, Ms, ctype)
+                for row, v in zip(result, alpha):
+                    if v > 1.6 and ctype == 'PI':
+                        self.assertFalse(row['valid'])
+                        continue
+                    controller = frac_order.tuning(v, 1.1, -2.0, 1.1, Ms, ctype)
+                    self.assertTrue(row['valid'])
+                    for field in ('n_kp', 'n_ti', 'n_td', 'kp', 'ti', 'td', 'action'):
+                        self.assertAlmostEqual(row[field], getattr(controller, field), places=12)
+
+    def test_validity_mask(self):
+        result = frac_order.tuning_batch(
+            [1.6, 1.6, 2.5, 1.6, 1.6],
+            [1.1, 1.1, 1.1, 1.1, 100.0],
+            1.0,
+            1.1,
+            ['1.4', '1.8', '1.4', '2.0', '2.0'],
+            ['PID', 'PID', 'PID', 'P', 'PI'])
+        self.assertListEqual(list(result['valid']), [True, False, False, False, False])
+        self.assertTrue(np.all(np.isnan(result['kp'][1:])))
+
+class Test_crone_approximation(unittest.TestCase):
+    """
+    CRONE/Oustaloup approximation test class
+    """
+    def test_batch_matches_scalar(self):
+        orders = [1.6, 0.5, -0.7, 1.0]
+        zeros, poles, gains, integer_orders = utils.cronePadula2.cronePadula2Batch(2.0, orders)
+
+        self.assertEqual(zeros.shape, (len(orders), 8))
+        for i, v in enumerate(orders):
+            z, p, k = utils.cronePadula2.cronePadula2(k=2.0, v=v)
+            self.assertListEqual(list(zeros[i]) + [0]*max(integer_orders[i], 0), z)
+            self.assertListEqual(list(poles[i]), p[:8])
+            self.assertAlmostEqual(gains[i], k)
+
+    def test_normalized_gain(self):
+        # Unitary gain at the approximation central frequency
+        z, p, k = utils.cronePadula2.cronePadula2(k=1.0, v=0.5)
+        wm = 1j*np.sqrt(0.001*1000)
+        mag = k*np.prod(wm - np.array(z))/np.prod(wm - np.array(p))
+        self.assertAlmostEqual(abs(mag), 1.0)
+
+class Test_loop_simulator(unittest.TestCase):
+    """
+    Dead time closed-loop simulator test class
+    """
+    def setUp(self):
+        fopdt = control.ss(control.tf([1], [1, 1]))
+        self.plant_ss = (fopdt.A, fopdt.B, fopdt.C, fopdt.D)
+
+    def test_first_dead_time_is_exact(self):
+        # Until 2L the loop is open, y(t) is the C*P step response delayed L
+        sim = loopSimulator.LoopSimulator(
+            self.plant_ss, 0.5, loopSimulator.controllerSS(0.8, 1.0, 0.0))
+        ts, ys = sim.run()
+        window = np.logical_and(ts >= 0.5, ts <= 1.0)
+        reference = control.step_response(
+            control.tf([0.8, 0.8], [1, 0])*control.tf([1], [1, 1]), ts[window]-0.5).outputs
+        self.assertTrue(np.allclose(ys[window, 0, 0], reference, atol=1e-12))
+        self.assertTrue(np.all(ys[ts < 0.5] == 0))
+
+    def test_settles(self):
+        sim = loopSimulator.LoopSimulator(
+            self.plant_ss, 0.5, loopSimulator.controllerSS([0.8, 0.6], [1.0, 0.9], [0.0, 0.2]))
+        ts, ys = sim.run()
+        self.assertEqual(ys.shape, (len(ts), 2, 2))
+        self.assertTrue(np.allclose(ys[-1, :, 0], 1, atol=1e-3))
+        self.assertTrue(np.allclose(ys[-1, :, 1], 0, atol=1e-3))
+
+    def test_no_dead_time(self):
+        with self.assertRaises(ValueError):
+            loopSimulator.LoopSimulator(self.plant_ss, 0.0, loopSimulator.controllerSS(0.8, 1.0, 0.0))
+
+@unittest.skipUnless(which('octave-cli'), "octave-cli is not installed")
+class Test_octave_pool(unittest.TestCase):
+    """
+    Octave worker pool test class
+    """
+    def test_run_job(self):
+        pool = octavePool.OctavePool(size=1)
+        try:
+            self.assertIn("pidtune", "".join(pool.run("disp('pidtune');")))
+            self.assertEqual(pool.health_check(), 1)
+        finally:
+            pool.close()
+
+    def test_job_timeout(self):
+        pool = octavePool.OctavePool(size=1)
+        try:
+            self.assertRaises(TimeoutError, pool.run, "pause(10);", 1)
+            # Timed out worker is recycled
+            self.assertIn("pidtune", "".join(pool.run("disp('pidtune');")))
+        finally:
+            pool.close()
+
+class Test_octave_default_pool(unittest.TestCase):
+    """
+    Shared Octave pool test class, pools start workers on demand
+    """
+    def setUp(self):
+        self.saved = (octavePool._default_pool, octavePool._default_pid)
+
+    def tearDown(self):
+        octavePool._default_pool, octavePool._default_pid = self.saved
+
+    def test_same_process(self):
+        pool = octavePool.configure(size=1)
+        self.assertIs(octavePool.default_pool(), pool)
+
+    def test_inherited_pool(self):
+        # Pool created by the parent before a fork
+        pool = octavePool.configure(size=1)
+        octavePool._default_pid = -1
+        child_pool = octavePool.default_pool()
+        self.assertIsNot(child_pool, pool)
+        self.assertIs(octavePool.default_pool(), child_pool)
+
+class Test_usort_values(unittest.TestCase):
+    """
+    Vectorized usort rule test class
+    """
+    def test_values_match_get_value(self):
+        rule = usort.usort()
+        for a in [0.0, 0.1, 0.25, 0.6, 0.8, 1.0]:
+            for tao in [0.2, 0.5, 1.3]:
+                values = usort.get_values(a, 2.0, -1.5, 2.0*tao)
+                for row in values:
+                    try:
+                        controller = rule.get_value(
+                            str(row['mode']), str(row['ctype']), a, str(row['Ms']),
+                            2.0, -1.5, 2.0*tao, int(row['DoF']))
+                    except ValueError:
+                        self.assertFalse(row['valid'])
+                        continue
+                    self.assertTrue(row['valid'])
+                    for field in ('kp', 'ti', 'td', 'n_kp', 'n_ti', 'n_td', 'action'):
+                        self.assertAlmostEqual(row[field], getattr(controller, field), places=12)
+
+    def test_many_plants(self):
+        values = usort.get_values([0.0, 0.5, 1.2], 1.0, 1.0, [0.5, 0.05, 0.5])
+        self.assertEqual(values.shape, (3, 32))
+        self.assertTrue(np.any(values['valid'][0]))
+        self.assertFalse(np.any(values['valid'][1])) # Tao < 0.1
+        self.assertFalse(np.any(values['valid'][2])) # a > 1
+        self.assertTrue(np.all(np.isnan(values['kp'][1:])))
+
+class Test_array_api(unittest.TestCase):
+    """
+    NumPy arrays and buffers as inputs test class
+    """
+    def setUp(self):
+        data = np.loadtxt("{}/plant_raw_data/dataIDFOM.txt".format(path.dirname(__file__)))
+        self.time_vector = np.ascontiguousarray(data[:, 0])
+        self.step_vector = np.ascontiguousarray(data[:, 1])
+        self.resp_vector = np.ascontiguousarray(data[:, 2])
+
+    def test_no_copy(self):
+        self.assertIs(utils.vectUtils.asVector(self.time_vector), self.time_vector)
+        view = utils.vectUtils.asVector(memoryview(self.time_vector))
+        self.assertTrue(np.shares_memory(view, self.time_vector))
+        with self.assertRaises(ValueError):
+            utils.vectUtils.asVector(np.zeros((2, 2)))
+
+        analysis = StepTestAnalysis(self.time_vector, self.step_vector, self.resp_vector)
+        self.assertIs(analysis.t, self.time_vector)
+
+    def test_array_models(self):
+        FO = FOPDT(time_vector=self.time_vector,
+                   step_vector=memoryview(self.step_vector),
+                   resp_vector=self.resp_vector)
+        self.assertEqual(FO.toDict(), FOPDT(time_vector=self.time_vector.tolist(),
+                                            step_vector=self.step_vector.tolist(),
+                                            resp_vector=self.resp_vector.tolist()).toDict())
+        self.assertIsInstance(FO.toResponse()['time'], list)
+
+        e_plant = plant.FractionalOrderModel(
+            time_vector=self.time_vector,
+            step_vector=self.step_vector,
+            resp_vector=self.resp_vector
+        )
+        self.assertIsInstance(e_plant.time_vector, np.ndarray)
+        self.assertIsInstance(e_plant.toResponse()['time'][0], float)
+
+    def test_numpy_scalars(self):
+        ctl = controller.Controller(
+            ctype='PI', Ms='1.4',
+            n_kp=np.float32(0.5), n_ti=np.float64(1.2), n_td=0,
+            kp=np.float32(0.5), ti=np.float64(1.3), td=np.int64(0))
+        self.assertEqual(ctl.ti, 1.3)
+        e_plant = plant.FractionalOrderModel(
+            alpha=np.float32(1.25),
+            time_constant=np.float64(1.1),
+            proportional_constant=np.int64(2),
+            dead_time_constant=1.1
+        )
+        self.assertTrue(e_plant.controllers)
+
+class Test_debug(unittest.TestCase):
+    """
+    Optional runtime type checking test class
+    """
+    def tearDown(self):
+        debug.enable(self.enabled)
+
+    def setUp(self):
+        self.enabled = debug.enabled()
+
+    def test_explicit_checks(self):
+        debug.disable()
+        with self.assertRaises(ValueError):
+            controller.Controller(ctype=1, Ms='1.4', n_kp=1, n_ti=1, n_td=0, kp=1, ti=1, td=0)
+        with self.assertRaises(ValueError):
+            controller.Controller(ctype='PI', Ms='1.4', n_kp='1', n_ti=1, n_td=0, kp=1, ti=1, td=0)
+        with self.assertRaises(ValueError):
+            plant.FractionalOrderModel(alpha='1.5')
+        with self.assertRaises(ValueError):
+            cronePadula2.cronePadula2(1.0, 1.5, n=0)
+
+    def test_switch(self):
+        e_plant = plant.FractionalOrderModel(
+            alpha=1.6,
+            time_constant=1.1,
+            proportional_constant=1.0,
+            dead_time_constant=1.1
+        )
+        controllers = tuple(e_plant.controllers)
+
+        debug.disable()
+        close_loop_system.ClosedLoopBatch(controllers, e_plant) # Not a list, unchecked
+
+        debug.enable()
+        with self.assertRaises(TypeCheckError):
+            close_loop_system.ClosedLoopBatch(controllers, e_plant)
+
+    def test_explicit_defaults(self):
+        debug.enable()
+        data = np.loadtxt("{}/{}".format(path.dirname(__file__), "plant_raw_data/dataIDFOM.txt"))
+        vectors = (data[:, 0], data[:, 1], data[:, 2])
+        e_plant = plant.FractionalOrderModel(
+            *vectors, engine='atlas', starts=1, tolerance=None, cache=False)
+        self.assertTrue(e_plant.tune_controllers(decimals=None))
+        identFractOrderModel.identify(*vectors, engine='atlas', tolerance=None, max_workers=None)
+        self.assertEqual(usort.tune(0.5, 2.0, 1.0, 1.0, decimals=None).shape, (32,))
+
+class Test_io(unittest.TestCase):
+    """
+    Step-test reader test class
+    """
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.time_vector = np.arange(3000)*0.1
+        self.step_vector = np.where((self.time_vector >= 10) & (self.time_vector < 150), 1.0, 0.0)
+        self.resp_vector = np.cumsum(self.step_vector)*0.01
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_read_step_test(self):
+        for test_file in ["plant_raw_data/GUNT.txt", "plant_raw_data/dataIDFOM1.txt"]:
+            file_path = "{}/{}".format(path.dirname(__file__), test_file)
+            reference = np.loadtxt(file_path)
+            for chunk_bytes in (100, pidtune_io.CHUNK_BYTES):
+                data = np.concatenate(list(pidtune_io.iter_chunks(file_path, chunk_bytes)))
+                self.assertTrue(np.array_equal(data, reference))
+
+    def test_step_window(self):
+        file_path = path.join(self.tmp.name, 'steps.csv')
+        with open(file_path, 'w') as data_file:
+            data_file.write("time,step,response\n")
+            for row in zip(self.time_vector, self.step_vector, self.resp_vector):
+                data_file.write("{!r},{!r},{!r}\n".format(*row))
+
+        window = pidtune_io.read_step_window(file_path, pre_samples=50, chunk_bytes=512)
+        self.assertEqual(window.start_row, 50)
+        self.assertEqual(window.step_row, 100)
+        self.assertEqual(window.flagtin, 50)
+        self.assertAlmostEqual(window.tin, 4.9)
+        # It ends before the input goes back to 0
+        self.assertEqual(len(window), 1450)
+        self.assertTrue(np.array_equal(window.resp_vector, self.resp_vector[50:1500]))
+
+        window = pidtune_io.read_step_window(file_path, pre_samples=50, post_samples=100)
+        self.assertEqual(len(window), 150)
+
+    def test_npy_window(self):
+        file_path = path.join(self.tmp.name, 'steps.npy')
+        np.save(file_path, np.column_stack((self.time_vector, self.step_vector, self.resp_vector)))
+        window = pidtune_io.read_step_window(file_path, pre_samples=50)
+        self.assertTrue(np.array_equal(window.step_vector, self.step_vector[50:1500]))
+
+    def test_no_step(self):
+        file_path = path.join(self.tmp.name, 'flat.txt')
+        np.savetxt(file_path, np.column_stack((self.time_vector, np.ones(3000), self.resp_vector)))
+        with self.assertRaises(ValueError):
+            pidtune_io.read_step_window(file_path)
+
+    def test_window_models(self):
+        file_path = "{}/plant_raw_data/dataIDFOM1.txt".format(path.dirname(__file__))
+        window = pidtune_io.read_step_window(file_path)
+        time_vector, step_vector, resp_vector = pidtune_io.read_step_test(file_path)
+        self.assertEqual(
+            window.alfaro123c('FOPDT').toDict(),
+            FOPDT(time_vector=time_vector.tolist(),
+                  step_vector=step_vector.tolist(),
+                  resp_vector=resp_vector.tolist()).toDict())
+        self.assertIs(window.alfaro123c('SOPDT').analysis, window.analysis())
+
+def _crashing_read_step_window(source):
+    # The worker process dies on crash.txt, see Test_batch.test_worker_crash
+    if path.basename(source) == 'crash.txt':
+        _exit(1)
+    return pidtune_io.read_step_window(source)
+
+class Test_batch(unittest.TestCase):
+    """
+    Fleet identification runner test class
+    """
+    def test_identify_many(self):
+        source = "{}/plant_raw_data/dataIDFOM.txt".format(path.dirname(__file__))
+        rows = list(batch.identify_many(
+            [source, "{}/plant_raw_data/missing.txt".format(path.dirname(__file__))],
+            models=('FOPDT', 'overdamped'),
+            max_workers=2))
+        self.assertEqual(len(rows), 4)
+
+        status = {(path.basename(row['source']), row['model']): row['status'] for row in rows}
+        self.assertEqual(status[('dataIDFOM.txt', 'FOPDT')], 'ok')
+        self.assertEqual(status[('dataIDFOM.txt', 'overdamped')], 'error') # a out of range
+        self.assertEqual(status[('missing.txt', 'FOPDT')], 'error')
+
+        summary = io.StringIO()
+        batch.write_summary(rows, summary)
+        lines = summary.getvalue().splitlines()
+        self.assertEqual(lines[0], ",".join(batch.summary_fields))
+        self.assertEqual(len(lines), 5)
+
+    def test_unknown_model(self):
+        with self.assertRaises(ValueError):
+            list(batch.identify_many([], models=('PT1',)))
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == 'fork', "workers must inherit the patched reader")
+    def test_worker_crash(self):
+        data_path = "{}/plant_raw_data".format(path.dirname(__file__))
+        sources = ["{}/{}".format(data_path, name)
+                   for name in ('dataIDFOM.txt', 'crash.txt', 'GUNT.txt', 'dataIDFOM1.txt', 'dataIDFOM2.txt')]
+        with mock.patch.object(batch, 'read_step_window', _crashing_read_step_window):
+            rows = list(batch.identify_many(sources, models=('FOPDT', 'SOPDT'), max_workers=2))
+        self.assertEqual(len(rows), 10)
+
+        for row in rows:
+            if path.basename(row['source']) == 'crash.txt':
+                self.assertEqual(row['status'], 'error')
+                self.assertIn('BrokenProcessPool', row['error'])
+            else:
+                self.assertEqual(row['status'], 'ok', row['error'])
+
+class Test_controller_set(unittest.TestCase):
+    """
+    Columnar controllers test class
+    """
+    def setUp(self):
+        self.e_plant = plant.FractionalOrderModel(
+            alpha=1.3, time_constant=1.1, proportional_constant=-1.0, dead_time_constant=1.1)
+        self.controllers = controller.ControllerSet.from_controllers(self.e_plant.controllers)
+
+    def test_slots(self):
+        c = self.e_plant.controllers[0]
+        self.assertFalse(hasattr(c, '__dict__'))
+        self.assertEqual((c.beta, c.gamma, c.filter_constant), (1, 0, 0.1))
+
+    def test_records(self):
+        self.assertEqual(len(self.controllers), len(self.e_plant.controllers))
+        self.assertEqual(
+            self.controllers.to_records(),
+            [c.toDict() for c in self.e_plant.controllers])
+        self.assertEqual(
+            [c.toDict() for c in self.controllers],
+            [c.toDict() for c in self.e_plant.controllers])
+
+    def test_filter(self):
+        pi = self.controllers.filter(ctype='PI')
+        self.assertTrue(np.all(pi['ctype'] == 'PI'))
+        self.assertEqual(len(self.controllers.filter(ctype='PI', Ms=['1.4', '2.0'])), 2)
+        self.assertEqual(len(self.controllers.filter(Ms='1.8')), 0)
+
+    def test_tf(self):
+        for c, c_tf in zip(self.e_plant.controllers, self.controllers.tf()):
+            for w in [0.01, 0.3, 2.0, 50.0]:
+                expected = c.tf()(1j*w)
+                self.assertAlmostEqual(abs(c_tf(1j*w) - expected)/abs(expected), 0, places=12)
+
+    def test_from_records(self):
+        values = usort.get_values(0.5, 2.0, 1.0, 1.0)
+        controllers = controller.ControllerSet.from_records(values)
+        self.assertEqual(len(controllers), np.count_nonzero(values['valid']))
+        self.assertTrue(np.all(controllers['filter_constant'] == 0.1))
+        np.testing.assert_array_equal(controllers['beta'], values['beta'][values['valid']])
+
+class Test_robustness(unittest.TestCase):
+    """
+    Vectorized robustness evaluator test class
+    """
+    def test_rational_loop(self):
+        # Delay free overdamped plant, python-control reference
+        c = controller.Controller('PID', '1.4', 1, 1, 1, 2.0, 1.5, 0.4)
+        p = control.tf([1.3], [2.0, 3.0, 1.0])
+        gm, pm, sm, wpc, wgc, wms = control.stability_margins(c.tf()*p)
+        r = robustness.stabilityMargins(2.0, 1.5, 0.4, 1.3, 1.0, 0.0, 1.0, 2.0)[0]
+        self.assertAlmostEqual(r['PM'], pm, places=2)
+        self.assertAlmostEqual(r['w_gc'], wgc, places=3)
+        self.assertAlmostEqual(r['Ms'], 1/sm, places=4)
+        self.assertEqual(r['GM'], np.inf)
+
+    def test_dead_time(self):
+        w = np.logspace(-4, 4, 400000)
+        loop = 0.6*(1 + 1/(1.5j*w))*1.3/((1j*w + 1)*(2j*w + 1))*np.exp(-0.7j*w)
+        r = robustness.stabilityMargins(0.6, 1.5, 0.0, 1.3, 1.0, 0.7, 1.0, 2.0)[0]
+        self.assertAlmostEqual(r['Ms'], np.max(1/np.abs(1 + loop)), places=4)
+        pc = np.argmin(np.abs(np.angle(loop[w < 2]) - np.pi))
+        self.assertAlmostEqual(r['GM'], 1/np.abs(loop[pc]), places=3)
+
+    def test_tuned_ms(self):
+        e_plant = plant.FractionalOrderModel(
+            alpha=1.3, time_constant=1.1, proportional_constant=-1.0, dead_time_constant=1.1)
+        loops = close_loop_system.ClosedLoopBatch(e_plant.controllers, e_plant)
+        r = loops.robustness()
+        for c, ms in zip(e_plant.controllers, r['Ms']):
+            self.assertAlmostEqual(ms, float(c.Ms), delta=0.05*float(c.Ms))
+
+        # Many plants and one controller at once
+        cs = controller.ControllerSet.from_controllers(e_plant.controllers[:1])
+        r = cs.robustness(-1.0, [1.1, 1.1, 2.0], 1.1, [1.3, 1.3, 1.5])
+        self.assertEqual(r.shape, (3,))
+        self.assertEqual(r[0], r[1])
+
+class Test_grunwald_letnikov(unittest.TestCase):
+    """
+    Grünwald–Letnikov fractional order simulation test class
+    """
+    def test_first_order(self):
+        # alpha=1 is the FOPDT model, exact responses
+        model = grunwaldLetnikov.GrunwaldLetnikov(2.0, 1.5, 0.5, 1.0)
+        t, y = model.step_response()
+        expected = np.where(t > 0.5, 2.0*(1 - np.exp(-(t - 0.5)/1.5)), 0)
+        self.assertLess(np.max(np.abs(y - expected)), 1e-4)
+
+        t = np.linspace(0, 10, 2001)
+        y = model.forced_response(t, np.column_stack((t, 2*t)))
+        td = np.maximum(t - 0.5, 0)
+        expected = 2.0*(td - 1.5*(1 - np.exp(-td/1.5)))
+        self.assertLess(np.max(np.abs(y[:, 0] - expected)), 1e-4)
+        np.testing.assert_allclose(y[:, 1], 2*y[:, 0])
+
+        with self.assertRaises(ValueError):
+            model.forced_response(np.cumsum(np.arange(1, 10)), np.ones(9))
+
+    def test_series_inverse(self):
+        # Integrator and a slow pole, Newton iterations diverge on it
+        q = np.convolve([1, -1.0], [96.6, -94.6])
+        g = grunwaldLetnikov.seriesInverse(q, 60000)
+        self.assertAlmostEqual(g[-1], 0.5, places=8)
+        self.assertLess(np.max(np.abs(g)), 0.5 + 1e-8)
+
+    def test_closed_loop(self):
+        e_plant = plant.FractionalOrderModel(
+            alpha=1.3, time_constant=1.1, proportional_constant=-1.0, dead_time_constant=1.1)
+        loops = close_loop_system.ClosedLoopBatch(e_plant.controllers, e_plant)
+        ts, ys, ys_reg, IAE, IAE_reg = loops.step_response(1.0, 1.0)
+        tg, yg, yg_reg, IAE_g, IAE_reg_g = loops.step_response(1.0, 1.0, 'grunwald_letnikov')
+        for k in range(len(e_plant.controllers)):
+            self.assertLess(np.max(np.abs(np.interp(ts, tg, yg[:, k]) - ys[:, k])), 5e-3)
+            self.assertLess(np.max(np.abs(np.interp(ts, tg, yg_reg[:, k]) - ys_reg[:, k])), 5e-3)
+        np.testing.assert_allclose(IAE_g, IAE, rtol=1e-2)
+        np.testing.assert_allclose(IAE_reg_g, IAE_reg, rtol=1e-2)
+
+        with self.assertRaises(ValueError):
+            loops.step_response(engine='euler')
+
+## Forced response engine Testing
+class Test_forced_response(unittest.TestCase):
+    """
+    Batched FFT forced responses of the Alfaro123c models
+    """
+
+    def test_control_reference(self):
+        t = np.linspace(0, 20, 2001)
+        u = np.where(t >= 1, 1.0, 0.0) + 0.5*np.sin(t)
+        K, T, a = [2.0, 2.0, 2.0, -1.5], [1.5, 1.5, 1.5, 0.2], [0.0, 1.0, 0.3, 0.9]
+
+        y = forcedResponse.forcedResponses(t, u, K, T, a)
+        self.assertEqual(y.shape, (4, len(t)))
+        for k in range(4):
+            tf = control.tf([K[k]], np.trim_zeros(np.polymul([T[k], 1], [a[k]*T[k], 1]), 'f'))
+            _, reference = control.forced_response(tf, t, u)
+            np.testing.assert_allclose(y[k], reference, atol=1e-10)
+
+        # Non uniform sampling is left to control.forced_response
+        self.assertIsNone(forcedResponse.forcedResponses(t**2, u, K, T, a))
+
+    def test_shared_analysis(self):
+        with open("{}/{}".format(path.dirname(__file__), "plant_raw_data/dataIDFOM1.txt"), 'r') as data_file:
+            raw_data = [line.strip().split() for line in data_file.read().split('\n') if line]
+            time_vector = np.array([float(cols[0]) for cols in raw_data])
+            step_vector = [float(cols[1]) for cols in raw_data]
+            resp_vector = [float(cols[2]) for cols in raw_data]
+
+        analysis = StepTestAnalysis(time_vector, step_vector, resp_vector)
+        model = FOPDT(analysis=analysis)
+        self.assertEqual(len(analysis._responses), len(model.candidate_models()))
+        _, reference = control.forced_response(model.tf(), analysis.t, analysis.input_simulation)
+        np.testing.assert_allclose(model.youtFOPDT_simulation, reference, atol=1e-9)
+
+        # The other models reuse the shared responses
+        responses = dict(analysis._responses)
+        SOPDT(analysis=analysis)
+        self.assertEqual(analysis._responses.keys(), responses.keys())
+        for key, response in responses.items():
+            self.assertIs(analysis._responses[key], response)
+
+        # Time vectors out of UNIFORM_RTOL take the control.forced_response path
+        h = time_vector[1] - time_vector[0]
+        jittered = time_vector + 2*forcedResponse.UNIFORM_RTOL*h*(np.arange(len(time_vector)) % 2)
+        self.assertIsNone(forcedResponse.uniformStep(jittered))
+        fallback = FOPDT(time_vector=jittered, step_vector=step_vector, resp_vector=resp_vector)
+        _, reference = control.forced_response(fallback.tf(), fallback.t_simulation, fallback.input_simulation)
+        np.testing.assert_allclose(fallback.youtFOPDT_simulation, reference)
+
+        with self.assertRaises(ValueError):
+            FOPDT(time_vector=time_vector**1.1, step_vector=step_vector, resp_vector=resp_vector)
+
+## Results cache Testing
+class Test_result_cache(unittest.TestCase):
+    """
+    Content-addressed results cache test class
+    """
+    def setUp(self):
+        data = np.loadtxt("{}/plant_raw_data/dataIDFOM.txt".format(path.dirname(__file__)))
+        self.vectors = [np.ascontiguousarray(data[:, k]) for k in range(3)]
+        self.tmp = TemporaryDirectory()
+        self.cache = pidtune_cache.configure(path=path.join(self.tmp.name, 'cache.sqlite'))
+
+    def tearDown(self):
+        pidtune_cache.configure()
+        self.tmp.cleanup()
+
+    def test_keys(self):
+        key = pidtune_cache.cache_key(*self.vectors, model='fractional', backend='native')
+        self.assertEqual(key, pidtune_cache.cache_key(
+            *(vector.tolist() for vector in self.vectors), backend='native', model='fractional'))
+        self.assertNotEqual(key, pidtune_cache.cache_key(*self.vectors, model='fractional', backend='octave'))
+        changed = self.vectors[2].copy()
+        changed[-1] += 1e-12
+        self.assertNotEqual(key, pidtune_cache.cache_key(
+            self.vectors[0], self.vectors[1], changed, model='fractional', backend='native'))
+
+    def test_eviction(self):
+        cache = pidtune_cache.ResultCache(size=2, path=None)
+        for key in 'abc':
+            cache.put(key, {'key': key})
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('c'), {'key': 'c'})
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # The SQLite file keeps the entries the LRU drops, up to max_bytes
+        disk = pidtune_cache.ResultCache(size=1, path=path.join(self.tmp.name, 'evict.sqlite'), max_bytes=3000)
+        for key in range(4):
+            disk.put(str(key), np.zeros(100))
+        self.assertIsNone(disk.get('0'))
+        np.testing.assert_array_equal(disk.get('2'), np.zeros(100))
+        value = disk.get('3')
+        value[0] = 1 # Every get is a copy
+        self.assertEqual(disk.get('3')[0], 0)
+        disk.close()
+
+    def test_fractional_model(self):
+        e_plant = plant.FractionalOrderModel(*self.vectors)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+        cached = plant.FractionalOrderModel(*self.vectors)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(cached.toDict(), e_plant.toDict())
+        self.assertEqual(cached.toResponse(), e_plant.toResponse())
+        self.assertEqual([c.toDict() for c in cached.controllers],
+                         [c.toDict() for c in e_plant.controllers])
+
+        # Other processes read it from the SQLite file
+        pidtune_cache.configure(size=0, path=self.cache.path)
+        self.assertEqual(plant.FractionalOrderModel(*self.vectors).toDict(), e_plant.toDict())
+        self.assertEqual(pidtune_cache.default_cache().hits, 1)
+
+        plant.FractionalOrderModel(*self.vectors, cache=False)
+        self.assertEqual(pidtune_cache.default_cache().hits, 1)
+
+## Memoized tuning Testing
+class Test_memoized_tuning(unittest.TestCase):
+    """
+    Normalized tuning cache test class
+    """
+    def test_usort(self):
+        usort.cache_clear()
+        values = usort.tune(0.6, 2.0, -1.5, 1.0)
+        reference = usort.get_values(0.6, 2.0, -1.5, 1.0)
+        for field in ('kp', 'ti', 'td', 'n_kp', 'n_ti', 'n_td', 'beta', 'action'):
+            np.testing.assert_allclose(values[field], reference[field], rtol=1e-12)
+        np.testing.assert_array_equal(values['valid'], reference['valid'])
+
+        # Same a and Tao, only scaled by K and T
+        scaled = usort.tune(0.6, 4.0, 3.0, 2.0)
+        self.assertEqual((usort.cache_info().hits, usort.cache_info().misses), (1, 1))
+        valid = values['valid']
+        np.testing.assert_allclose(scaled['kp'][valid], values['kp'][valid]/2)
+        np.testing.assert_allclose(scaled['ti'][valid], values['ti'][valid]*2)
+
+        # Near-identical plants share the rounded one
+        usort.tune(0.6001, 2.0, 1.0, 1.4002, decimals=2)
+        usort.tune(0.5999, 2.0, 1.0, 1.3998, decimals=2)
+        self.assertEqual((usort.cache_info().hits, usort.cache_info().misses), (2, 2))
+
+    def test_frac_order(self):
+        frac_order.cache_clear()
+        controller = frac_order.tuning(1.3, 2.0, 1.5, 0.8, '1.4', 'PID')
+        # K*2 and the same tao_o = L/T^(1/alpha)
+        scaled = frac_order.tuning(1.3, 2.0, 3.0, 0.8, '1.4', 'PID')
+        self.assertEqual((frac_order.cache_info().hits, frac_order.cache_info().misses), (1, 1))
+        self.assertAlmostEqual(scaled.kp, controller.kp/2, places=12)
+        self.assertEqual((scaled.ti, scaled.td), (controller.ti, controller.td))
+
+        # Near-identical plants share the rounded one
+        rounded = frac_order.tuning(1.3001, 2.0, 1.5, 0.8, '1.4', 'PID', decimals=2)
+        self.assertEqual(frac_order.tuning(1.2999, 2.0, 1.5, 0.8002, '1.4', 'PID', decimals=2).n_kp,
+                         rounded.n_kp)
+        self.assertEqual((frac_order.cache_info().hits, frac_order.cache_info().misses), (2, 2))
+        self.assertAlmostEqual(rounded.n_kp, controller.n_kp, places=2)
+        with self.assertRaises(ValueError):
+            frac_order.tuning(1.3, 2.0, 1.5, 0.8, '1.6', 'PID')
+
+    def test_rounded_keys_in_range(self):
+        for decimals in (0, -1):
+            with self.assertRaises(ValueError):
+                frac_order.tuning(1.3, 2.0, 1.5, 0.3, '1.4', 'PID', decimals=decimals)
+            with self.assertRaises(ValueError):
+                usort.tune(0.3, 2.0, 1.0, 0.4, decimals=decimals)
+
+        # Significant digits, tao_o 0.176 is the 0.18 key and not 0
+        controller = frac_order.tuning(1.3, 2.0, 1.5, 0.3, '1.4', 'PID', decimals=2)
+        reference = frac_order.tuning(1.3, 2.0, 1.5, 0.18*np.power(2.0, 1/1.3), '1.4', 'PID')
+        self.assertTrue(np.isfinite(controller.kp))
+        self.assertAlmostEqual(controller.n_kp, reference.n_kp)
+
+        # alpha 1.75 rounds to 2 and is kept at the 1.8 rule limit, scaled by T^(1/1.8)
+        controller = frac_order.tuning(1.75, 2.0, 1.5, 1.0, '1.4', 'PID', decimals=1)
+        reference = frac_order.tuning(1.8, 2.0, 1.5, 1.0, '1.4', 'PID')
+        self.assertAlmostEqual(controller.ti/controller.n_ti, np.power(2.0, 1/1.8))
+        self.assertTrue(np.isfinite(controller.kp))
+        self.assertLess(abs(controller.n_kp - reference.n_kp), 0.1)
+
+        # a and Tao keys keep the validity of the exact plant
+        for plant in ((0.3, 2.0, 1.0, 0.4), (0.24, 2.0, 1.0, 0.78), (0.6, 2.0, 1.0, 0.21)):
+            np.testing.assert_array_equal(usort.tune(*plant, decimals=1)['valid'],
+                                          usort.get_values(*plant)['valid'])
+
+## Step response atlas Testing
+class Test_fom_atlas(unittest.TestCase):
+    """
+    Normalized fractional step response atlas test class
+    """
+    def test_exact_response(self):
+        from scipy.special import erfcx
+        tau = np.concatenate((np.geomspace(1e-4, 1, 50), np.linspace(1, 100, 500)))
+        np.testing.assert_allclose(fomAtlas.stepResponse(1.0, tau), -np.expm1(-tau), atol=1e-11)
+        # 1 - E_1/2(-sqrt(tau)) = 1 - exp(tau)*erfc(sqrt(tau))
+        np.testing.assert_allclose(fomAtlas.stepResponse(0.5, tau), 1 - erfcx(np.sqrt(tau)), atol=1e-11)
+        self.assertEqual(fomAtlas.stepResponse(1.5, [-1.0, 0.0]).tolist(), [0.0, 0.0])
+
+    def test_atlas(self):
+        atlas = fomAtlas.default_atlas()
+        self.assertIsInstance(atlas.steps, np.memmap)
+        np.testing.assert_allclose(atlas.alpha, fomAtlas.ALPHA_GRID, atol=1e-6)
+
+        rng = np.random.default_rng(0)
+        for alpha in rng.uniform(atlas.alpha[0], atlas.alpha[-1], 10):
+            tau = np.sort(rng.uniform(-1, 100, 300))
+            np.testing.assert_allclose(atlas.step(alpha, tau), fomAtlas.stepResponse(alpha, tau), atol=5e-4)
+        # Power law tail after the atlas
+        self.assertAlmostEqual(atlas.step(0.5, [1e6])[0], fomAtlas.stepResponse(0.5, [1e6])[0], places=5)
+
+        self.assertFalse(atlas.covers(1.95))
+        with self.assertRaises(ValueError):
+            atlas.step(1.95, [1.0])
+        t = np.linspace(0, 10, 11)
+        np.testing.assert_array_equal(identFractOrderModel.atlasStep(1.0, 1.95, 0.5, t),
+                                      identFractOrderModel.fomStep(1.0, 1.95, 0.5, t))
+
+    def test_identification(self):
+        data = np.loadtxt("{}/plant_raw_data/dataIDFOM.txt".format(path.dirname(__file__)))
+        atlas = identFractOrderModel.identify(data[:, 0], data[:, 1], data[:, 2], engine='atlas')
+        oustaloup = identFractOrderModel.identify(data[:, 0], data[:, 1], data[:, 2])
+        self.assertEqual(atlas['K'], oustaloup['K'])
+        self.assertLess(atlas['IAE'], oustaloup['IAE'])
+        # The IAE drops the error before the step
+        self.assertLessEqual(
+            atlas['IAE'],
+            np.trapz(np.abs(atlas['model_resp_vector'] - atlas['resp_vector']), atlas['time_vector']))
+
+        with self.assertRaises(ValueError):
+            identFractOrderModel.identify(data[:, 0], data[:, 1], data[:, 2], engine='euler')
+        with self.assertRaises(ValueError):
+            plant.FractionalOrderModel(data[:, 0], data[:, 1], data[:, 2], backend='octave', engine='atlas')
+
+## Dead time shift Testing
+class Test_shifted_step(unittest.TestCase):
+    """
+    Identification step responses with the dead time as a time shift
+    """
+    def test_shift(self):
+        t = np.linspace(0, 60, 3001)
+        step = identFractOrderModel.ShiftedStep()
+        shifted = step(3.0, 1.3, 5.0, t)
+        pade = identFractOrderModel.fomStep(3.0, 1.3, 5.0, t)
+        np.testing.assert_allclose(shifted, pade, atol=1e-2) # Padé ringing around L
+        self.assertEqual(np.max(np.abs(shifted[t <= 5.0])), 0.0) # No Padé ringing
+        np.testing.assert_allclose(shifted[t >= 5.0], identFractOrderModel.fomStep(3.0, 1.3, 0.0, t)[:np.sum(t >= 5.0)])
+
+        # Only L moves, the delay free response is reused
+        for L in (5.1, 5.2, 7.0):
+            step(3.0, 1.3, L, t)
+        self.assertEqual(len(step._responses), 1)
+        step(3.0, 1.3, 5.0, t[:100])
+        self.assertEqual(len(step._responses), 1)
+        self.assertEqual(len(step._tnorm), 100)
+
+class Test_multi_start(unittest.TestCase):
+    """
+    Multi-start native identification
+    """
+    def setUp(self):
+        data = np.loadtxt("{}/{}".format(path.dirname(__file__), "plant_raw_data/dataIDFOM1.txt"))
+        self.vectors = (data[:, 0], data[:, 1], data[:, 2])
+
+    def test_starts(self):
+        single = identFractOrderModel.identify(*self.vectors, engine='atlas')
+        serial = identFractOrderModel.identify(*self.vectors, engine='atlas', starts=4, max_workers=1)
+        pool = identFractOrderModel.identify(*self.vectors, engine='atlas', starts=4, max_workers=2)
+
+        self.assertEqual(len(single['starts']), 1)
+        self.assertEqual(single['starts'][0]['x0'], serial['starts'][0]['x0']) # Heuristic start first
+        self.assertLessEqual(serial['IAE'], single['IAE'])
+        self.assertAlmostEqual(pool['IAE'], serial['IAE'])
+        for report in pool['starts']:
+            self.assertEqual(report['status'], 'done')
+            self.assertGreater(report['nfev'], 0)
+            self.assertGreaterEqual(report['seconds'], 0)
+
+    def test_early_stop(self):
+        result = identFractOrderModel.identify(
+            *self.vectors, engine='atlas', starts=4, max_workers=1, tolerance=1e3)
+        statuses = [report['status'] for report in result['starts']]
+        self.assertEqual(statuses, ['done', 'cancelled', 'cancelled', 'cancelled'])
+        self.assertEqual(result['IAE'], result['starts'][0]['IAE'])
+
+        with self.assertRaises(ValueError):
+            identFractOrderModel.identify(*self.vectors, engine='atlas', starts=0)
+        with self.assertRaises(ValueError):
+            plant.FractionalOrderModel(*self.vectors, backend='octave', starts=2, cache=False)
+
+class Test_closed_loop_cache(unittest.TestCase):
+    """
+    Normalized closed-loop responses cache
+    """
+    def setUp(self):
+        self.cache = pidtune_cache.configure()
+
+    def tearDown(self):
+        pidtune_cache.configure()
+
+    def test_rescaled_responses(self):
+        e_plant = plant.FractionalOrderModel(
+            alpha=1.2, time_constant=3.0, proportional_constant=2.0, dead_time_constant=1.5)
+        # Same normalized loops, T^(1/alpha) doubled and a negative gain
+        scaled = plant.FractionalOrderModel(
+            alpha=1.2, time_constant=3.0*2**1.2, proportional_constant=-0.5, dead_time_constant=3.0)
+
+        loops = close_loop_system.ClosedLoopBatch(e_plant.controllers, e_plant)
+        loops.step_response(engine='grunwald_letnikov', cache=True)
+        self.assertEqual(self.cache.misses, len(e_plant.controllers))
+
+        scaled_loops = close_loop_system.ClosedLoopBatch(scaled.controllers, scaled)
+        cached = scaled_loops.step_response(engine='grunwald_letnikov', cache=True)
+        self.assertEqual(self.cache.hits, len(scaled.controllers)) # Not simulated again
+        simulated = scaled_loops.step_response(engine='grunwald_letnikov')
+        for value, expected in zip(cached, simulated):
+            np.testing.assert_allclose(value, expected, rtol=1e-9, atol=1e-12)
+
+        t, y, y_reg, iae, iae_reg = close_loop_system.ClosedLoop(
+            scaled.controllers[0], scaled).step_response(2.0, 0.5, 'grunwald_letnikov', cache=True)
+        np.testing.assert_allclose(y, 2.0*simulated[1][:, 0], atol=1e-12)
+        np.testing.assert_allclose(y_reg, 5.0*simulated[2][:, 0], atol=1e-12)
+        self.assertAlmostEqual(iae_reg, 5.0*simulated[4][0])
+
+class Test_usort_threads(unittest.TestCase):
+    """
+    Stateless usort rule from a shared thread pool
+    """
+    def test_concurrent(self):
+        plants = [(a, T, K, L) for a in (0.1, 0.3, 0.6, 0.9)
+                  for T, K, L in ((2.0, -1.5, 1.0), (1.0, 2.0, 1.2), (3.0, 0.5, 0.6))]
+        combinations = [(mode, ctype, Ms, DoF) for mode in usort.control_modes
+                        for ctype in usort.controller_types for Ms in usort.ms_keys for DoF in usort.dofs]
+        jobs = [plant + combination for plant in plants for combination in combinations]
+        rule = usort.usort() # Shared instance
+
+        def legacy(job):
+            a, T, K, L, mode, ctype, Ms, DoF = job
+            try:
+                return rule.get_value(mode, ctype, a, Ms, T, K, L, DoF).toDict()
+            except ValueError:
+                return None
+
+        def functional(job):
+            a, T, K, L, mode, ctype, Ms, DoF = job
+            try:
+                return usort.get_value(mode, ctype, a, Ms, T, K, L, DoF).toDict()
+            except ValueError:
+                return None
+
+        expected = [legacy(job) for job in jobs]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for results in (list(executor.map(legacy, jobs)), list(executor.map(functional, jobs))):
+                for result, reference in zip(results, expected):
+                    if reference is None:
+                        self.assertIsNone(result)
+                        continue
+                    np.testing.assert_allclose(
+                        [result[field] for field in ('kp', 'ti', 'td', 'n_kp')],
+                        [reference[field] for field in ('kp', 'ti', 'td', 'n_kp')], rtol=1e-12)
+        self.assertEqual(vars(rule), {'Alfaro123c_rule': usort.Alfaro123c_rule}) # No state
+
+    def test_immutable_tables(self):
+        with self.assertRaises(TypeError):
+            usort.Alfaro123c_rule['Servo'] = {}
+        with self.assertRaises(TypeError):
+            usort.Alfaro123c_rule['Servo']['PI']['MS14']['0'][0] = 0.0
+        with self.assertRaises(ValueError):
+            usort.Alfaro123c_table[0, 0, 0, 0, 0] = 0.0
+        with self.assertRaises(ValueError):
+            usort.get_value('Servo', 'PI', 0.5, 'MS2', 1.0, 1.0, 0.5, 1) # No servo PI Ms 2.0
+        with self.assertRaises(ValueError):
+            usort.get_value('Servo', 'PD', 0.5, 'MS14', 1.0, 1.0, 0.5, 1)
+
+class Test_import_time(unittest.TestCase):
+    """
+    Lazy imports, tuning does not load the plotting or simulation stacks
+    """
+    HEAVY = ('matplotlib', 'pandas', 'control', 'scipy')
+
+    def cold_import(self, statement):
+        # Fresh interpreter, the loaded heavy modules
+        script = (
+            "import sys\n"
+            "{}\n"
+            "print(' '.join(m for m in {!r} if m in sys.modules))\n").format(statement, self.HEAVY)
+        env = dict(environ, PYTHONPATH=path.dirname(path.dirname(pidtune.__file__)))
+        return subprocess.run(
+            [sys.executable, '-c', script], env=env, check=True,
+            capture_output=True, text=True).stdout.split()
+
+    def test_tuning_imports(self):
+        for statement in (
+                "import pidtune.models",
+                "from pidtune.rules import usort, frac_order",
+                "from pidtune.models.plant import FractionalOrderModel\n"
+                "FractionalOrderModel(alpha=1.2, time_constant=3.0, proportional_constant=2.0, dead_time_constant=1.5)",
+                "from pidtune.rules import usort\n"
+                "usort.get_value('Servo', 'PID', 0.5, 'MS14', 2.0, 1.0, 1.0, 1)"):
+            self.assertEqual(self.cold_import(statement), [], statement)
+
+        # Loaded on use
+        heavy = self.cold_import("from pidtune.models import plant_alfaro123c")
+        self.assertNotIn('matplotlib', heavy)
+        self.assertNotIn('control', heavy)
 
 ## Alfaro123c Testing
 class Test_Alfaro123c(unittest.TestCase):
@@ -386,6 +1363,22 @@ class Test_Alfaro123c(unittest.TestCase):
                     self.assertEqual("Model for this value of 'a' time constant not found. Valid values are: 0 < a < 1",str(e))
 
 
+    def test_shared_analysis(self):
+        with open("{}/{}".format(path.dirname(__file__), "plant_raw_data/dataIDFOM1.txt"), 'r') as data_file:
+            raw_data = [line.strip().split() for line in data_file.read().split('\n') if line]
+            time_vector = [float(cols[0]) for cols in raw_data]  # Time vector
+            step_vector = [float(cols[1]) for cols in raw_data]  # Step vector
+            resp_vector = [float(cols[2]) for cols in raw_data]  # Open-loop system response vector
+
+        analysis = StepTestAnalysis(time_vector, step_vector, resp_vector)
+        for model in (FOPDT, SOPDT, overdamped):
+            shared = model(analysis=analysis)
+            single = model(time_vector=time_vector,
+                           step_vector=step_vector,
+                           resp_vector=resp_vector,)
+            self.assertIs(shared.analysis, analysis)
+            self.assertEqual(shared.toDict(), single.toDict())
+
     def test_parameters(self):
         def get_bool_parameter(parameter, reference):
             inf_limit = abs(reference) * 0.95